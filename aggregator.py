@@ -0,0 +1,185 @@
+# aggregator.py — PLANT-WIDE VIEW OVER MANY LINE STATIONS (ENGINE_MODE=aggregator)
+# The same app without cameras / model / worker: stations (uplink.py) POST gzip'd
+# JSON batches of inspection rows to /ingest, the aggregator folds them into
+# hourly rollups and serves analysis.html for the whole plant, one line or one
+# station (?line= / ?station= on /stats, /stats_detail, /api/analysis_data).
+#
+#   station table   station -> line, last_seq (idempotency), rows, batches, last_seen
+#   rollup_hourly   (station, line, hour, category) -> count, conf_sum
+#
+# Idempotency per (station, epoch): rows with local id <= station.last_seq are skipped,
+# and a batch with seq <= last_seq is only acknowledged ("duplicate") — retries never
+# double count. A newer epoch (the station was reset, its ids start again at 1)
+# restarts last_seq at 0; a batch from an older epoch is refused as "stale".
+# Batches of one station are applied one at a time (per-station lock here, plus
+# SELECT ... FOR UPDATE on the station row for MySQL with several aggregator workers).
+#
+# Raw rows are not kept: rollups are a few thousand rows per day for a whole plant.
+
+import time, threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, insert, func, and_
+
+import metrics
+from inspection import GOOD_KEY, DEFECT_KEYS
+
+INGEST_ROWS = metrics.Counter("aggregator_ingest_rows_total", "Rows received by /ingest")
+INGEST_BATCHES = metrics.Counter("aggregator_ingest_batches_total", "Batches received by /ingest")
+INGEST_SECONDS = metrics.Histogram("aggregator_ingest_seconds", "Time to apply one batch",
+                                   buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+
+
+def _hour(ts):
+    """"2025-01-15 14:30:45" -> "2025-01-15 14" (ValueError if it isn't a timestamp)."""
+    ts = str(ts)
+    if len(ts) < 13 or ts[4] != "-" or ts[10] != " ":
+        raise ValueError(f"bad timestamp {ts!r}")
+    return ts[:13]
+
+
+class Aggregator:
+    def __init__(self, engine, station_table, rollup_table):
+        self.engine = engine
+        self.stations_t = station_table
+        self.rollup = rollup_table
+        self.version = 0            # bumped per applied batch -> API response cache key
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock_for(self, station):
+        with self._locks_lock:
+            lock = self._locks.get(station)
+            if lock is None:
+                lock = self._locks[station] = threading.Lock()
+            return lock
+
+    # ----------------- INGEST -----------------
+    def ingest(self, batch):
+        """Apply one decoded batch (uplink.decode_batch). ValueError on bad rows."""
+        t0 = time.perf_counter()
+        station = str(batch["station"]).strip()[:64]
+        line = str(batch.get("line") or "")[:64]
+        epoch = str(batch.get("epoch") or "")
+        rows = batch["rows"]
+        st = self.stations_t
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+
+        with self._lock_for(station), self.engine.begin() as conn:
+            cur = conn.execute(select(st.c.last_seq, st.c.epoch).where(st.c.station == station)
+                               .with_for_update()).first()
+            cur_epoch = (cur[1] or "") if cur else ""
+            if cur is not None and epoch < cur_epoch:
+                INGEST_BATCHES.inc(result="stale")
+                return {"ok": True, "duplicate": True, "stale": True, "applied": 0,
+                        "last_seq": int(cur[0]), "epoch": cur_epoch}
+            last = int(cur[0]) if cur is not None and epoch == cur_epoch else 0
+            if batch["seq"] <= last:
+                conn.execute(update(st).where(st.c.station == station)
+                             .values(duplicates=st.c.duplicates + 1, last_seen=now))
+                INGEST_BATCHES.inc(result="duplicate")
+                INGEST_ROWS.inc(len(rows), result="duplicate")
+                return {"ok": True, "duplicate": True, "applied": 0, "last_seq": last, "epoch": epoch}
+
+            groups = defaultdict(lambda: [0, 0.0])
+            top = batch["seq"]
+            applied = 0
+            try:
+                for rid, ts, category, conf, _cam in rows:
+                    rid = int(rid)
+                    if rid <= last:
+                        continue  # overlap with an earlier batch
+                    g = groups[(_hour(ts), str(category)[:64])]
+                    g[0] += 1
+                    g[1] += float(conf or 0.0)
+                    top = max(top, rid)
+                    applied += 1
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"bad row: {e}")
+
+            r = self.rollup
+            for (hour, category), (n, conf_sum) in groups.items():
+                key = and_(r.c.station == station, r.c.line == line, r.c.hour == hour, r.c.category == category)
+                hit = conn.execute(update(r).where(key).values(count=r.c.count + n,
+                                                               conf_sum=r.c.conf_sum + conf_sum)).rowcount
+                if not hit:
+                    conn.execute(insert(r).values(station=station, line=line, hour=hour, category=category,
+                                                  count=n, conf_sum=conf_sum))
+            if cur is None:
+                conn.execute(insert(st).values(station=station, line=line, last_seq=top, epoch=epoch,
+                                               rows=applied, batches=1, duplicates=0, last_seen=now))
+            else:
+                conn.execute(update(st).where(st.c.station == station)
+                             .values(line=line, last_seq=top, epoch=epoch, rows=st.c.rows + applied,
+                                     batches=st.c.batches + 1, last_seen=now))
+
+        self.version += 1
+        INGEST_BATCHES.inc(result="applied")
+        INGEST_ROWS.inc(applied, result="applied")
+        if len(rows) > applied:
+            INGEST_ROWS.inc(len(rows) - applied, result="overlap")
+        INGEST_SECONDS.observe(time.perf_counter() - t0)
+        return {"ok": True, "duplicate": False, "applied": applied, "last_seq": top, "epoch": epoch}
+
+    # ----------------- READ SIDE -----------------
+    def _scope(self, station=None, line=None, since=None):
+        r = self.rollup
+        cond = []
+        if station:
+            cond.append(r.c.station == station)
+        if line:
+            cond.append(r.c.line == line)
+        if since:
+            cond.append(r.c.hour >= since)
+        return and_(*cond) if cond else None
+
+    def category_counts(self, station=None, line=None, since=None):
+        """{category: bottles} over the scope — same shape as a Bottle GROUP BY category."""
+        r = self.rollup
+        q = select(r.c.category, func.sum(r.c.count)).group_by(r.c.category)
+        cond = self._scope(station, line, since)
+        if cond is not None:
+            q = q.where(cond)
+        with self.engine.connect() as conn:
+            return {c: int(n or 0) for c, n in conn.execute(q)}
+
+    def stations(self, hours=1):
+        """Per station: ingest state + throughput / defect rate over the last `hours`."""
+        since = (datetime.now() - timedelta(hours=hours)).strftime("%Y-%m-%d %H")
+        r, st = self.rollup, self.stations_t
+        recent = defaultdict(lambda: {"good": 0, "defect": 0})
+        with self.engine.connect() as conn:
+            for station, category, n in conn.execute(
+                    select(r.c.station, r.c.category, func.sum(r.c.count))
+                    .where(r.c.hour >= since).group_by(r.c.station, r.c.category)):
+                if category == GOOD_KEY:
+                    recent[station]["good"] += int(n)
+                elif category in DEFECT_KEYS:
+                    recent[station]["defect"] += int(n)
+            rows = conn.execute(select(st).order_by(st.c.line, st.c.station)).mappings().all()
+        out = []
+        for s in rows:
+            c = recent[s["station"]]
+            total = c["good"] + c["defect"]
+            out.append({**dict(s), "recent_hours": hours, "recent_good": c["good"], "recent_defect": c["defect"],
+                        "recent_per_hour": round(total / hours, 1),
+                        "recent_defect_pct": round(100.0 * c["defect"] / total, 2) if total else 0.0})
+        return out
+
+    def series(self, hours=24, group="line", station=None, line=None):
+        """Hourly {group value: [{hour, good, defect}]} for the throughput / defect-rate chart."""
+        r = self.rollup
+        col = r.c.station if group == "station" else r.c.line
+        since = (datetime.now() - timedelta(hours=hours)).strftime("%Y-%m-%d %H")
+        q = (select(col, r.c.hour, r.c.category, func.sum(r.c.count))
+             .where(self._scope(station, line, since)).group_by(col, r.c.hour, r.c.category))
+        acc = defaultdict(lambda: defaultdict(lambda: {"good": 0, "defect": 0}))
+        with self.engine.connect() as conn:
+            for key, hour, category, n in conn.execute(q):
+                slot = acc[key or "-"][hour]
+                if category == GOOD_KEY:
+                    slot["good"] += int(n)
+                elif category in DEFECT_KEYS:
+                    slot["defect"] += int(n)
+        return {k: [{"hour": h, **v} for h, v in sorted(hours_.items())] for k, hours_ in acc.items()}
@@ -0,0 +1,229 @@
+# camera.py — CAMERA SETUP + SUPERVISION
+# Opened by whichever process owns the devices: app.py in ENGINE_MODE=thread,
+# the capture process in ENGINE_MODE=process.
+#
+# One CameraSupervisor thread per device owns its VideoCapture. It reads frames,
+# notices failed reads and stalls, reopens with exponential backoff and publishes
+# state transitions. Everybody else (capture stage, /camera_status, set_camera)
+# only reads .state / .latest() — nobody touches the device on the request path.
+
+import time, threading
+
+import metrics
+from sources import load_specs, make_source
+
+# one entry per camera button; see sources.py for the spec syntax (env QC_CAMERAS)
+CAMERA_SPECS = load_specs()
+CAM_INDICES = tuple(range(len(CAMERA_SPECS)))
+
+# index = numeric code (shared status array in process mode, camera_state gauge)
+STATES = ("offline", "online", "connecting", "stalled")
+
+CAM_STATE = metrics.Gauge("camera_state", "0 offline / 1 online / 2 connecting / 3 stalled")
+CAM_RECONNECTS = metrics.Counter("camera_reconnects_total", "Camera reopen attempts after a failure")
+CAM_FPS = metrics.Gauge("camera_fps", "Measured capture fps per camera")
+CAM_LATENCY = metrics.Gauge("camera_latency_ms", "Capture latency per camera (driver timestamp or decode time)")
+
+
+def open_camera(i):
+    """Open + probe camera i (its spec from CAMERA_SPECS). Returns the source or None."""
+    spec = CAMERA_SPECS[i]
+    try:
+        src = make_source(spec)
+        ok = src.open()
+    except Exception as e:
+        print(f"[camera] CAM {i} ({spec}) failed: {e}")
+        return None
+    if ok:
+        inf = src.info()
+        print(f"[camera] CAM {i} connected: {inf['kind']} {inf['width']}x{inf['height']}"
+              f" @{inf['fps']:g}fps {inf['fourcc']}".rstrip())
+        return src
+    print(f"[camera] CAM {i} not detected ({spec})")
+    return None
+
+
+class CameraSupervisor:
+    """
+    active=True  -> read() every frame, newest one available via latest()
+    active=False -> standby: one grab() per idle_probe seconds, just to keep the
+                    health state honest for the camera buttons
+    """
+
+    def __init__(self, index, opener=open_camera, stall_timeout=3.0, max_fails=25,
+                 backoff_min=1.0, backoff_max=30.0, idle_probe=1.0, on_state=None):
+        self.index = index
+        self.opener = opener
+        self.stall_timeout = stall_timeout
+        self.max_fails = max_fails
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.idle_probe = idle_probe
+        self.on_state = on_state
+        self.active = False
+        self.state = "connecting"
+        self.reason = ""
+        self.since = time.time()
+        self.reconnects = 0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._frame_at = time.monotonic()
+        self._gen = 0
+        self._stop = threading.Event()
+        self.source = None   # current CaptureSource (info() only)
+
+    # ----------------- LIFECYCLE -----------------
+    def start(self):
+        self._launch()
+        threading.Thread(target=self._watch, daemon=True, name=f"cam{self.index}-watch").start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._gen += 1
+
+    def _launch(self):
+        self._gen += 1
+        threading.Thread(target=self._run, args=(self._gen,), daemon=True,
+                         name=f"cam{self.index}-{self._gen}").start()
+
+    def _set_state(self, state, reason="", gen=None):
+        with self._lock:
+            if gen is not None and gen != self._gen:
+                return  # a superseded reader thread, not our business anymore
+            if state == self.state:
+                return
+            old, self.state, self.reason, self.since = self.state, state, reason, time.time()
+        print(f"[camera] CAM {self.index}: {old} -> {state}" + (f" ({reason})" if reason else ""))
+        CAM_STATE.set(STATES.index(state), cam=str(self.index))
+        if self.on_state is not None:
+            try:
+                self.on_state(self.index, state, reason)
+            except Exception as e:
+                print("[camera] on_state error:", e)
+
+    # ----------------- READER THREAD -----------------
+    def _run(self, gen):
+        backoff = self.backoff_min
+        first = gen == 1
+        while not self._stop.is_set() and gen == self._gen:
+            self._set_state("connecting", gen=gen)
+            if not first:
+                self.reconnects += 1
+                CAM_RECONNECTS.inc(cam=str(self.index))
+            first = False
+            cap = self.opener(self.index)
+            if cap is None:
+                self._set_state("offline", "open failed", gen=gen)
+            else:
+                backoff = self.backoff_min
+                self.source = cap
+                self._frame_at = time.monotonic()
+                self._set_state("online", gen=gen)
+                reason = self._read_loop(cap, gen)
+                try: cap.release()
+                except Exception: pass
+                self._set_state("offline", reason, gen=gen)
+            if gen != self._gen or self._stop.wait(backoff):
+                return
+            backoff = min(backoff * 2, self.backoff_max)
+
+    def _read_loop(self, cap, gen):
+        fails = 0
+        while not self._stop.is_set() and gen == self._gen:
+            if self.active:
+                ok, frame = cap.read()
+            else:
+                if self._stop.wait(self.idle_probe):
+                    break
+                ok, frame = cap.grab(), None
+            if not ok:
+                fails += 1
+                if fails >= self.max_fails:
+                    return f"{fails} failed reads"
+                time.sleep(0.02)  # never hot-spin on a dead device
+                continue
+            fails = 0
+            self._frame_at = time.monotonic()
+            if frame is not None:
+                with self._cond:
+                    self._seq += 1
+                    self._frame = frame
+                    self._cond.notify_all()
+        return "stopped"
+
+    def _watch(self):
+        while not self._stop.wait(0.5):
+            if self.state != "online":
+                continue
+            idle = time.monotonic() - self._frame_at
+            if idle > self.stall_timeout + (0 if self.active else self.idle_probe):
+                # read() is stuck inside the driver: leave that thread behind (it exits
+                # once read returns and sees the new generation) and reopen from a fresh one
+                self._set_state("stalled", f"no frame for {idle:.1f}s")
+                self._launch()
+
+    # ----------------- CONSUMERS -----------------
+    def latest(self, after_seq=0, timeout=0.5):
+        """(seq, frame) newer than after_seq, waiting up to timeout. None if nothing new."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq != after_seq and self._frame is not None,
+                                       timeout=timeout):
+                return None
+            return self._seq, self._frame
+
+    def info(self):
+        """Negotiated format + measured fps/latency of the current source ({} while offline)."""
+        src = self.source
+        if src is None or self.state != "online" or not hasattr(src, "info"):
+            return {}
+        return src.info()
+
+    def status(self):
+        return {"state": self.state, "reason": self.reason, "since": round(self.since, 3),
+                "reconnects": self.reconnects, "active": self.active, "source": self.info()}
+
+
+class CameraSet:
+    """All supervised devices + which one is active."""
+
+    def __init__(self, indices=CAM_INDICES, **kwargs):
+        self.cams = {i: CameraSupervisor(i, **kwargs) for i in indices}
+
+    def export_metrics(self):
+        """camera_fps / camera_latency_ms from this process' sources (call once)."""
+        def _values(key):
+            return {(("cam", str(i)),): sup.info().get(key, 0) for i, sup in self.cams.items()}
+        CAM_FPS.fn = lambda: _values("measured_fps")
+        CAM_LATENCY.fn = lambda: _values("latency_ms")
+        return self
+
+    def start(self, active=None):
+        for sup in self.cams.values():
+            sup.start()
+        if active is not None:
+            self.set_active(active)
+        return self
+
+    def stop(self):
+        for sup in self.cams.values():
+            sup.stop()
+
+    def get(self, index):
+        return self.cams.get(index)
+
+    def set_active(self, index):
+        for i, sup in self.cams.items():
+            sup.active = i == index
+
+    def state(self, index):
+        sup = self.cams.get(index)
+        return sup.state if sup is not None else "offline"
+
+    def connected(self, index):
+        return self.state(index) == "online"
+
+    def status(self):
+        return {i: sup.status() for i, sup in self.cams.items()}
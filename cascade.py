@@ -0,0 +1,128 @@
+# cascade.py — TWO-STAGE INSPECTION (config: cascade_classifier != "")
+#
+#   every frame:  detector.track() at low res (cascade_det_imgsz) -> bottle boxes + ids
+#   near line:    up to cascade_crops FULL-RES crops per track -> classifier -> votes
+#
+# The fine print defects (Touching_Characters, Double_Print, Missing_Text) are
+# small; at 320 px they are barely visible, at full-res crop size they are easy.
+# But they only matter once per bottle, so the expensive look happens only for the
+# few frames around the counting line. Label of a track = class with the highest
+# summed probability over its crops.
+#
+# Classifier: an Ultralytics classify model (-cls, names = the 4 classes), or a
+# detect model run on the crop (best box class counts as the vote).
+
+import time
+
+import cv2
+
+import metrics
+from inspection import norm, extract_detections, draw_detections, PENDING
+from model_manager import ModelManager
+
+CROP_PAD = 0.10       # context around the box (fraction of box size)
+
+CASCADE_CROPS = metrics.Counter("cascade_crops_total", "High-res crops sent to the classifier")
+CASCADE_FRAMES = metrics.Counter("cascade_frames_total", "Frames inspected by the cascade")
+
+
+def _crop(frame, box, pad=CROP_PAD):
+    fh, fw = frame.shape[:2]
+    x1, y1, x2, y2 = box
+    px, py = (x2 - x1) * pad, (y2 - y1) * pad
+    x1, y1 = max(0, int(x1 - px)), max(0, int(y1 - py))
+    x2, y2 = min(fw, int(x2 + px)), min(fh, int(y2 + py))
+    if x2 - x1 < 8 or y2 - y1 < 8:
+        return None
+    return frame[y1:y2, x1:x2]
+
+
+class CascadeInspector:
+    def __init__(self, classifier_path):
+        self.classifier = ModelManager(classifier_path, warmup_shape=(224, 224, 3))
+        self.tracks = {}   # tid -> {"n": crops, "votes": {label: prob sum}, "last_cx": float, "seen": t}
+
+    def swap_classifier(self, path):
+        self.classifier.request_swap(path)
+
+    # ----------------- STAGE 2 -----------------
+    def _classify(self, crops, imgsz, conf):
+        """crops -> [{label: prob}] (empty dict = no opinion)."""
+        model = self.classifier.current()
+        results = model.predict(crops, imgsz=imgsz, conf=conf, verbose=False)
+        out = []
+        for r in results:
+            if getattr(r, "probs", None) is not None:
+                p = r.probs.data.cpu().numpy()
+                out.append({norm(model.names[i]): float(p[i]) for i in range(len(p))})
+            elif r.boxes is not None and len(r.boxes):
+                k = int(r.boxes.conf.argmax())
+                out.append({norm(model.names[int(r.boxes.cls[k])]): float(r.boxes.conf[k])})
+            else:
+                out.append({})
+        return out
+
+    def _wants_crop(self, st, cx, line, zone, max_crops):
+        if st["n"] >= max_crops:
+            return False
+        if st["n"] == 0:
+            # first look as soon as it enters the zone — or right now if it jumped past it,
+            # so nothing ever crosses the line unclassified
+            return cx >= line - zone
+        if abs(cx - line) > zone:
+            return False
+        # spread the remaining crops over the zone -> different views of the print
+        return abs(cx - st["last_cx"]) >= 2 * zone / max_crops
+
+    # ----------------- BOTH STAGES -----------------
+    def infer(self, detector, frame, cfg):
+        """-> (dets for LineCounter, annotated frame). Labels are the vote winners."""
+        CASCADE_FRAMES.inc()
+        results = detector.track(source=frame, persist=True, conf=cfg["conf_thresh"],
+                                 imgsz=cfg["cascade_det_imgsz"], verbose=False)
+        boxes = extract_detections(results[0], detector.names) if len(results) else []
+
+        fw = frame.shape[1]
+        line = fw * cfg["line_rel_pos"]
+        zone = fw * cfg["cascade_zone"]
+        now = time.time()
+        todo = []
+        for tid, _, _, box in boxes:
+            if tid is None:
+                continue
+            st = self.tracks.setdefault(tid, {"n": 0, "votes": {}, "last_cx": None, "seen": now})
+            st["seen"] = now
+            cx = (box[0] + box[2]) / 2.0
+            if self._wants_crop(st, cx, line, zone, cfg["cascade_crops"]):
+                crop = _crop(frame, box)
+                if crop is not None:
+                    todo.append((tid, cx, crop))
+
+        if todo:
+            CASCADE_CROPS.inc(len(todo))
+            probs = self._classify([c for _, _, c in todo], cfg["cascade_crop_imgsz"], cfg["conf_thresh"])
+            for (tid, cx, _), p in zip(todo, probs):
+                st = self.tracks[tid]
+                st["n"] += 1
+                st["last_cx"] = cx
+                for label, v in p.items():
+                    st["votes"][label] = st["votes"].get(label, 0.0) + v
+
+        dets = []
+        for tid, _, det_conf, box in boxes:
+            st = self.tracks.get(tid)
+            if st is None or not st["votes"]:
+                dets.append((tid, PENDING, 0.0, box))
+                continue
+            label, total = max(st["votes"].items(), key=lambda kv: kv[1])
+            dets.append((tid, label, total / max(1, st["n"]), box))
+
+        # forget tracks not seen for a minute (same horizon as LineCounter.cleanup)
+        for tid in [t for t, st in self.tracks.items() if now - st["seen"] > 60]:
+            del self.tracks[tid]
+
+        annotated = draw_detections(frame.copy(), dets)
+        fh = frame.shape[0]
+        for x in (int(line - zone), int(line + zone)):  # classification zone
+            cv2.line(annotated, (x, 0), (x, fh), (0, 200, 255), 1)
+        return dets, annotated
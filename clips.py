@@ -0,0 +1,163 @@
+# clips.py — PRE/POST-EVENT CLIPS FOR DEFECTS
+#
+#   capture stage ──push()──▶ per-camera FrameRing (preallocated, fixed memory)
+#   defect crossing ──trigger()──▶ returns the clip path at once, job queued
+#   encoder thread: waits until post_s after the event, copies the frames of
+#                   [t - pre_s, t + post_s] out of the ring and writes the clip,
+#                   then on_done(path, ok) — on failure the web tier clears the
+#                   row's clip_path again (BatchWriter.update, after the row's INSERT)
+#
+# The inference thread only ever does trigger() (a dict + queue.put_nowait);
+# resizing happens in the capture stage and encoding in the background thread.
+# Clips: clips/YYYY/MM/DD/cam<N>/<label>_<YYYYmmdd_HHMMSS>_<ms>.mp4 (H.264 when
+# the OpenCV build has it, else MJPG in .avi — still downloadable, not inline).
+
+import os, time, queue, threading
+
+import cv2
+import numpy as np
+
+import metrics
+
+CLIP_DIR = "clips"
+
+CLIPS_WRITTEN = metrics.Counter("clips_written_total", "Defect clips encoded")
+CLIPS_DROPPED = metrics.Counter("clips_dropped_total", "Defect clips skipped (queue full / no frames / encode error)")
+
+
+class FrameRing:
+    """Last `slots` frames of one camera, downscaled, in one preallocated array."""
+
+    def __init__(self, slots, shape):
+        self.frames = np.zeros((slots,) + shape, dtype=np.uint8)
+        self.ts = np.zeros(slots, dtype=np.float64)
+        self.shape = shape
+        self.slots = slots
+        self.head = 0
+        self.lock = threading.Lock()
+
+    def push(self, frame, ts):
+        with self.lock:
+            self.frames[self.head] = frame
+            self.ts[self.head] = ts
+            self.head = (self.head + 1) % self.slots
+
+    def window(self, t0, t1):
+        """Copies of the frames with t0 <= ts <= t1, oldest first."""
+        with self.lock:
+            order = [(self.head + k) % self.slots for k in range(self.slots)]
+            return [self.frames[i].copy() for i in order if t0 <= self.ts[i] <= t1 and self.ts[i] > 0]
+
+
+def _probe_codec():
+    """First (fourcc, ext) this OpenCV build can actually write."""
+    probe = os.path.join(CLIP_DIR, ".probe")
+    os.makedirs(CLIP_DIR, exist_ok=True)
+    for fourcc, ext in (("avc1", ".mp4"), ("H264", ".mp4"), ("MJPG", ".avi")):
+        path = probe + ext
+        try:
+            w = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), 10, (64, 48))
+            ok = w.isOpened()
+            if ok:
+                w.write(np.zeros((48, 64, 3), np.uint8))
+            w.release()
+        except cv2.error:
+            ok = False
+        if os.path.exists(path):
+            os.remove(path)
+        if ok:
+            return fourcc, ext
+    return None, None
+
+
+class ClipRecorder:
+    def __init__(self, root=CLIP_DIR, pre_s=3.0, post_s=2.0, fps=10, width=640, max_pending=8, on_done=None):
+        self.root = root
+        self.on_done = on_done   # on_done(path, ok) from the encoder thread, path as returned by trigger()
+        self.pre_s = pre_s
+        self.post_s = post_s
+        self.fps = fps
+        self.width = width
+        self.rings = {}
+        self._last_push = {}
+        self._q = queue.Queue(maxsize=max_pending)
+        self.fourcc, self.ext = _probe_codec()
+        # ring covers the whole window plus one second of slack for the encoder
+        self.slots = int((pre_s + post_s + 1.0) * fps)
+        print(f"[clips] {self.fourcc or 'no codec'} {self.ext or ''}, "
+              f"{pre_s:g}s before + {post_s:g}s after @ {fps} fps, {width}px")
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True, name="clip-encoder").start()
+        return self
+
+    # ----------------- CAPTURE STAGE -----------------
+    def push(self, cam, frame, ts=None):
+        """Called for every captured frame; keeps at most `fps` frames per second."""
+        ts = ts or time.time()
+        if ts - self._last_push.get(cam, 0.0) < 1.0 / self.fps:
+            return
+        self._last_push[cam] = ts
+        h, w = frame.shape[:2]
+        if w != self.width:
+            frame = cv2.resize(frame, (self.width, int(h * self.width / w)), interpolation=cv2.INTER_AREA)
+        ring = self.rings.get(cam)
+        if ring is None or ring.shape != frame.shape:
+            # first frame / resolution change: (re)allocate once
+            ring = self.rings[cam] = FrameRing(self.slots, frame.shape)
+        ring.push(frame, ts)
+
+    # ----------------- INFERENCE THREAD -----------------
+    def trigger(self, cam, now, label):
+        """Queue a clip around `now` (datetime). Returns its path, '' if it won't be written."""
+        if self.fourcc is None:
+            return ""
+        d = os.path.join(self.root, now.strftime("%Y"), now.strftime("%m"), now.strftime("%d"), f"cam{cam}")
+        name = f"{label}_{now.strftime('%Y%m%d_%H%M%S')}_{now.microsecond // 1000:03d}{self.ext}"
+        path = os.path.join(d, name)
+        try:
+            self._q.put_nowait((cam, now.timestamp(), path))
+        except queue.Full:
+            CLIPS_DROPPED.inc(reason="queue_full")
+            return ""
+        return path.replace(os.sep, "/")
+
+    # ----------------- ENCODER THREAD -----------------
+    def _run(self):
+        while True:
+            cam, t_event, path = self._q.get()
+            wait = t_event + self.post_s - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                ok = self._write(cam, t_event, path)
+            except Exception as e:
+                ok = False
+                CLIPS_DROPPED.inc(reason="error")
+                print("[clips] encode failed", path, e)
+            if self.on_done is not None:
+                try:
+                    self.on_done(path.replace(os.sep, "/"), ok)
+                except Exception as e:
+                    print("[clips] on_done failed", path, e)
+
+    def _write(self, cam, t_event, path):
+        ring = self.rings.get(cam)
+        frames = ring.window(t_event - self.pre_s, t_event + self.post_s) if ring is not None else []
+        if not frames:
+            CLIPS_DROPPED.inc(reason="no_frames")
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        h, w = frames[0].shape[:2]
+        tmp = path[:-len(self.ext)] + ".part" + self.ext  # keep the extension: it picks the container
+        out = cv2.VideoWriter(tmp, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (w, h))
+        if not out.isOpened():
+            CLIPS_DROPPED.inc(reason="error")
+            print("[clips] cannot open writer", tmp)
+            return False
+        for f in frames:
+            out.write(f)
+        out.release()
+        os.replace(tmp, path)
+        CLIPS_WRITTEN.inc()
+        return True
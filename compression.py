@@ -0,0 +1,97 @@
+# compression.py — gzip / brotli for JSON, HTML and static assets (after_request)
+# brotli is optional: `pip install brotli`; without it everything falls back to gzip.
+# Streamed responses (MJPEG, exports) are left alone; static files are compressed
+# once per (path, ETag, encoding) and served from a small in-memory cache.
+
+import gzip, threading
+from collections import OrderedDict
+
+from flask import request
+
+import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = {"application/json", "text/html", "text/css", "text/javascript",
+                "application/javascript", "text/plain", "text/csv", "image/svg+xml"}
+MIN_SIZE = 512          # bytes; below this the headers cost more than they save
+CACHE_ENTRIES = 128
+
+COMPRESS_BYTES = metrics.Counter("http_compressed_bytes_total",
+                                 "Response bytes before/after compression")
+
+
+def _pick_encoding():
+    acc = request.accept_encodings
+    if brotli is not None and acc["br"]:
+        return "br"
+    if acc["gzip"]:
+        return "gzip"
+    return None
+
+
+def init_compression(app, gzip_level=6, br_quality=5):
+    cache = OrderedDict()
+    lock = threading.Lock()
+
+    def _compress(data, enc):
+        if enc == "br":
+            return brotli.compress(data, quality=br_quality)
+        return gzip.compress(data, compresslevel=gzip_level)
+
+    @app.after_request
+    def compress_response(resp):
+        if (resp.status_code != 200 or request.method == "HEAD"
+                or "Content-Encoding" in resp.headers or resp.mimetype not in COMPRESSIBLE):
+            return resp
+        etag, _ = resp.get_etag()
+        # file responses (static) are passthrough; only those with an ETag are cacheable
+        if resp.direct_passthrough:
+            if not etag:
+                return resp
+        elif resp.is_streamed:
+            return resp
+        resp.vary.add("Accept-Encoding")
+        enc = _pick_encoding()
+        if enc is None:
+            return resp
+
+        key = (request.path, etag, enc) if etag else None
+        body = None
+        if key is not None:
+            with lock:
+                body = cache.get(key)
+                if body is not None:
+                    cache.move_to_end(key)
+        if body is None:
+            resp.direct_passthrough = False
+            data = resp.get_data()
+            if len(data) < MIN_SIZE:
+                return resp
+            body = _compress(data, enc)
+            COMPRESS_BYTES.inc(len(data), stage="in")
+            COMPRESS_BYTES.inc(len(body), stage="out")
+            if key is not None:
+                with lock:
+                    cache[key] = body
+                    while len(cache) > CACHE_ENTRIES:
+                        cache.popitem(last=False)
+        else:
+            # cache hit: the file handle Flask opened is never read -> close it
+            close = getattr(resp.response, "close", None)
+            if close is not None:
+                close()
+            resp.direct_passthrough = False
+
+        resp.set_data(body)
+        resp.headers["Content-Encoding"] = enc
+        if etag:
+            # same resource, different bytes -> weak validator (If-None-Match still matches)
+            resp.set_etag(etag, weak=True)
+        return resp
+
+    print(f"[http] compression: {'br+gzip' if brotli is not None else 'gzip'}")
+    return compress_response
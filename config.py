@@ -0,0 +1,250 @@
+# config.py — RUNTIME CONFIG (hot reload, no restart)
+# Values live in config.yaml and can also be changed through the admin API.
+# Admin changes go to a separate override file (instance/config.override.yaml,
+# only the changed keys) layered on top — config.yaml and its comments stay
+# exactly as the operator wrote them. Precedence: defaults < config.yaml < override.
+# The worker grabs one immutable snapshot per frame, so a change is applied
+# atomically between frames — never halfway through a frame.
+
+import os, time, threading
+from types import MappingProxyType
+
+import yaml
+
+# ====================================================================
+# SCHEMA — key -> (type, validator)
+# ====================================================================
+def _between(lo, hi):
+    return lambda v: lo <= v <= hi
+
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def parse_duration(value):
+    """'90d' / '24h' / '15m' / '30s' / plain seconds -> seconds (float). None/'' = forever."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    v = str(value).strip().lower()
+    if v and v[-1] in _UNITS:
+        return float(v[:-1]) * _UNITS[v[-1]]
+    return float(v)
+
+
+def parse_shifts(value):
+    """'06:00,14:00,22:00' -> [360, 840, 1320] shift starts (minutes after midnight). '' = one shift at 00:00."""
+    starts = set()
+    for part in str(value or "").replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        h, _, m = part.partition(":")
+        h, m = int(h), int(m or 0)
+        if not (0 <= h < 24 and 0 <= m < 60):
+            raise ValueError(f"bad shift start {part!r}")
+        starts.add(h * 60 + m)
+    return sorted(starts) or [0]
+
+
+def _shifts(value):
+    try:
+        parse_shifts(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _durations(mapping):
+    """Validator for {category: duration} policies."""
+    try:
+        return all(parse_duration(v) is None or parse_duration(v) >= 0 for v in mapping.values())
+    except (TypeError, ValueError):
+        return False
+
+
+SCHEMA = {
+    "conf_thresh":      (float, _between(0.0, 1.0)),
+    "line_rel_pos":     (float, _between(0.05, 0.95)),
+    "lamp_ms":          (int,   _between(0, 60000)),
+    "save_only_defect": (bool,  None),
+    "clip_on_defect":   (bool,  None),
+    "model_path":       (str,   lambda v: bool(v.strip())),
+    # retention — {category | "defect": duration}; missing category = keep forever
+    "retention_images":       (dict, _durations),
+    "retention_rows":         (dict, _durations),
+    "retention_interval_min": (int,  _between(1, 7 * 24 * 60)),
+    "retention_archive":      (bool, None),
+    # cascade — cheap detector every frame + high-res crop classifier near the line
+    "cascade_classifier": (str,   None),                 # "" = off (single model)
+    "cascade_det_imgsz":  (int,   _between(128, 1920)),
+    "cascade_crop_imgsz": (int,   _between(32, 1280)),
+    "cascade_zone":       (float, _between(0.01, 0.5)),  # half-width around the line, fraction of frame
+    "cascade_crops":      (int,   _between(1, 10)),      # classifier looks per bottle
+    # active-learning harvester (harvester.py)
+    "harvest_enabled":      (bool,  None),
+    "harvest_margin":       (float, _between(0.0, 1.0)),
+    "harvest_min_flips":    (int,   _between(1, 1000)),
+    "harvest_agreement":    (float, _between(0.0, 1.0)),
+    "harvest_hamming":      (int,   _between(0, 64)),
+    "harvest_max_per_hour": (int,   _between(1, 100000)),
+    # confidence drift alerts (sketches.py)
+    "drift_psi":              (float, _between(0.01, 10.0)),
+    "drift_min_samples":      (int,   _between(10, 1000000)),
+    "drift_baseline_samples": (int,   _between(10, 1000000)),
+    # shift / daily reports (shift_report.py)
+    "report_shifts":       (str, _shifts),             # shift start times, "06:00,14:00,22:00"
+    "report_interval_min": (int, _between(1, 24 * 60)),
+    "report_top_images":   (int, _between(0, 100)),    # highest-confidence defect images per report
+}
+
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off")
+
+
+def _coerce(key, value):
+    """Cast `value` to the schema type of `key`; raise ValueError if invalid."""
+    if key not in SCHEMA:
+        raise ValueError(f"unknown key {key!r}")
+    typ, check = SCHEMA[key]
+    if typ is bool and isinstance(value, str):
+        word = value.strip().lower()
+        if word not in _TRUE + _FALSE:
+            raise ValueError(f"{key}: expected bool, got {value!r}")
+        value = word in _TRUE
+    elif typ in (int, float) and isinstance(value, bool):
+        raise ValueError(f"{key}: expected {typ.__name__}")
+    elif typ is int and isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{key}: expected int, got {value!r}")   # int(0.7) would silently be 0
+    try:
+        value = typ(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key}: expected {typ.__name__}, got {value!r}")
+    if check is not None and not check(value):
+        raise ValueError(f"{key}: value {value!r} out of range")
+    return value
+
+
+# ====================================================================
+# RUNTIME CONFIG
+# ====================================================================
+class RuntimeConfig:
+    """
+    Thread-safe config holder.
+
+    - snapshot(): immutable mapping, swapped by reference on every change
+    - update(changes): validate all keys first, then apply them together
+    - subscribe(fn): fn(old, new) is called after each applied change
+    """
+
+    def __init__(self, path, defaults, override_path=None):
+        self.path = path
+        self.override_path = override_path   # None: admin changes are not persisted
+        self._lock = threading.Lock()
+        self._snap = MappingProxyType({k: _coerce(k, v) for k, v in defaults.items()})
+        self._subscribers = []
+        self._override = {}
+        self._mtimes = {}
+        self.version = 0
+        self.reload()
+
+    def snapshot(self):
+        return self._snap
+
+    def __getitem__(self, key):
+        return self._snap[key]
+
+    def subscribe(self, fn):
+        self._subscribers.append(fn)
+
+    def update(self, changes, source="api", persist=True):
+        """Apply `changes` atomically. Returns (ok, msg_or_errors)."""
+        errors, clean = [], {}
+        for k, v in (changes or {}).items():
+            try:
+                clean[k] = _coerce(k, v)
+            except ValueError as e:
+                errors.append(str(e))
+        if errors:
+            return False, errors
+
+        with self._lock:
+            old = self._snap
+            new = dict(old)
+            new.update(clean)
+            if new == dict(old):
+                return True, "no change"
+            self._snap = MappingProxyType(new)
+            self.version += 1
+            if persist:
+                self._override.update(clean)
+                self._write_override()
+
+        changed = sorted(k for k in clean if old.get(k) != clean[k])
+        print(f"[config] v{self.version} applied from {source}: {', '.join(changed)}")
+        for fn in list(self._subscribers):
+            try:
+                fn(old, self._snap)
+            except Exception as e:
+                print("[config] subscriber error:", e)
+        return True, changed
+
+    # ----------------- FILES -----------------
+    def _read(self, path):
+        """SCHEMA keys of one YAML file ({} if missing), None if unreadable."""
+        if not path or not os.path.exists(path):
+            self._mtimes.pop(path, None)
+            return {}
+        try:
+            self._mtimes[path] = os.path.getmtime(path)
+            with open(path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+        except Exception as e:
+            print(f"[config] failed to read {path}:", e)
+            return None
+        return {k: v for k, v in data.items() if k in SCHEMA}
+
+    def reload(self):
+        """(Re)read config.yaml + override; silently keep current values if unreadable."""
+        base = self._read(self.path)
+        override = self._read(self.override_path)
+        if base is None or override is None:
+            return False
+        self._override = override
+        ok, res = self.update({**base, **override}, source=os.path.basename(self.path), persist=False)
+        if not ok:
+            print(f"[config] {self.path} rejected:", "; ".join(res))
+        return ok
+
+    def _write_override(self):
+        if not self.override_path:
+            return
+        tmp = self.override_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.override_path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(f"# admin API changes, override {os.path.basename(self.path)}; delete a key to go back\n")
+                yaml.safe_dump(dict(self._override), f, sort_keys=True)
+            os.replace(tmp, self.override_path)
+            self._mtimes[self.override_path] = os.path.getmtime(self.override_path)
+        except Exception as e:
+            print(f"[config] failed to write {self.override_path}:", e)
+
+    def start_watcher(self, interval=1.0):
+        """Poll the mtimes of config.yaml + override and reload on change (daemon thread)."""
+        def _watch():
+            while True:
+                time.sleep(interval)
+                changed = False
+                for path in filter(None, (self.path, self.override_path)):
+                    try:
+                        mtime = os.path.getmtime(path)
+                    except OSError:
+                        mtime = None   # missing (override not written yet / deleted)
+                    changed = changed or mtime != self._mtimes.get(path)
+                if changed:
+                    self.reload()
+        t = threading.Thread(target=_watch, daemon=True, name="config-watcher")
+        t.start()
+        return t
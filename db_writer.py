@@ -0,0 +1,126 @@
+# db_writer.py — BATCHED INSERTS (write path off the inference thread)
+# The worker only does queue.put(); a single writer thread groups rows into one
+# multi-row INSERT per flush. If the database is unreachable the rows stay
+# buffered (bounded) and are retried with backoff, so no crossing is lost.
+# update() goes through the same queue, so it is applied after every row
+# queued before it (e.g. clearing the clip_path of a clip that failed).
+# on_commit(rows) runs on the writer thread after each committed flush.
+
+import time, queue, threading
+from collections import deque
+from itertools import islice
+
+
+class BatchWriter:
+    def __init__(self, engine, table, batch_size=50, max_delay=0.5, max_buffer=100_000, on_commit=None):
+        self.engine = engine
+        self.table = table
+        self.on_commit = on_commit
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_buffer = max_buffer
+        self._q = queue.Queue()
+        self._pending = deque()
+        self._stop = threading.Event()
+        self._thread = None
+        self.written = 0
+        self.dropped = 0
+        self.last_error = None
+
+    # ----------------- PRODUCER SIDE -----------------
+    def add(self, **row):
+        """Queue one row (column -> value). Never blocks."""
+        self._q.put(row)
+
+    def update(self, key_col, key, **values):
+        """Queue UPDATE ... SET values WHERE key_col = key, in order with the rows."""
+        self._q.put((key_col, key, values))
+
+    @property
+    def backlog(self):
+        return self._q.qsize() + len(self._pending)
+
+    # ----------------- WRITER THREAD -----------------
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="db-writer")
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Flush what is left and stop the thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _drain(self, timeout):
+        try:
+            self._pending.append(self._q.get(timeout=timeout))
+        except queue.Empty:
+            return
+        while True:
+            try:
+                self._pending.append(self._q.get_nowait())
+            except queue.Empty:
+                break
+
+    def _run(self):
+        backoff = 0.5
+        first_at = None  # when the oldest unflushed row arrived
+        while not (self._stop.is_set() and self._q.empty() and not self._pending):
+            if first_at is None:
+                timeout = self.max_delay
+            else:
+                timeout = max(0.0, self.max_delay - (time.monotonic() - first_at))
+            self._drain(timeout=0.05 if self._stop.is_set() else timeout)
+            if not self._pending:
+                continue
+            if first_at is None:
+                first_at = time.monotonic()
+
+            due = time.monotonic() - first_at >= self.max_delay
+            if len(self._pending) < self.batch_size and not due and not self._stop.is_set():
+                continue
+
+            # bounded buffer while the DB is down: drop the oldest rows
+            while len(self._pending) > self.max_buffer:
+                self._pending.popleft()
+                self.dropped += 1
+
+            batch = list(islice(self._pending, self.batch_size * 20))
+            try:
+                with self.engine.begin() as conn:
+                    self._flush(conn, batch)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[db-writer] flush of {len(batch)} rows failed, retry in {backoff:.1f}s:", e)
+                if self._stop.wait(backoff) and backoff >= 8:
+                    break  # shutting down and DB still gone
+                backoff = min(backoff * 2, 30.0)
+                continue
+
+            for _ in batch:
+                self._pending.popleft()
+            self.written += len(batch)
+            self.last_error = None
+            backoff = 0.5
+            first_at = time.monotonic() if self._pending else None
+            if self.on_commit is not None:
+                try:
+                    self.on_commit([item for item in batch if isinstance(item, dict)])
+                except Exception as e:
+                    print("[db-writer] on_commit failed:", e)
+
+    def _flush(self, conn, batch):
+        """Runs of rows -> one multi-row INSERT each; updates in between, in queue order."""
+        rows = []
+        for item in batch:
+            if isinstance(item, dict):
+                rows.append(item)
+                continue
+            if rows:
+                conn.execute(self.table.insert(), rows)
+                rows = []
+            key_col, key, values = item
+            conn.execute(self.table.update().where(self.table.c[key_col] == key).values(**values))
+        if rows:
+            conn.execute(self.table.insert(), rows)
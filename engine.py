@@ -0,0 +1,592 @@
+# engine.py — INSPECTION ENGINE IN SEPARATE PROCESSES (ENGINE_MODE=process)
+#
+#   capture process ──raw frames──▶ [shm ring "raw"] ──▶ engine process (YOLO + counting)
+#                                                         │  annotated JPEG ──▶ [shm ring "jpeg"] ──▶ web tier
+#                                                         └─ crossing events ──▶ mp.Queue ─────────▶ web tier
+#
+# The web tier (Flask) never touches the camera or the model; it only reads the
+# shared status array, the JPEG ring and the event queue, so a heavy request
+# can't steal the GIL from inference. EngineSupervisor restarts a crashed or
+# stalled child without taking the dashboard down.
+
+import os, time, queue, atexit, threading, traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from datetime import datetime
+
+import numpy as np
+
+import metrics
+
+# ====================================================================
+# SHARED STATUS ARRAY (mp.Array("d"))
+# ====================================================================
+ST_ENGINE_BEAT = 0   # engine heartbeat (time.time())
+ST_CAPTURE_BEAT = 1  # capture heartbeat
+ST_FPS = 2           # inference fps (EMA)
+ST_CAM = 3           # camera currently captured
+ST_READY = 4         # engine has loaded the model
+ST_GOOD = 5          # counters, written by the web tier (for the overlay)
+ST_DEFECT = 6
+ST_CAM_STATE = 7     # + camera index -> camera.STATES code (1 = online)
+MAX_CAMS = 8
+ST_CAM_INFO = ST_CAM_STATE + MAX_CAMS   # + index * len(CAM_INFO_FIELDS) + field
+CAM_INFO_FIELDS = ("width", "height", "fps", "measured_fps", "latency_ms")
+STATUS_LEN = ST_CAM_INFO + MAX_CAMS * len(CAM_INFO_FIELDS)
+
+ENGINE_RESTARTS = metrics.Counter("engine_restarts_total", "Engine child process restarts")
+ENGINE_FPS = metrics.Gauge("engine_inference_fps", "Inference FPS reported by the engine process")
+
+
+# ====================================================================
+# SHARED-MEMORY RING BUFFER
+# ====================================================================
+class ShmRing:
+    """
+    Single-writer / multi-reader ring of byte payloads in one SharedMemory block.
+    Header (int64): [latest_seq] + per slot [seq, nbytes, h, w, tag].
+    Readers only take the newest slot and re-check its seq after copying
+    (seqlock), so a slot overwritten mid-read is detected and skipped.
+    """
+    META = 5
+
+    def __init__(self, shm, slots, slot_bytes, owner):
+        self.shm = shm
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = owner
+        hdr_len = 1 + self.META * slots
+        self._hdr_bytes = ((hdr_len * 8 + 63) // 64) * 64
+        self._hdr = np.ndarray((hdr_len,), dtype=np.int64, buffer=shm.buf)
+        self._data = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=shm.buf, offset=self._hdr_bytes)
+
+    @staticmethod
+    def _size(slots, slot_bytes):
+        hdr_len = 1 + ShmRing.META * slots
+        return ((hdr_len * 8 + 63) // 64) * 64 + slots * slot_bytes
+
+    @classmethod
+    def create(cls, name, slots, slot_bytes):
+        try:  # stale segment from a previous run
+            old = shared_memory.SharedMemory(name=name)
+            old.close(); old.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls._size(slots, slot_bytes))
+        ring = cls(shm, slots, slot_bytes, owner=True)
+        ring._hdr[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, slots, slot_bytes):
+        # spawned children share the creator's resource tracker, so the segment
+        # is only unlinked by the owner (close()) or when the whole app exits
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, slots, slot_bytes, owner=False)
+
+    def write(self, data, h=0, w=0, tag=0):
+        buf = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data.reshape(-1).view(np.uint8)
+        n = buf.size
+        if n > self.slot_bytes:
+            return False
+        seq = int(self._hdr[0]) + 1
+        base = 1 + self.META * (seq % self.slots)
+        self._hdr[base] = -1  # writing
+        self._data[seq % self.slots, :n] = buf
+        self._hdr[base + 1:base + 5] = (n, h, w, tag)
+        self._hdr[base] = seq
+        self._hdr[0] = seq
+        return True
+
+    def read_latest(self, after_seq=0):
+        """Newest payload with seq > after_seq -> (seq, bytes, h, w, tag), or None."""
+        seq = int(self._hdr[0])
+        if seq <= after_seq:
+            return None
+        base = 1 + self.META * (seq % self.slots)
+        if self._hdr[base] != seq:
+            return None
+        n, h, w, tag = (int(x) for x in self._hdr[base + 1:base + 5])
+        data = self._data[seq % self.slots, :n].tobytes()
+        if self._hdr[base] != seq:  # overwritten while copying
+            return None
+        return seq, data, h, w, tag
+
+    def read_frame(self, after_seq=0):
+        """Like read_latest, but returns (seq, BGR ndarray, tag)."""
+        item = self.read_latest(after_seq)
+        if item is None:
+            return None
+        seq, data, h, w, tag = item
+        return seq, np.frombuffer(data, dtype=np.uint8).reshape(h, w, 3), tag
+
+    @property
+    def seq(self):
+        return int(self._hdr[0])
+
+    def close(self):
+        # drop numpy views before closing the mapping
+        self._hdr = self._data = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# ====================================================================
+# CHILD PROCESSES
+# ====================================================================
+def _drain(q):
+    out = []
+    while True:
+        try:
+            out.append(q.get_nowait())
+        except (queue.Empty, EOFError, OSError):
+            return out
+
+
+def capture_main(settings, cmd_q, status):
+    """Owns the cameras (one CameraSupervisor each); pushes raw BGR frames into the "raw" ring."""
+    from camera import CameraSet, STATES
+    raw = ShmRing.attach(*settings["raw_ring"])
+
+    def on_state(i, state, reason):
+        if 0 <= i < MAX_CAMS:
+            status[ST_CAM_STATE + i] = STATES.index(state)
+
+    for i in settings["cams"]:
+        on_state(i, "connecting", "")
+    current = int(status[ST_CAM])
+    cams = CameraSet(settings["cams"], on_state=on_state).start(active=current)
+    last_seq = 0
+    last_info = 0.0
+
+    while True:
+        for cmd in _drain(cmd_q):
+            if cmd.get("cmd") == "set_cam":
+                current = int(cmd["index"])
+                status[ST_CAM] = current
+                cams.set_active(current)
+                last_seq = 0
+            elif cmd.get("cmd") == "stop":
+                cams.stop()
+                return
+        status[ST_CAPTURE_BEAT] = time.time()
+        if _parent_gone():
+            return
+        if time.time() - last_info > 1.0:
+            last_info = time.time()
+            for i, sup in cams.cams.items():
+                if 0 <= i < MAX_CAMS:
+                    inf = sup.info()
+                    base = ST_CAM_INFO + i * len(CAM_INFO_FIELDS)
+                    for k, field in enumerate(CAM_INFO_FIELDS):
+                        status[base + k] = float(inf.get(field, 0) or 0)
+
+        sup = cams.get(current)
+        if sup is None or sup.state != "online":
+            time.sleep(0.3)   # reconnect happens in the supervisor thread, not here
+            continue
+        item = sup.latest(last_seq, timeout=0.5)
+        if item is None:
+            continue
+        last_seq, frame = item
+        h, w = frame.shape[:2]
+        raw.write(frame, h, w, tag=current)
+
+
+def _parent_gone():
+    parent = mp.parent_process()
+    return parent is not None and not parent.is_alive()
+
+
+def _profile_cmd(cmd, event_q):
+    """"profile" command: sample this process's threads (profiler.py), answer on event_q."""
+    from profiler import profile
+    try:
+        result = profile(cmd["seconds"], None, cmd.get("interval", 0.005), cmd.get("memory", True),
+                         prefix="engine/")
+    except Exception as e:
+        result = {"error": str(e)}
+    event_q.put({"type": "profile", "id": cmd["id"], "result": result})
+
+
+def engine_main(settings, cmd_q, event_q, status):
+    """
+    Owns the model; raw ring -> track -> crossings (events) + annotated JPEG ring.
+    With settings["pipeline_workers"] > 1 detection is spread over N detector
+    processes (pipeline.py) and only tracking + counting run here, in frame order.
+    """
+    import cv2
+    from image_store import ImageStore
+    from clips import ClipRecorder
+    from harvester import SampleHarvester
+    from snapshot import SnapshotManager, Uncommitted, ENGINE_SNAPSHOT_PATH, fresh_tracks
+    from inspection import LineCounter, extract_detections, crossing_event, draw_overlay, draw_detections
+
+    raw = ShmRing.attach(*settings["raw_ring"])
+    jpg = ShmRing.attach(*settings["jpeg_ring"])
+    cfg = dict(settings["config"])
+    store = ImageStore(settings["capture_dir"])
+    # rate-limited push (10 fps) here; encoding in its own thread, result to the web tier
+    # through event_q — after the crossing that carried the path, so after its row
+    clips = ClipRecorder(on_done=lambda path, ok: event_q.put({"type": "clip", "path": path, "ok": ok})).start()
+    workers = settings.get("pipeline_workers", 0)
+    mgr = pipe = None
+    if workers > 1:
+        from pipeline import PipelinedTracker
+        pipe = PipelinedTracker(cfg["model_path"], workers=workers, conf=cfg["conf_thresh"]).start()
+    else:
+        from model_manager import ModelManager
+        mgr = ModelManager(cfg["model_path"])
+    counter = LineCounter()
+    # tracks survive an engine crash/restart: restored (as ghosts) on the first frame
+    snaps = SnapshotManager(ENGINE_SNAPSHOT_PATH).start()
+    boot = snaps.load()
+    uncommitted = Uncommitted()   # released by "committed" commands from the web tier's BatchWriter
+    cascade = None
+    harvester = None
+    status[ST_READY] = 1.0
+    started = time.time()
+    model_state = None
+    last_out = None
+    fps = 0.0
+    last_check = time.time()
+
+    def publish(frame, cam, annotated, dets):
+        nonlocal fps, last_out, harvester, boot
+        now = datetime.now()
+        counter.keep_best = not cfg["cascade_classifier"]
+        clips.push(cam, frame)
+        if cfg["harvest_enabled"] and harvester is None:
+            harvester = SampleHarvester()
+        harvest = harvester if cfg["harvest_enabled"] else None
+        if harvest is not None:
+            harvest.observe(dets)
+        if boot is not None:
+            n = counter.restore(fresh_tracks(boot, cam), now)
+            if n:
+                print(f"[engine] {n} tracks restored from snapshot (CAM {cam})")
+            boot = None
+        crossings = counter.update(dets, frame.shape[1], cfg["line_rel_pos"], now)
+        counter.cleanup(now)
+        # "counted" only reaches the snapshot once the row is committed (snapshot.Uncommitted)
+        for c in crossings:
+            uncommitted.add(cam, c["tid"])
+        tracks, committed = uncommitted.hide(cam, counter.export_state(now))
+        snaps.put("tracks", {"cam": cam, "ts": time.time(), "tracks": tracks}, flush=committed)
+        for c in crossings:
+            event_q.put(crossing_event(frame, c, cfg, now, cam, store, clips))
+            if harvest is not None:
+                harvest.consider(frame, c, cfg, cam, now)
+
+        auto_hide = settings["auto_hide_line_after"]
+        show_line = settings["show_line"] and not (auto_hide and time.time() - started > auto_hide)
+        draw_overlay(annotated, cfg["line_rel_pos"], show_line, int(status[ST_GOOD]), int(status[ST_DEFECT]))
+        ok, buf = cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        if ok:
+            jpg.write(buf, annotated.shape[0], annotated.shape[1], tag=cam)
+
+        # inspected frames per second (throughput, not 1/latency)
+        t = time.perf_counter()
+        if last_out is not None and t > last_out:
+            fps = 0.9 * fps + 0.1 / (t - last_out)
+        last_out = t
+        status[ST_FPS] = fps
+
+    last_seq = 0
+    while True:
+        for cmd in _drain(cmd_q):
+            if cmd.get("cmd") == "config":
+                new = cmd["values"]
+                if cascade is not None and new.get("cascade_classifier") \
+                        and new["cascade_classifier"] != cfg.get("cascade_classifier"):
+                    cascade.swap_classifier(new["cascade_classifier"])
+                if new.get("model_path") and new["model_path"] != cfg.get("model_path"):
+                    if pipe is not None:
+                        pipe.swap_model(new["model_path"])
+                    else:
+                        mgr.request_swap(new["model_path"], conf=new.get("conf_thresh", 0.25))
+                cfg = dict(new)
+            elif cmd.get("cmd") == "committed":
+                uncommitted.commit(cmd["keys"])
+            elif cmd.get("cmd") == "profile":
+                threading.Thread(target=_profile_cmd, args=(cmd, event_q), daemon=True,
+                                 name="profiler").start()
+            elif cmd.get("cmd") == "stop":
+                if pipe is not None:
+                    pipe.stop()
+                snaps.stop()
+                return
+        status[ST_ENGINE_BEAT] = time.time()
+        if time.time() - last_check > 1.0:
+            last_check = time.time()
+            if _parent_gone():
+                if pipe is not None:
+                    pipe.stop()
+                return
+        if mgr is not None and mgr.status != model_state:
+            model_state = dict(mgr.status)
+            event_q.put({"type": "model", "status": model_state})
+
+        try:
+            if pipe is not None:
+                pipe.conf = cfg["conf_thresh"]
+                item = raw.read_frame(last_seq)
+                if item is not None:
+                    last_seq, frame, cam = item
+                    if not pipe.submit(frame, cam):
+                        last_seq -= 1  # all workers busy: retry with the newest frame later
+                for frame, cam, dets in pipe.poll(timeout=0.003):
+                    publish(frame, cam, draw_detections(frame.copy(), dets), dets)
+                continue
+
+            item = raw.read_frame(last_seq)
+            if item is None:
+                time.sleep(0.003)
+                continue
+            last_seq, frame, cam = item
+
+            model = mgr.current()
+            if cfg["cascade_classifier"]:
+                if cascade is None:
+                    from cascade import CascadeInspector
+                    cascade = CascadeInspector(cfg["cascade_classifier"])
+                dets, annotated = cascade.infer(model, frame, cfg)
+                publish(frame, cam, annotated, dets)
+                continue
+            results = model.track(source=frame, persist=True, conf=cfg["conf_thresh"], verbose=False)
+            if len(results) == 0:
+                publish(frame, cam, frame.copy(), [])
+            else:
+                res = results[0]
+                publish(frame, cam, res.plot(), extract_detections(res, model.names))
+        except Exception as e:
+            print("[engine] ERROR:", e)
+            traceback.print_exc()
+
+
+# ====================================================================
+# SUPERVISOR (runs in the web process)
+# ====================================================================
+class EngineSupervisor:
+    RAW_SLOTS, RAW_BYTES = 4, 1920 * 1080 * 3
+    JPEG_SLOTS, JPEG_BYTES = 4, 2 * 1024 * 1024
+
+    def __init__(self, config, cams, on_event, capture_dir="captured",
+                 show_line=True, auto_hide_line_after=3.0, stall_timeout=15.0, pipeline_workers=0,
+                 on_clip=None):
+        self.ctx = mp.get_context("spawn")  # same behaviour on Windows and Linux; CUDA-safe
+        self.config = config
+        self.on_event = on_event
+        self.on_clip = on_clip   # on_clip(path, ok): clip encoded in the engine process
+        self.stall_timeout = stall_timeout
+        tag = f"qc{os.getpid()}"
+        self.raw = ShmRing.create(f"{tag}_raw", self.RAW_SLOTS, self.RAW_BYTES)
+        self.jpeg = ShmRing.create(f"{tag}_jpeg", self.JPEG_SLOTS, self.JPEG_BYTES)
+        self.status = self.ctx.Array("d", STATUS_LEN, lock=False)
+        self.status[ST_CAM] = cams[0]
+        self.settings = {
+            "cams": tuple(cams),
+            "raw_ring": (self.raw.shm.name, self.RAW_SLOTS, self.RAW_BYTES),
+            "jpeg_ring": (self.jpeg.shm.name, self.JPEG_SLOTS, self.JPEG_BYTES),
+            "capture_dir": capture_dir,
+            "show_line": show_line,
+            "auto_hide_line_after": auto_hide_line_after,
+            "pipeline_workers": pipeline_workers,
+        }
+        self.model_status = {"state": "starting"}
+        self._profiles = {}  # request id -> [Event, result] (profile())
+        self._procs = {}    # name -> (process, cmd_q)
+        self.event_q = None
+        self._stop = threading.Event()
+        config.subscribe(self._on_config)
+        ENGINE_FPS.fn = lambda: {(): self.status[ST_FPS]}
+        self._export_camera_metrics()
+
+    def _export_camera_metrics(self):
+        # the camera gauges live in the capture process; re-export them from the status array
+        from camera import STATES, CAM_STATE, CAM_FPS, CAM_LATENCY
+        cams = self.settings["cams"]
+        CAM_STATE.fn = lambda: {(("cam", str(i)),): STATES.index(self.camera_state(i)) for i in cams}
+        CAM_FPS.fn = lambda: {(("cam", str(i)),): self.camera_info(i).get("measured_fps", 0) for i in cams}
+        CAM_LATENCY.fn = lambda: {(("cam", str(i)),): self.camera_info(i).get("latency_ms", 0) for i in cams}
+
+    # ----------------- CHILDREN -----------------
+    def _spawn(self, name):
+        cmd_q = self.ctx.Queue()
+        if name == "capture":
+            args = (self.settings, cmd_q, self.status)
+            target = capture_main
+        else:
+            # fresh queue: a killed child may have died holding the old queue's lock.
+            # Crossings it queued before dying are handed on first, not lost.
+            self._drain_events(self.event_q)
+            self.event_q = self.ctx.Queue()
+            self.status[ST_READY] = 0.0
+            args = (dict(self.settings, config=dict(self.config.snapshot())), cmd_q, self.event_q, self.status)
+            target = engine_main
+        # daemonic processes can't have children -> the engine is non-daemon when it
+        # runs its own detector pool; stop() (atexit) and _parent_gone() clean up
+        daemon = not (name == "engine" and self.settings["pipeline_workers"] > 1)
+        p = self.ctx.Process(target=target, args=args, daemon=daemon, name=f"qc-{name}")
+        p.start()
+        self._procs[name] = (p, cmd_q)
+        print(f"[supervisor] {name} started (pid {p.pid})")
+
+    def start(self):
+        self._spawn("capture")
+        self._spawn("engine")
+        threading.Thread(target=self._monitor, daemon=True, name="engine-monitor").start()
+        threading.Thread(target=self._pump, daemon=True, name="engine-events").start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        for name, (p, q) in list(self._procs.items()):
+            try: q.put({"cmd": "stop"})
+            except Exception: pass
+            p.join(2.0)
+            if p.is_alive():
+                p.terminate()
+        self.raw.close()
+        self.jpeg.close()
+
+    def _stalled(self, name):
+        now = time.time()
+        if name == "capture":
+            beat = self.status[ST_CAPTURE_BEAT]
+            return beat and now - beat > self.stall_timeout
+        # model loading may take a while: only judge the heartbeat once READY
+        beat = self.status[ST_ENGINE_BEAT]
+        return self.status[ST_READY] and beat and now - beat > self.stall_timeout
+
+    def _monitor(self):
+        backoff = {"capture": 1.0, "engine": 1.0}
+        while not self._stop.wait(1.0):
+            for name in ("capture", "engine"):
+                p, _ = self._procs[name]
+                alive = p.is_alive()
+                if alive and not self._stalled(name):
+                    backoff[name] = max(1.0, backoff[name] / 2)
+                    continue
+                why = "stalled" if alive else f"exited ({p.exitcode})"
+                print(f"[supervisor] {name} {why}, restarting in {backoff[name]:.0f}s")
+                if alive:
+                    p.terminate(); p.join(5.0)
+                if self._stop.wait(backoff[name]):
+                    return
+                backoff[name] = min(backoff[name] * 2, 60.0)
+                ENGINE_RESTARTS.inc(proc=name)
+                if name == "capture":
+                    self.status[ST_CAPTURE_BEAT] = 0.0
+                else:
+                    self.status[ST_ENGINE_BEAT] = 0.0
+                self._spawn(name)
+
+    def _pump(self):
+        while not self._stop.is_set():
+            q = self.event_q
+            try:
+                ev = q.get(timeout=0.5)
+            except (queue.Empty, EOFError, OSError):
+                continue
+            self._handle(ev)
+
+    def _drain_events(self, q):
+        """Hand on whatever is left in a dead engine's queue (never blocks)."""
+        n = 0
+        while q is not None:
+            try:
+                ev = q.get_nowait()
+            except (queue.Empty, EOFError, OSError):
+                break
+            self._handle(ev)
+            n += 1
+        if n:
+            print(f"[supervisor] {n} events recovered from the previous engine")
+
+    def _handle(self, ev):
+        if ev.get("type") == "model":
+            self.model_status = ev["status"]
+            return
+        if ev.get("type") == "clip":
+            if self.on_clip is not None:
+                self.on_clip(ev["path"], ev["ok"])
+            return
+        if ev.get("type") == "profile":
+            slot = self._profiles.get(ev["id"])
+            if slot is not None:
+                slot[1] = ev["result"]
+                slot[0].set()
+            return
+        try:
+            self.on_event(ev)
+        except Exception as e:
+            print("[supervisor] event handler error:", e)
+            traceback.print_exc()
+
+    # ----------------- WEB TIER API -----------------
+    def send(self, name, cmd):
+        proc = self._procs.get(name)
+        if proc is not None:
+            proc[1].put(cmd)
+
+    def committed(self, keys):
+        """Rows of these (cam, object_id) crossings are committed (BatchWriter on_commit)."""
+        if keys:
+            self.send("engine", {"cmd": "committed", "keys": keys})
+
+    def _on_config(self, old, new):
+        self.send("engine", {"cmd": "config", "values": dict(new)})
+
+    def set_camera(self, index):
+        self.send("capture", {"cmd": "set_cam", "index": index})
+
+    def profile(self, seconds, interval=0.005, memory=True, timeout=30.0):
+        """Sampling profile of the engine process (blocks ~seconds). TimeoutError if it never answers."""
+        req = os.urandom(6).hex()
+        slot = self._profiles[req] = [threading.Event(), None]
+        try:
+            self.send("engine", {"cmd": "profile", "id": req, "seconds": seconds,
+                                 "interval": interval, "memory": memory})
+            if not slot[0].wait(seconds + timeout):
+                raise TimeoutError("engine did not answer the profile request (restarting?)")
+            return slot[1]
+        finally:
+            self._profiles.pop(req, None)
+
+    def camera_state(self, index):
+        from camera import STATES
+        if not 0 <= index < MAX_CAMS:
+            return "offline"
+        code = int(self.status[ST_CAM_STATE + index])
+        return STATES[code] if 0 <= code < len(STATES) else "offline"
+
+    def camera_ok(self, index):
+        return self.camera_state(index) == "online"
+
+    def camera_info(self, index):
+        """Negotiated width/height/fps + measured fps/latency, as reported by the capture process."""
+        if not 0 <= index < MAX_CAMS or not self.camera_ok(index):
+            return {}
+        base = ST_CAM_INFO + index * len(CAM_INFO_FIELDS)
+        return {f: round(self.status[base + k], 2) for k, f in enumerate(CAM_INFO_FIELDS)}
+
+    def camera_status(self):
+        return {i: {"state": self.camera_state(i), "source": self.camera_info(i)}
+                for i in self.settings["cams"]}
+
+    def set_counts(self, good, defect):
+        self.status[ST_GOOD] = good
+        self.status[ST_DEFECT] = defect
+
+    def latest_jpeg(self, after_seq=0):
+        """(seq, jpeg bytes) of the newest annotated frame, or None."""
+        item = self.jpeg.read_latest(after_seq)
+        return None if item is None else (item[0], item[1])
@@ -0,0 +1,206 @@
+# export.py — STREAMING BULK EXPORT OF INSPECTION RECORDS (CSV / Parquet)
+#
+#   SELECT ... ORDER BY id  ──server-side cursor (stream_results)──▶ chunks of CHUNK_ROWS
+#        ├─▶ CSV:     one text chunk per partition, straight into the HTTP response
+#        └─▶ Parquet: one part-NNNNN.parquet file per partition (polars), in a folder
+#
+# Memory stays at one chunk no matter how big `bottle` is: MySQL (PyMySQL/mysqlclient)
+# gets an unbuffered SSCursor, SQLite steps its cursor. The connection is held for the
+# whole export, so it is a dedicated one from the engine, never the request session.
+#
+# Filters: since / until (timestamp, "YYYY-MM-DD[ HH:MM:SS]", until exclusive),
+# category (comma list, "defect" = all defect classes), cam (camera index).
+#
+# CLI (same DB_MODE / MYSQL_URI / SQLITE_URI env as the app):
+#   python export.py --since 2025-01-01 --until 2025-02-01 --category defect -o jan.csv
+#   python export.py --format parquet --cam 1 -o exports/cam1/
+
+import os, io, re, csv, time, zlib
+
+from sqlalchemy import select, func, and_, or_
+
+from inspection import GOOD_KEY, DEFECT_KEYS
+
+CHUNK_ROWS = 5000
+EXPORT_DIR = "exports"
+COLUMNS = ("id", "timestamp", "category", "confidence", "cam", "object_id", "image_path", "clip_path")
+
+
+def parse_categories(value):
+    """"Normal,defect" -> {"Normal", <all defect keys>}; None/"" = all."""
+    if not value:
+        return None
+    cats = set()
+    for c in str(value).split(","):
+        c = c.strip()
+        if c.lower() == "defect":
+            cats |= DEFECT_KEYS
+        elif c.lower() in ("good", GOOD_KEY.lower()):
+            cats.add(GOOD_KEY)
+        elif c:
+            cats.add(c)
+    return cats
+
+
+_TS = re.compile(r"\d{4}-\d{2}-\d{2}( \d{2}:\d{2}(:\d{2})?)?")
+
+
+def parse_filters(args):
+    """Query args / JSON body -> build_query kwargs. ValueError on bad input."""
+    out = {}
+    for key in ("since", "until"):
+        v = (args.get(key) or "").strip().replace("T", " ")
+        if v:
+            if not _TS.fullmatch(v):
+                raise ValueError(f"{key}: expected YYYY-MM-DD[ HH:MM[:SS]]")
+            out[key] = v
+    out["categories"] = parse_categories(args.get("category"))
+    cam = args.get("cam")
+    if cam not in (None, ""):
+        out["cam"] = int(cam)
+    return out
+
+
+def build_query(table, since=None, until=None, categories=None, cam=None):
+    t = table
+    cond = []
+    if since:
+        cond.append(t.c.timestamp >= since)
+    if until:
+        cond.append(t.c.timestamp < until)
+    if categories:
+        cond.append(t.c.category.in_(sorted(categories)))
+    if cam is not None:
+        # rows from before the cam column: the camera is in the sharded image path
+        cond.append(or_(t.c.cam == int(cam),
+                        and_(t.c.cam.is_(None), t.c.image_path.like(f"%/cam{int(cam)}/%"))))
+    q = select(*[t.c[c] for c in COLUMNS]).order_by(t.c.id)
+    return q.where(and_(*cond)) if cond else q
+
+
+def iter_chunks(engine, query, chunk_rows=CHUNK_ROWS):
+    """Row lists of at most chunk_rows, read through a server-side cursor."""
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(query)
+        for part in result.partitions():
+            yield part
+
+
+# ====================================================================
+# CSV
+# ====================================================================
+def iter_csv(engine, query, chunk_rows=CHUNK_ROWS, header=True):
+    """CSV text, one string per chunk (header first)."""
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    if header:
+        w.writerow(COLUMNS)
+    for rows in iter_chunks(engine, query, chunk_rows):
+        w.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def gzip_stream(chunks, level=6):
+    """Compress a text stream on the fly (Content-Encoding: gzip), chunk by chunk."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)   # wbits 31 = gzip container
+    for chunk in chunks:
+        data = z.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield z.flush()
+
+
+def write_csv(engine, query, path, chunk_rows=CHUNK_ROWS):
+    n = 0
+    tmp = path + ".part"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(COLUMNS)
+        for rows in iter_chunks(engine, query, chunk_rows):
+            w.writerows(rows)
+            n += len(rows)
+    os.replace(tmp, path)
+    return n
+
+
+# ====================================================================
+# PARQUET (polars, one file per chunk -> constant memory)
+# ====================================================================
+def _parquet_schema():
+    import polars as pl
+    return {"id": pl.Int64, "timestamp": pl.Utf8, "category": pl.Utf8, "confidence": pl.Float64,
+            "cam": pl.Int32, "object_id": pl.Int64, "image_path": pl.Utf8, "clip_path": pl.Utf8}
+
+
+def write_parquet(engine, query, out_dir, chunk_rows=CHUNK_ROWS * 10, job=None, total=None):
+    """
+    out_dir/part-00000.parquet, part-00001.parquet, ... (zstd). Read back as one
+    table with pl.scan_parquet(f"{out_dir}/*.parquet") or pandas.read_parquet(out_dir).
+    Returns {"rows", "files"}.
+    """
+    import polars as pl
+    schema = _parquet_schema()
+    os.makedirs(out_dir, exist_ok=True)
+    rows_done, files = 0, []
+    for i, rows in enumerate(iter_chunks(engine, query, chunk_rows)):
+        df = pl.DataFrame([tuple(r) for r in rows], schema=schema, orient="row")
+        path = os.path.join(out_dir, f"part-{i:05d}.parquet")
+        df.write_parquet(path + ".part", compression="zstd")
+        os.replace(path + ".part", path)
+        files.append(path.replace(os.sep, "/"))
+        rows_done += len(rows)
+        if job is not None:
+            if job.cancelled:
+                break
+            job.report(min(0.99, rows_done / total) if total else None, f"{rows_done} rows, {len(files)} files")
+    return {"rows": rows_done, "files": files}
+
+
+def export_job(job, engine, table, out_dir, since=None, until=None, categories=None, cam=None):
+    """JobManager entry point for POST /export/parquet."""
+    query = build_query(table, since, until, categories, cam)
+    with engine.connect() as conn:
+        total = conn.execute(select(func.count()).select_from(query.order_by(None).subquery())).scalar()
+    t0 = time.time()
+    res = write_parquet(engine, query, out_dir, job=job, total=total)
+    print(f"[export] {res['rows']} rows -> {out_dir} ({len(res['files'])} files, {time.time() - t0:.1f}s)")
+    return {"dir": out_dir.replace(os.sep, "/"), **res}
+
+
+# ====================================================================
+# CLI
+# ====================================================================
+if __name__ == "__main__":
+    import argparse
+    from db_engine import standalone_engine
+    from models import Bottle
+
+    ap = argparse.ArgumentParser(description="Export inspection records (constant memory)")
+    ap.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    ap.add_argument("-o", "--output", help="CSV file ('-' = stdout) or Parquet folder")
+    ap.add_argument("--since", help='timestamp >= "YYYY-MM-DD[ HH:MM:SS]"')
+    ap.add_argument("--until", help='timestamp < "YYYY-MM-DD[ HH:MM:SS]"')
+    ap.add_argument("--category", help='comma list, "defect" = all defect classes')
+    ap.add_argument("--cam", type=int)
+    ap.add_argument("--chunk", type=int, default=None, help="rows per chunk / Parquet file")
+    args = ap.parse_args()
+
+    eng = standalone_engine()
+    q = build_query(Bottle.__table__, args.since, args.until, parse_categories(args.category), args.cam)
+    t0 = time.time()
+    if args.format == "csv":
+        if args.output in (None, "-"):
+            import sys
+            for text in iter_csv(eng, q, args.chunk or CHUNK_ROWS):
+                sys.stdout.write(text)
+        else:
+            n = write_csv(eng, q, args.output, args.chunk or CHUNK_ROWS)
+            print(f"[export] {n} rows -> {args.output} ({time.time() - t0:.1f}s)")
+    else:
+        out = args.output or os.path.join(EXPORT_DIR, time.strftime("bottle_%Y%m%d_%H%M%S"))
+        res = write_parquet(eng, q, out, args.chunk or CHUNK_ROWS * 10)
+        print(f"[export] {res['rows']} rows -> {out} ({len(res['files'])} files, {time.time() - t0:.1f}s)")
@@ -0,0 +1,194 @@
+# harvester.py — ACTIVE-LEARNING SAMPLE HARVESTER (config: harvest_enabled)
+# Replaces hand-picking files from captured/ (see test/conf_test.py): the worker
+# feeds every frame's detections in, and at each crossing the track is judged:
+#
+#   low_margin  best label conf - runner-up label conf < harvest_margin
+#               (or best conf itself below conf_thresh + harvest_margin)
+#   flip        the per-frame label changed at least harvest_min_flips times
+#   disagree    < harvest_agreement of the frames voted for the final label
+#
+# Candidates are saved as a YOLO dataset (crop + label file with the predicted
+# box as pseudo-label, for review in a labeling tool):
+#
+#   dataset/harvest/images/YYYY-MM-DD/<reason>_<ts>_<tid>.jpg
+#   dataset/harvest/labels/YYYY-MM-DD/<reason>_<ts>_<tid>.txt
+#   dataset/harvest/data.yaml, meta.jsonl (why each sample was taken)
+#
+# Near-duplicates are dropped with a 64-bit dHash compared against a rolling
+# window of the last HASH_WINDOW saved samples (Hamming distance <= harvest_hamming),
+# so a stuck bottle or an idle conveyor gives one sample, not thousands.
+
+import os, json, time
+from collections import deque
+
+import cv2
+import numpy as np
+
+import metrics
+from inspection import GOOD_KEY, DEFECT_KEYS
+
+HARVEST_DIR = os.path.join("dataset", "harvest")
+CLASS_NAMES = sorted({GOOD_KEY} | DEFECT_KEYS)   # YOLO class ids = index in this list
+HASH_WINDOW = 5000
+CROP_PAD = 0.15
+
+HARVESTED = metrics.Counter("harvest_samples_total", "Active-learning samples saved / skipped")
+
+
+def dhash(img, size=8):
+    """64-bit difference hash (grayscale, (size+1) x size): robust to small shifts / exposure."""
+    g = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    g = cv2.resize(g, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (g[:, 1:] > g[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class HashIndex:
+    """Rolling window of hashes; near-duplicate = Hamming distance <= max_dist to any of them."""
+
+    def __init__(self, window=HASH_WINDOW):
+        self.hashes = np.zeros(window, dtype=np.uint64)
+        self.n = 0
+        self.head = 0
+
+    def add(self, h):
+        self.hashes[self.head] = np.uint64(h)
+        self.head = (self.head + 1) % len(self.hashes)
+        self.n = min(self.n + 1, len(self.hashes))
+
+    def near(self, h, max_dist):
+        if not self.n:
+            return False
+        x = np.bitwise_xor(self.hashes[:self.n], np.uint64(h))
+        dist = np.unpackbits(x.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        return bool((dist <= max_dist).any())
+
+
+class SampleHarvester:
+    def __init__(self, root=HARVEST_DIR):
+        self.root = root
+        self.tracks = {}          # tid -> per-track label history
+        self.index = HashIndex()
+        self._recent = deque()    # save timestamps (per-hour cap)
+        os.makedirs(root, exist_ok=True)
+        self._write_data_yaml()
+        self._load_index()
+
+    def _write_data_yaml(self):
+        path = os.path.join(self.root, "data.yaml")
+        if os.path.exists(path):
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# harvested by the QC worker — review labels before training\n")
+            f.write(f"path: {os.path.abspath(self.root)}\ntrain: images\nval: images\n")
+            f.write("names:\n" + "".join(f"  {i}: {n}\n" for i, n in enumerate(CLASS_NAMES)))
+
+    def _load_index(self):
+        """Rebuild the rolling index from the tail of meta.jsonl (survives restarts)."""
+        path = os.path.join(self.root, "meta.jsonl")
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            tail = deque(f, maxlen=len(self.index.hashes))
+        for line in tail:
+            try:
+                self.index.add(int(json.loads(line)["dhash"], 16))
+            except (ValueError, KeyError):
+                continue
+        print(f"[harvest] {self.index.n} hashes loaded from {path}")
+
+    # ----------------- EVERY FRAME -----------------
+    def observe(self, dets, now=None):
+        """Per-frame label history for every tracked box (cheap dict updates only)."""
+        now = now or time.time()
+        for tid, label, conf, _box in dets:
+            if tid is None or conf <= 0:
+                continue  # no id / not classified yet (cascade "pending")
+            st = self.tracks.get(tid)
+            if st is None:
+                st = self.tracks[tid] = {"best": {}, "votes": {}, "last": label, "flips": 0, "seen": now}
+            if label != st["last"]:
+                st["flips"] += 1
+                st["last"] = label
+            st["best"][label] = max(conf, st["best"].get(label, 0.0))
+            st["votes"][label] = st["votes"].get(label, 0) + 1
+            st["seen"] = now
+        if len(self.tracks) > 500:
+            for t in [t for t, s in self.tracks.items() if now - s["seen"] > 60]:
+                del self.tracks[t]
+
+    # ----------------- AT THE CROSSING -----------------
+    def reasons(self, tid, label, cfg):
+        st = self.tracks.get(tid)
+        if st is None:
+            return [], {}
+        ranked = sorted(st["best"].values(), reverse=True)
+        best = ranked[0] if ranked else 0.0
+        margin = best - (ranked[1] if len(ranked) > 1 else 0.0)
+        total = sum(st["votes"].values())
+        agreement = st["votes"].get(label, 0) / total if total else 1.0
+        why = []
+        if margin < cfg["harvest_margin"] or best < cfg["conf_thresh"] + cfg["harvest_margin"]:
+            why.append("low_margin")
+        if st["flips"] >= cfg["harvest_min_flips"]:
+            why.append("flip")
+        if agreement < cfg["harvest_agreement"]:
+            why.append("disagree")
+        return why, {"margin": round(margin, 4), "best": round(best, 4), "flips": st["flips"],
+                     "agreement": round(agreement, 3), "frames": total}
+
+    def consider(self, frame, crossing, cfg, cam, now):
+        """Judge a crossed track; save crop + YOLO label if it is an interesting, new sample."""
+        tid, label, box = crossing["tid"], crossing["label"], crossing["box"]
+        why, stats = self.reasons(tid, label, cfg)
+        self.tracks.pop(tid, None)
+        if not why:
+            return None
+
+        t = time.time()
+        while self._recent and t - self._recent[0] > 3600:
+            self._recent.popleft()
+        if len(self._recent) >= cfg["harvest_max_per_hour"]:
+            HARVESTED.inc(result="rate_limited")
+            return None
+
+        fh, fw = frame.shape[:2]
+        x1, y1, x2, y2 = box
+        px, py = (x2 - x1) * CROP_PAD, (y2 - y1) * CROP_PAD
+        cx1, cy1 = max(0, int(x1 - px)), max(0, int(y1 - py))
+        cx2, cy2 = min(fw, int(x2 + px)), min(fh, int(y2 + py))
+        crop = frame[cy1:cy2, cx1:cx2]
+        if crop.size == 0:
+            return None
+
+        h = dhash(crop)
+        if self.index.near(h, cfg["harvest_hamming"]):
+            HARVESTED.inc(result="duplicate")
+            return None
+
+        day = now.strftime("%Y-%m-%d")
+        name = f"{why[0]}_{now.strftime('%Y%m%d_%H%M%S')}_{now.microsecond // 1000:03d}_t{tid}"
+        img_dir = os.path.join(self.root, "images", day)
+        lbl_dir = os.path.join(self.root, "labels", day)
+        os.makedirs(img_dir, exist_ok=True)
+        os.makedirs(lbl_dir, exist_ok=True)
+        img_path = os.path.join(img_dir, name + ".jpg")
+        if not cv2.imwrite(img_path, crop, [cv2.IMWRITE_JPEG_QUALITY, 95]):
+            return None
+
+        # pseudo-label: the tracked box, normalized to the crop
+        cw, ch = cx2 - cx1, cy2 - cy1
+        bx, by = ((x1 + x2) / 2 - cx1) / cw, ((y1 + y2) / 2 - cy1) / ch
+        bw, bh = (x2 - x1) / cw, (y2 - y1) / ch
+        cls = CLASS_NAMES.index(label) if label in CLASS_NAMES else CLASS_NAMES.index(GOOD_KEY)
+        with open(os.path.join(lbl_dir, name + ".txt"), "w") as f:
+            f.write(f"{cls} {bx:.6f} {by:.6f} {min(bw, 1):.6f} {min(bh, 1):.6f}\n")
+
+        meta = {"file": img_path.replace(os.sep, "/"), "ts": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "cam": cam, "tid": tid, "label": label, "reasons": why, "dhash": f"{h:016x}", **stats}
+        with open(os.path.join(self.root, "meta.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(meta) + "\n")
+        self.index.add(h)
+        self._recent.append(t)
+        HARVESTED.inc(result="saved")
+        return img_path
@@ -0,0 +1,136 @@
+# http_cache.py — RESPONSE CACHE + ETag/304 FOR POLLED APIs, HASHED STATIC URLs
+# Dashboards poll /stats, /stats_detail, /live_counts and /api/analysis_data every
+# few seconds, but the answer only changes when `bottle` rows change. ResponseCache
+# keeps the last body per (path, query) together with a data version (app.py:
+# data_version() = rows committed by the BatchWriter / deleted by retention / resets):
+#
+#   same version + If-None-Match matches -> 304, no body, no DB query
+#   same version                         -> cached body, no DB query
+#   new version                          -> view runs once (under a lock), body cached
+#
+# JSON is sent with "Cache-Control: no-cache": the browser keeps it and revalidates
+# every poll with If-None-Match, so an idle dashboard costs one tiny 304 per poll.
+#
+# Static files: templates use {{ asset('main.css') }} -> /static/main.css?v=<content hash>.
+# A request whose ?v= matches the file's current hash gets a 1-year immutable
+# Cache-Control; edit the file and the URL changes by itself (no more manual ?v=3).
+
+import os, hashlib, threading, functools
+from collections import OrderedDict
+
+from flask import request, make_response, Response, url_for
+
+import metrics
+
+STATIC_MAX_AGE = 365 * 24 * 3600
+IGNORED_ARGS = ("t", "_")   # old cache busters from tabs still running the previous JS
+
+CACHE_REQUESTS = metrics.Counter("http_cache_requests_total", "Cached API requests by result")
+
+
+class ResponseCache:
+    def __init__(self, version_fn, max_entries=64):
+        self.version_fn = version_fn
+        self.max_entries = max_entries
+        self._entries = OrderedDict()     # key -> (version, body, etag, mimetype)
+        self._lock = threading.Lock()
+        self._compute = threading.Lock()  # N pollers after a change -> 1 recompute
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __call__(self, view):
+        """Decorator for GET views whose output only depends on the data version + query."""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.path, tuple(sorted((k, v) for k, v in request.args.items(multi=True)
+                                              if k not in IGNORED_ARGS)))
+            version = self.version_fn()
+            entry = self._get(key)
+            result = "hit"
+            if entry is None or entry[0] != version:
+                with self._compute:
+                    entry = self._get(key)
+                    if entry is None or entry[0] != version:
+                        resp = make_response(view(*args, **kwargs))
+                        if resp.status_code != 200 or resp.is_streamed:
+                            CACHE_REQUESTS.inc(result="bypass")
+                            return resp   # errors are never cached
+                        body = resp.get_data()
+                        entry = (version, body, hashlib.sha1(body).hexdigest()[:20], resp.mimetype)
+                        self._put(key, entry)
+                        result = "miss"
+
+            _version, body, etag, mimetype = entry
+            if request.if_none_match.contains_weak(etag):
+                resp = Response(status=304)
+                result = "not_modified"
+            else:
+                resp = Response(body, mimetype=mimetype)
+            resp.set_etag(etag)
+            resp.headers["Cache-Control"] = "no-cache"
+            CACHE_REQUESTS.inc(result=result)
+            return resp
+        return wrapper
+
+
+def init_static_versioning(app):
+    """`asset(filename)` for templates + far-future caching of content-hashed static URLs."""
+    hashes = {}   # filename -> (mtime_ns, size, hash)
+    lock = threading.Lock()
+
+    def file_hash(filename):
+        path = os.path.join(app.static_folder, filename)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with lock:
+            cached = hashes.get(filename)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        with open(path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:10]
+        with lock:
+            hashes[filename] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    @app.template_global()
+    def asset(filename):
+        digest = file_hash(filename)
+        if digest is None:
+            return url_for("static", filename=filename)
+        return url_for("static", filename=filename, v=digest)
+
+    @app.after_request
+    def cache_static(resp):
+        if request.endpoint != "static" or resp.status_code not in (200, 304):
+            return resp
+        v = request.args.get("v")
+        filename = (request.view_args or {}).get("filename", "")
+        if v and v == file_hash(filename):
+            resp.cache_control.no_cache = None
+            resp.cache_control.max_age = STATIC_MAX_AGE
+            resp.cache_control.public = True
+            resp.cache_control.immutable = True
+        else:
+            # unversioned / stale hash: keep it, but revalidate (ETag) every time
+            resp.cache_control.no_cache = True
+            resp.cache_control.max_age = None
+        return resp
+
+    return asset
@@ -0,0 +1,64 @@
+# image_store.py — SHARDED, COLLISION-FREE CAPTURE STORAGE
+# Layout: captured/YYYY/MM/DD/HH/cam<N>/<label>_<YYYYmmdd_HHMMSS>_<ms>_<seq>_<hash>.jpg
+# - one directory per hour per camera keeps directories small (fast listing,
+#   os.remove, send_from_directory)
+# - ms + process sequence + content hash -> two bottles in the same second
+#   never overwrite each other, and a given URL always means the same bytes
+#   (safe to cache forever in the browser)
+
+import os, hashlib, itertools, threading
+from datetime import datetime
+
+import cv2
+
+
+class ImageStore:
+    def __init__(self, root="captured", quality=90):
+        self.root = root
+        self.quality = quality
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._dirs = set()
+        os.makedirs(root, exist_ok=True)
+
+    def shard_dir(self, now, cam):
+        return os.path.join(self.root, now.strftime("%Y"), now.strftime("%m"), now.strftime("%d"),
+                            now.strftime("%H"), f"cam{cam}")
+
+    def save(self, frame, label, cam=0, now=None):
+        """Encode + write atomically. Returns the path to store in Bottle.image_path ('' on failure)."""
+        now = now or datetime.now()
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            print("[store] JPEG encode failed")
+            return ""
+        data = buf.tobytes()
+        digest = hashlib.sha1(data).hexdigest()[:10]
+        with self._lock:
+            seq = next(self._seq) % 1_000_000
+
+        d = self.shard_dir(now, cam)
+        if d not in self._dirs:
+            os.makedirs(d, exist_ok=True)
+            self._dirs.add(d)
+        name = f"{label}_{now.strftime('%Y%m%d_%H%M%S')}_{now.microsecond // 1000:03d}_{seq:06d}_{digest}.jpg"
+        path = os.path.join(d, name)
+        try:
+            try:
+                self._write(path, data)
+            except FileNotFoundError:
+                # shard removed behind the cache (retention.remove_empty_dirs): recreate, retry once
+                os.makedirs(d, exist_ok=True)
+                self._write(path, data)
+        except OSError as e:
+            print("[store] write failed", path, e)
+            return ""
+        # always forward slashes in the DB, independent of the OS
+        return path.replace(os.sep, "/")
+
+    @staticmethod
+    def _write(path, data):
+        tmp = path + ".part"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
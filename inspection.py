@@ -0,0 +1,224 @@
+# inspection.py — REGION-BASED LINE COUNTER (core, no Flask / no camera)
+# Shared by the in-process worker (app.py) and the engine process (engine.py).
+# Rule: only count objects that were tracked on the LEFT of the line first and
+# then show up on the RIGHT — one count per tracker id.
+
+from datetime import timedelta
+
+import cv2
+
+GOOD_LABEL = "Normal"
+DEFECT_CLASSES = {"Touching_Characters", "Double_Print", "Missing_Text"}
+def norm(l): return l.strip().replace(" ", "_")
+GOOD_KEY = norm(GOOD_LABEL)
+DEFECT_KEYS = {norm(x) for x in DEFECT_CLASSES}
+PENDING = "pending"               # cascade.py: label of a track no classifier vote reached yet
+UNCLASSIFIED_KEY = "Unclassified"  # category of a bottle that crossed while still PENDING
+
+
+def extract_detections(res, names):
+    """
+    Ultralytics result -> list of (tid, label, conf, (x1, y1, x2, y2)).
+    SAFE extraction — YOLO may return empty boxes or id None.
+    """
+    boxes = res.boxes
+    if boxes is None or not len(boxes):
+        return []
+    xyxy_arr = boxes.xyxy.cpu().numpy()
+    confs = boxes.conf.cpu().tolist()
+    # cls/index safe
+    try:
+        clss = boxes.cls.int().cpu().tolist()
+    except Exception:
+        clss = [0] * len(xyxy_arr)
+    # ids can be None (no tracker id); handle that
+    if boxes.id is None:
+        ids = [None] * len(xyxy_arr)
+    else:
+        ids = boxes.id.int().cpu().tolist()
+
+    dets = []
+    for i, box in enumerate(xyxy_arr):
+        label = norm(names[clss[i]]) if clss and i < len(clss) else GOOD_KEY
+        dets.append((ids[i], label, float(confs[i]), tuple(float(v) for v in box)))
+    return dets
+
+
+def iou(a, b):
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+GHOST_IOU = 0.3   # min overlap for a new tracker id to take over a restored track
+GHOST_TTL = 3.0   # s after restore() that unclaimed restored tracks are kept
+
+
+class LineCounter:
+    """
+    track_state keyed by tracker id only (detections without a tracker id are skipped)
+    Structure: tid -> { seen_left:bool, counted:bool, best_label:str, best_conf:float, ts_first:datetime, box:tuple }
+    keep_best=False: take the latest label instead of the most confident one
+    (cascade mode — its label already aggregates all crops of the track).
+    """
+
+    def __init__(self, keep_best=True):
+        self.track_state = {}
+        self.keep_best = keep_best
+        self.ghosts = []          # restored tracks waiting for a new tracker id (snapshot.py)
+        self.ghosts_until = None
+
+    def export_state(self, now):
+        """Compact, serializable track list for the runtime snapshot."""
+        return [[tid, st["seen_left"], st["counted"], st["best_label"], round(st["best_conf"], 4),
+                 [round(v, 1) for v in st["box"]], round((now - st["ts_first"]).total_seconds(), 2)]
+                for tid, st in self.track_state.items() if st.get("box") is not None]
+
+    def restore(self, tracks, now):
+        """
+        Tracks from a snapshot taken before a restart. Tracker ids restart after a
+        restart, so they become ghosts: the first new id whose box overlaps one
+        (IoU >= GHOST_IOU) within GHOST_TTL inherits seen_left / counted / label ->
+        a bottle counted before the restart is not counted again, one that was
+        seen left of the line still counts when it crosses.
+        """
+        self.ghosts = [{"seen_left": bool(sl), "counted": bool(c), "best_label": label,
+                        "best_conf": float(conf), "box": tuple(box),
+                        "ts_first": now - timedelta(seconds=float(age))}
+                       for _tid, sl, c, label, conf, box, age in tracks]
+        self.ghosts_until = now + timedelta(seconds=GHOST_TTL)
+        return len(self.ghosts)
+
+    def _adopt(self, box, now):
+        if now > self.ghosts_until:
+            self.ghosts = []
+            return None
+        best, best_iou = None, GHOST_IOU
+        for g in self.ghosts:
+            o = iou(g["box"], box)
+            if o >= best_iou:
+                best, best_iou = g, o
+        if best is not None:
+            self.ghosts.remove(best)
+        return best
+
+    def update(self, dets, frame_w, line_rel_pos, now):
+        """Feed one frame of detections; returns the crossings that happened in it."""
+        LINE = int(frame_w * line_rel_pos)  # counting line
+        crossings = []
+
+        for tid, label, conf, box in dets:
+            # IMPORTANT: only count objects that were seen on the LEFT first.
+            # Without tracker id we can't verify "seen_left" across frames reliably, so skip those.
+            if tid is None:
+                continue
+
+            # centroid X
+            x1, y1, x2, y2 = box
+            cx = (x1 + x2) / 2.0
+
+            # init state for new track id (or take over a track restored from a snapshot)
+            if tid not in self.track_state:
+                ghost = self._adopt(box, now) if self.ghosts else None
+                self.track_state[tid] = ghost or {
+                    "seen_left": False,
+                    "counted": False,
+                    "best_label": label,
+                    "best_conf": conf,
+                    "ts_first": now
+                }
+
+            st = self.track_state[tid]
+            st["box"] = box
+
+            # update best label/confidence if improved
+            if conf > st["best_conf"] or not self.keep_best:
+                st["best_conf"] = conf
+                st["best_label"] = label
+
+            # mark seen_left if centroid on left half
+            if cx < LINE:
+                st["seen_left"] = True
+
+            # region-based event: if object was seen left and now is in right half (cx >= LINE)
+            if st["seen_left"] and not st["counted"] and cx >= LINE:
+                st["counted"] = True
+                crossings.append({"tid": tid, "label": st["best_label"],
+                                  "conf": st["best_conf"], "box": box})
+        return crossings
+
+    def cleanup(self, now):
+        """Drop old tracks to avoid memory growth."""
+        to_del = []
+        for tid, st in self.track_state.items():
+            age = (now - st["ts_first"]).total_seconds()
+            if st["counted"] and age > 10:
+                to_del.append(tid)
+            if age > 60:  # too old
+                to_del.append(tid)
+        for tid in to_del:
+            self.track_state.pop(tid, None)
+
+
+def crossing_event(frame, crossing, cfg, now, cam, store, clips=None):
+    """
+    Save the capture (per save_only_defect policy), queue the defect clip and
+    build the event dict that the web tier turns into a Bottle row + counter
+    update + lamp.
+    """
+    label = crossing["label"]
+    defect = label in DEFECT_KEYS
+    # never inspected (no crop / classifier had no opinion) -> own category, not Normal
+    category = label if defect else UNCLASSIFIED_KEY if label == PENDING else GOOD_KEY
+    fname = ""
+    if category != GOOD_KEY or not cfg["save_only_defect"]:   # unclassified: keep the image for review
+        fname = store.save(frame, category, cam=cam, now=now)
+    clip = ""
+    if defect and clips is not None and cfg.get("clip_on_defect", True):
+        clip = clips.trigger(cam, now, category)  # non-blocking; encoded in the background
+    return {
+        "type": "crossing",
+        "ts": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "category": category,
+        "label": label,
+        "confidence": float(crossing["conf"]),
+        "image_path": fname,
+        "clip_path": clip,
+        "object_id": crossing["tid"],
+        "cam": cam,
+        "defect": defect,
+    }
+
+
+def draw_detections(img, dets):
+    """Boxes + "id label conf" for detections that didn't come with a Results.plot()."""
+    for tid, label, conf, (x1, y1, x2, y2) in dets:
+        color = (0,200,0) if label == GOOD_KEY else (0,0,255) if label in DEFECT_KEYS else (160,160,160)
+        p1, p2 = (int(x1), int(y1)), (int(x2), int(y2))
+        cv2.rectangle(img, p1, p2, color, 2)
+        cv2.putText(img, f"{tid} {label} {conf:.2f}", (p1[0], max(15, p1[1] - 6)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.55, color, 2)
+    return img
+
+
+def draw_overlay(img, line_rel_pos, show_line, good, defect):
+    """Counting line + GOOD/DEFECT box, drawn in place on the stream frame."""
+    fh, fw = img.shape[:2]
+    if show_line:
+        LINE = int(fw * line_rel_pos)
+        cv2.line(img, (LINE, 0), (LINE, fh), (0,255,0), 3)
+
+    overlay = img.copy()
+    cv2.rectangle(overlay, (10,10), (420,80), (0,0,0), -1)
+    cv2.addWeighted(overlay, 0.6, img, 0.4, 0, img)
+
+    cv2.putText(img,
+                f"GOOD: {good} | DEFECT: {defect}",
+                (20,50),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                1,
+                (0,255,0),
+                2)
+    return img
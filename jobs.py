@@ -0,0 +1,107 @@
+# jobs.py — BACKGROUND JOBS WITH PROGRESS
+# Long operations (reset, retention, ...) run in their own daemon thread so the
+# request thread returns immediately; the UI polls GET /jobs/<id>.
+
+import time, uuid, threading, traceback
+
+
+class Job:
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.state = "queued"      # queued | running | done | failed | cancelled
+        self.progress = 0.0        # 0.0 - 1.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+
+    def report(self, progress=None, message=None):
+        """Called from inside the job function."""
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, float(progress)))
+        if message is not None:
+            self.message = message
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def active(self):
+        return self.state in ("queued", "running")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "progress": round(self.progress, 4),
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobManager:
+    def __init__(self, keep=50):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self.keep = keep
+
+    def submit(self, name, fn, *args, exclusive=True, **kwargs):
+        """
+        Run fn(job, *args, **kwargs) in a daemon thread; its return value becomes
+        job.result. With exclusive=True an already running job of the same name is
+        returned instead of starting a second one.
+        """
+        with self._lock:
+            if exclusive:
+                for j in self._jobs.values():
+                    if j.name == name and j.active:
+                        return j
+            job = Job(name)
+            self._jobs[job.id] = job
+            self._trim()
+        threading.Thread(target=self._run, args=(job, fn, args, kwargs),
+                         daemon=True, name=f"job-{name}").start()
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.state = "running"
+        job.started = time.time()
+        print(f"[job] {job.name} {job.id} started")
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.state = "cancelled" if job.cancelled else "done"
+            job.progress = 1.0 if job.state == "done" else job.progress
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e)
+            traceback.print_exc()
+        job.finished = time.time()
+        print(f"[job] {job.name} {job.id} {job.state} in {job.finished - job.started:.1f}s")
+
+    def _trim(self):
+        done = [j for j in self._jobs.values() if not j.active]
+        for j in sorted(done, key=lambda j: j.created)[: max(0, len(self._jobs) - self.keep)]:
+            self._jobs.pop(j.id, None)
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self, name=None):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if name:
+            jobs = [j for j in jobs if j.name == name]
+        return sorted(jobs, key=lambda j: j.created, reverse=True)
@@ -0,0 +1,338 @@
+# loadtest.py — DASHBOARD LOAD TEST: K SIMULATED BROWSERS vs INSPECTION FPS
+# How many operator browsers can one station serve before inference slows down?
+# Each simulated client does what the real pages do (static/script.js, static/analysis.js):
+#
+#   main page      /live_counts 2s (ETag revalidate), /lamp_state 0.5s, /camera_status 2s
+#                  + one /video_feed MJPEG stream (--viewers = fraction of clients)
+#   analysis page  /stats 2s, /stats_detail 2s (ETag revalidate), /api/confidence 5s
+#                  (--analysis = fraction of clients that also have this tab open)
+#
+# The load goes up in steps (--clients 0,4,16,32); per step: p50/p99 latency per endpoint,
+# errors / 503s, stream fps per viewer, and inference fps + camera fps from /metrics
+# (worker_inference_fps in thread mode, engine_inference_fps in process mode).
+# Step 0 (no clients) is the baseline; --max-fps-drop / --max-p99-ms turn the run
+# into a pass/fail check (exit code 1) for use before a deployment.
+#
+#   python loadtest.py --video replay/line1.mp4 --clients 0,4,16,32 --duration 30
+#   python loadtest.py --url http://10.0.0.21:5000 --clients 0,8      # running station
+#
+# Without --url, serve.py is started on a free port in a temp work dir: camera =
+# replayed --video (QC_CAMERAS=file:...), fresh SQLite DB, captured/ clips/ snapshots
+# in the temp dir -> production data is never touched. Server log: <tmp>/server.log.
+
+import os, sys, json, time, random, socket, argparse, tempfile, threading, subprocess
+import http.client
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import yaml
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# (path, interval s, revalidate with If-None-Match like cache:'no-cache')
+MAIN_POLLS = (("/live_counts", 2.0, True), ("/lamp_state", 0.5, False), ("/camera_status", 2.0, False))
+ANALYSIS_POLLS = (("/stats", 2.0, True), ("/stats_detail", 2.0, True), ("/api/confidence", 5.0, False),
+                  ("/api/reports?limit=12", 60.0, False))
+FPS_METRICS = ("worker_inference_fps", "engine_inference_fps")
+WARMUP = 3.0   # seconds of each step not measured (connections opening, first frames)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Recorder:
+    """Latencies + status codes per endpoint for the current step (thread safe)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.measuring = False
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.latency = defaultdict(list)
+            self.status = defaultdict(lambda: defaultdict(int))
+            self.stream = []          # (frames, seconds) per finished / running viewer
+
+    def add(self, path, seconds, status, always=False):
+        if not (self.measuring or always):
+            return
+        with self.lock:
+            self.status[path][status] += 1
+            if isinstance(status, int) and status < 500:
+                self.latency[path].append(seconds)
+
+
+class Browser(threading.Thread):
+    """One tab: polls on the page's intervals over one keep-alive connection."""
+
+    def __init__(self, host, port, polls, rec, stop):
+        super().__init__(daemon=True, name="browser")
+        self.host, self.port, self.polls, self.rec, self.stop = host, port, polls, rec, stop
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        etags = {}
+        now = time.monotonic()
+        due = {p: now + random.uniform(0, iv) for p, iv, _ in self.polls}   # tabs opened at different times
+        meta = {p: (iv, rv) for p, iv, rv in self.polls}
+        while not self.stop.is_set():
+            path = min(due, key=due.get)
+            wait = due[path] - time.monotonic()
+            if wait > 0:
+                self.stop.wait(wait)
+                continue
+            interval, revalidate = meta[path]
+            headers = {"Accept-Encoding": "gzip, br"}
+            if revalidate and path in etags:
+                headers["If-None-Match"] = etags[path]
+            t0 = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                status = resp.status
+                if resp.getheader("ETag"):
+                    etags[path] = resp.getheader("ETag")
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+            self.rec.add(path, time.perf_counter() - t0, status)
+            # setInterval keeps its rhythm; a slow answer only delays this one poll
+            due[path] = max(due[path] + interval, time.monotonic())
+        conn.close()
+
+
+def count_markers(tail, chunk, marker=b"--frame"):
+    """(markers in tail + chunk, new tail). A marker split over two chunks is found once."""
+    data = tail + chunk
+    # keep len-1 bytes: a whole marker at the end of this chunk is not counted again next time
+    return data.count(marker), data[-(len(marker) - 1):]
+
+
+class Viewer(threading.Thread):
+    """<img src=/video_feed>: keeps the MJPEG stream open and counts frames."""
+
+    def __init__(self, host, port, rec, stop):
+        super().__init__(daemon=True, name="viewer")
+        self.host, self.port, self.rec, self.stop = host, port, rec, stop
+
+    def run(self):
+        while not self.stop.is_set():
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+            t0 = time.perf_counter()
+            frames, tail, started = 0, b"", None
+            try:
+                conn.request("GET", "/video_feed")
+                resp = conn.getresponse()
+                if resp.status != 200:
+                    self.rec.add("/video_feed", time.perf_counter() - t0, resp.status)
+                    self.stop.wait(5.0)   # 503 = viewer limit (Retry-After: 5)
+                    continue
+                while not self.stop.is_set():
+                    chunk = resp.read1(65536)
+                    if not chunk:
+                        break
+                    n, tail = count_markers(tail, chunk)
+                    if n and started is None:
+                        started = time.perf_counter()
+                        self.rec.add("/video_feed", started - t0, 200, always=True)   # time to first frame
+                    frames += n
+            except (OSError, http.client.HTTPException) as e:
+                self.rec.add("/video_feed", time.perf_counter() - t0, type(e).__name__)
+            finally:
+                conn.close()
+                if started is not None and self.rec.measuring:
+                    with self.rec.lock:
+                        self.rec.stream.append((frames, time.perf_counter() - started))
+            self.stop.wait(1.0)
+
+
+def scrape_fps(host, port):
+    """(inference fps, mean camera fps) from /metrics, None when unreachable."""
+    try:
+        conn = http.client.HTTPConnection(host, port, timeout=5)
+        conn.request("GET", "/metrics")
+        text = conn.getresponse().read().decode("utf-8", "replace")
+        conn.close()
+    except (OSError, http.client.HTTPException):
+        return None
+    infer, cams = 0.0, []
+    for line in text.splitlines():
+        if line.startswith("#") or " " not in line:
+            continue
+        name, value = line.rsplit(" ", 1)
+        base = name.split("{", 1)[0]
+        try:
+            value = float(value)
+        except ValueError:
+            continue
+        if base in FPS_METRICS:
+            infer = max(infer, value)
+        elif base == "camera_fps" and value > 0:
+            cams.append(value)
+    return infer, (sum(cams) / len(cams) if cams else 0.0)
+
+
+def run_step(host, port, clients, args):
+    rec = Recorder()
+    stop = threading.Event()
+    rng = random.Random(clients)
+    threads = []
+    for _ in range(clients):
+        threads.append(Browser(host, port, MAIN_POLLS, rec, stop))
+        if rng.random() < args.analysis:
+            threads.append(Browser(host, port, ANALYSIS_POLLS, rec, stop))
+        if rng.random() < args.viewers:
+            threads.append(Viewer(host, port, rec, stop))
+    for t in threads:
+        t.start()
+
+    time.sleep(WARMUP)
+    rec.measuring = True
+    fps, cam_fps = [], []
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        s = scrape_fps(host, port)
+        if s is not None:
+            fps.append(s[0])
+            cam_fps.append(s[1])
+        time.sleep(1.0)
+    stop.set()
+    for t in threads:
+        t.join(timeout=12)
+    rec.measuring = False
+
+    endpoints = {}
+    for path in sorted(set(rec.latency) | set(rec.status)):
+        lat = rec.latency[path]
+        codes = dict(rec.status[path])
+        endpoints[path] = {"requests": sum(codes.values()),
+                           "p50_ms": round(percentile(lat, 0.5) * 1000, 1),
+                           "p99_ms": round(percentile(lat, 0.99) * 1000, 1),
+                           "status": {str(k): v for k, v in codes.items()}}
+    streams = [f / s for f, s in rec.stream if s > 0]
+    return {"clients": clients, "threads": len(threads),
+            "inference_fps": round(sum(fps) / len(fps), 2) if fps else 0.0,
+            "camera_fps": round(sum(cam_fps) / len(cam_fps), 2) if cam_fps else 0.0,
+            "stream_fps": round(sum(streams) / len(streams), 2) if streams else 0.0,
+            "viewers": len(streams), "endpoints": endpoints}
+
+
+def print_step(r):
+    print(f"\n[load] clients={r['clients']}  inference {r['inference_fps']:.1f} fps  camera {r['camera_fps']:.1f} fps"
+          f"  stream {r['stream_fps']:.1f} fps/viewer ({r['viewers']} viewers)")
+    for path, e in r["endpoints"].items():
+        codes = " ".join(f"{k}:{v}" for k, v in sorted(e["status"].items()))
+        print(f"  {path:<16} n={e['requests']:<6} p50 {e['p50_ms']:>7.1f} ms  p99 {e['p99_ms']:>7.1f} ms  [{codes}]")
+
+
+# ----------------- LOCAL SERVER (replayed video, temp DB) -----------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args):
+    work = tempfile.mkdtemp(prefix="qc_loadtest_")
+    with open(os.path.join(HERE, "config.yaml"), encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    if args.model:
+        cfg["model_path"] = args.model
+    for k in ("model_path", "cascade_classifier"):   # relative to the repo, server runs in `work`
+        if cfg.get(k) and not os.path.isabs(cfg[k]):
+            cfg[k] = os.path.join(HERE, cfg[k])
+    with open(os.path.join(work, "config.yaml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump(cfg, f, sort_keys=True)
+
+    port = free_port()
+    env = dict(os.environ, QC_CONFIG=os.path.join(work, "config.yaml"),
+               QC_CAMERAS="file:" + os.path.abspath(args.video),
+               DB_MODE="sqlite", SQLITE_URI="sqlite:///" + os.path.join(work, "loadtest.db"),
+               HTTP_HOST="127.0.0.1", HTTP_PORT=str(port), PYTHONUNBUFFERED="1")
+    env.pop("REPLICATE_TO", None)
+    env.pop("UPLINK_TO", None)
+    log = open(os.path.join(work, "server.log"), "w", encoding="utf-8")
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, "serve.py")], cwd=work, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+    print(f"[load] serve.py on 127.0.0.1:{port} (ENGINE_MODE={env.get('ENGINE_MODE', 'thread')}), "
+          f"work dir {work}")
+
+    deadline = time.monotonic() + args.boot_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"[load] server exited ({proc.returncode}), see {log.name}")
+        s = scrape_fps("127.0.0.1", port)
+        if s is not None and s[0] > 0:   # model loaded and inspecting frames
+            return proc, port
+        time.sleep(1.0)
+    proc.terminate()
+    raise SystemExit(f"[load] no inference after {args.boot_timeout:.0f}s, see {log.name}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Dashboard load test: simulated browsers vs inspection FPS")
+    ap.add_argument("--url", help="running app; omitted = start serve.py with --video")
+    ap.add_argument("--video", help="video file replayed as the camera (local server)")
+    ap.add_argument("--model", help="weights for the local server (default: config.yaml model_path)")
+    ap.add_argument("--clients", default="0,4,16,32", help="comma separated load steps (0 = baseline)")
+    ap.add_argument("--duration", type=float, default=30, help="measured seconds per step")
+    ap.add_argument("--viewers", type=float, default=1.0, help="fraction of clients with /video_feed open")
+    ap.add_argument("--analysis", type=float, default=0.5, help="fraction of clients with the analysis tab")
+    ap.add_argument("--boot-timeout", type=float, default=180)
+    ap.add_argument("--max-fps-drop", type=float, help="fail if inference fps drops more than this fraction "
+                                                       "below the first step (e.g. 0.1)")
+    ap.add_argument("--max-p99-ms", type=float, help="fail if any poll endpoint p99 exceeds this")
+    ap.add_argument("--json", help="write the full report here")
+    args = ap.parse_args()
+
+    proc = None
+    if args.url:
+        u = urlsplit(args.url)
+        host, port = u.hostname, u.port or 80
+    else:
+        if not args.video:
+            ap.error("--video is required without --url")
+        proc, port = start_server(args)
+        host = "127.0.0.1"
+
+    results = []
+    try:
+        for k in [int(x) for x in args.clients.split(",") if x.strip()]:
+            r = run_step(host, port, k, args)
+            print_step(r)
+            results.append(r)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    failed = []
+    base = results[0]["inference_fps"] if results else 0.0
+    for r in results[1:]:
+        if args.max_fps_drop is not None and base and r["inference_fps"] < base * (1 - args.max_fps_drop):
+            failed.append(f"clients={r['clients']}: inference {r['inference_fps']:.1f} fps < "
+                          f"{(1 - args.max_fps_drop) * 100:.0f}% of baseline {base:.1f}")
+    for r in results:
+        for path, e in r["endpoints"].items():
+            if args.max_p99_ms is not None and path != "/video_feed" and e["p99_ms"] > args.max_p99_ms:
+                failed.append(f"clients={r['clients']}: {path} p99 {e['p99_ms']:.0f} ms > {args.max_p99_ms:.0f} ms")
+
+    print("\n[load] clients  inference fps  stream fps  worst poll p99")
+    for r in results:
+        polls = [e["p99_ms"] for p, e in r["endpoints"].items() if p != "/video_feed"]
+        print(f"       {r['clients']:>7}  {r['inference_fps']:>13.1f}  {r['stream_fps']:>10.1f}"
+              f"  {max(polls) if polls else 0:>11.1f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "steps": results, "failed": failed}, f, indent=2)
+        print(f"[load] report -> {args.json}")
+    for msg in failed:
+        print("[load] FAIL", msg)
+    sys.exit(1 if failed else 0)
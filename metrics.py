@@ -0,0 +1,116 @@
+# metrics.py — MINIMAL PROMETHEUS-STYLE METRICS
+# No external dependency: counters / gauges / histograms kept in memory and
+# rendered in the Prometheus text format by the /metrics route.
+
+import threading
+
+_lock = threading.Lock()
+_registry = {}
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _fmt_labels(key, extra=None):
+    items = list(key) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        with _lock:
+            _registry[name] = self
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            items = list(self._values.items())
+        for key, v in items:
+            lines.append(f"{self.name}{_fmt_labels(key)} {v}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, n=1, **labels):
+        k = _key(labels)
+        with _lock:
+            self._values[k] = self._values.get(k, 0) + n
+
+
+class Gauge(_Metric):
+    """Set explicitly, or pass `fn` returning {labels_tuple: value} evaluated at scrape."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, fn=None):
+        super().__init__(name, help_text)
+        self.fn = fn
+
+    def set(self, v, **labels):
+        with _lock:
+            self._values[_key(labels)] = v
+
+    def render(self):
+        if self.fn is not None:
+            try:
+                for labels, v in self.fn().items():
+                    self.set(v, **dict(labels))
+            except Exception as e:
+                print(f"[metrics] gauge {self.name} failed:", e)
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, v, **labels):
+        k = _key(labels)
+        with _lock:
+            st = self._values.get(k)
+            if st is None:
+                st = self._values[k] = [[0] * len(self.buckets), 0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if v <= b:
+                    st[0][i] += 1
+            st[1] += v
+            st[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            items = [(k, (list(c), s, n)) for k, (c, s, n) in self._values.items()]
+        for key, (counts, total, n) in items:
+            for b, c in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, {'le': b})} {c}")
+            lines.append(f"{self.name}_bucket{_fmt_labels(key, {'le': '+Inf'})} {n}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {n}")
+        return lines
+
+
+def get(name):
+    return _registry.get(name)
+
+
+def render_all():
+    """Whole registry in Prometheus text exposition format."""
+    with _lock:
+        metrics = list(_registry.values())
+    out = []
+    for m in metrics:
+        out.extend(m.render())
+    return "\n".join(out) + "\n"
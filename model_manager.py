@@ -0,0 +1,88 @@
+# model_manager.py — HOT-SWAPPABLE YOLO WEIGHTS
+# New weights are loaded and warmed up in a background thread; the worker keeps
+# using the old model until the new one is ready, then the reference is swapped
+# between two frames (zero dropped frames, tracker state carried over).
+# A request during a running swap is queued (latest wins) and starts after it.
+
+import time, threading
+import numpy as np
+from ultralytics import YOLO
+
+
+class ModelManager:
+    def __init__(self, path, warmup_shape=(720, 1280, 3)):
+        self._lock = threading.Lock()
+        self.warmup_shape = warmup_shape
+        print("[model] loading YOLO model:", path)
+        self._model = YOLO(path)
+        self.path = path
+        self.status = {"state": "ready", "path": path, "error": None, "swapped_at": time.time()}
+        self._pending = None
+        self._queued = None   # (path, conf) requested while a swap was running
+
+    def current(self):
+        """Model to use for the next frame (plain reference read, no lock needed)."""
+        return self._model
+
+    @property
+    def names(self):
+        return self._model.names
+
+    def request_swap(self, path, conf=0.25):
+        """
+        Start loading `path` in the background. Returns False if a swap is running:
+        the request is then queued (replacing an older queued one) and starts after it.
+        """
+        with self._lock:
+            if self._pending is not None and self._pending.is_alive():
+                self._queued = (path, conf)
+                print(f"[model] swap to {path} queued behind {self.status['path']}")
+                return False
+            self._start(path, conf)
+            return True
+
+    def _start(self, path, conf):
+        # caller holds self._lock
+        self.status = {"state": "loading", "path": path, "error": None, "swapped_at": None}
+        self._pending = threading.Thread(target=self._swap_worker, args=(path, conf),
+                                         daemon=True, name="model-swap")
+        self._pending.start()
+
+    def _swap_worker(self, path, conf):
+        try:
+            self._load(path, conf)
+        finally:
+            with self._lock:
+                queued, self._queued = self._queued, None
+                if queued is not None and queued[0] != self.path:
+                    self._start(*queued)
+
+    def _load(self, path, conf):
+        t0 = time.time()
+        try:
+            new = YOLO(path)
+            # warm up: first call builds the predictor + tracker and JITs the kernels
+            dummy = np.zeros(self.warmup_shape, dtype=np.uint8)
+            for _ in range(2):
+                if new.task == "classify":  # cascade classifier: no tracker
+                    new.predict(source=dummy, verbose=False)
+                else:
+                    new.track(source=dummy, persist=True, conf=conf, verbose=False)
+        except Exception as e:
+            print(f"[model] swap to {path} FAILED:", e)
+            self.status = {"state": "failed", "path": path, "error": str(e), "swapped_at": None}
+            return
+
+        old = self._model
+        # keep tracker ids stable across the cut-over
+        try:
+            if old.predictor is not None and getattr(old.predictor, "trackers", None):
+                new.predictor.trackers = old.predictor.trackers
+        except Exception as e:
+            print("[model] tracker hand-over skipped:", e)
+
+        with self._lock:
+            self._model = new
+            self.path = path
+            self.status = {"state": "ready", "path": path, "error": None, "swapped_at": time.time()}
+        print(f"[model] swapped to {path} (warm-up {time.time() - t0:.1f}s)")
@@ -19,6 +19,12 @@ class Bottle(db.Model):
     - confidence: Confidence score dari YOLO (0.0 - 1.0)
     - image_path: Path ke gambar yang disimpan (bisa kosong)
     - object_id: ID tracking objek (untuk debugging dan tracing)
+    - clip_path: Path ke video klip sebelum/sesudah defect (bisa kosong)
+    - cam: Index kamera (tombol CAM) yang menginspeksi botol ini
+    - station / station_epoch / local_id: hanya di central DB (replicator.py) —
+      asal baris: station, reset epoch station itu, dan Bottle.id lokal di station.
+      Unik bersama, jadi kirim ulang batch tidak bikin baris ganda; id central
+      diassign sendiri oleh central. NULL di DB lokal station.
     """
     
     # Primary key
@@ -37,7 +43,9 @@ class Bottle(db.Model):
     confidence = db.Column(db.Float, default=0.0, nullable=False)
     
     # Path ke gambar yang disimpan
-    # Format: "captured/Normal_20250115_143045_ID123.jpg"
+    # Format baru (sharded, lihat image_store.py):
+    #   "captured/2025/01/15/14/cam0/Normal_20250115_143045_123_000042_ab12cd34ef.jpg"
+    # Format lama (flat): "captured/Normal_20250115_143045.jpg"
     # Bisa kosong kalau SAVE_ONLY_DEFECT=True dan botol normal
     image_path = db.Column(db.String(256), default="")
     
@@ -45,6 +53,28 @@ class Bottle(db.Model):
     # Ini adalah ID yang diassign oleh tracking system
     # Berguna untuk trace back kalau ada masalah counting
     object_id = db.Column(db.Integer, nullable=True, index=True)
+
+    # Video klip defect (clips.py): beberapa detik sebelum + sesudah crossing
+    # Format: "clips/2025/01/15/cam0/Missing_Text_20250115_143045_123.mp4"
+    # Kosong untuk botol normal / kalau klip tidak ditulis
+    clip_path = db.Column(db.String(256), default="")
+
+    # Index kamera (CAMERA_SPECS di camera.py); NULL untuk baris lama sebelum kolom ini
+    # ada — export.py mencocokkan baris itu lewat ".../cam<N>/..." di image_path
+    cam = db.Column(db.Integer, nullable=True, index=True)
+
+    # Asal baris di central DB (replicator.py); NULL di DB lokal
+    station = db.Column(db.String(64), nullable=True)
+    station_epoch = db.Column(db.String(40), nullable=True)
+    local_id = db.Column(db.Integer, nullable=True)
+
+    # SQLite: AUTOINCREMENT -> id tidak pernah dipakai ulang setelah DELETE,
+    # penting untuk high-water mark replicator (abaikan di MySQL).
+    # Unique index: NULL tidak bentrok (SQLite & MySQL), baris lokal tidak terpengaruh
+    __table_args__ = (
+        db.Index("uq_bottle_origin", "station", "station_epoch", "local_id", unique=True),
+        {"sqlite_autoincrement": True},
+    )
     
     def __repr__(self):
         """
@@ -52,6 +82,20 @@ class Bottle(db.Model):
         """
         return f"<Bottle #{self.id} | {self.category} | {self.confidence:.2f} | {self.timestamp}>"
     
+    @property
+    def captured_relpath(self):
+        """Path relatif terhadap folder captured/ (untuk url serve_captured), None kalau tidak ada"""
+        if self.image_path and self.image_path.startswith("captured/"):
+            return self.image_path[len("captured/"):]
+        return None
+
+    @property
+    def clip_relpath(self):
+        """Path relatif terhadap folder clips/ (untuk url serve_clip), None kalau tidak ada"""
+        if self.clip_path and self.clip_path.startswith("clips/"):
+            return self.clip_path[len("clips/"):]
+        return None
+
     def to_dict(self):
         """
         Convert object ke dictionary (untuk API response)
@@ -62,10 +106,101 @@ class Bottle(db.Model):
             'category': self.category,
             'confidence': round(self.confidence, 4),
             'image_path': self.image_path,
-            'object_id': self.object_id
+            'object_id': self.object_id,
+            'clip_path': self.clip_path or "",
+            'cam': self.cam
         }
 
 
+class ReplicationState(db.Model):
+    """
+    High-water mark replikasi ke central DB (DB_MODE=sqlite) dan checkpoint reinspect.py
+
+    Columns:
+    - name: nama tabel yang direplikasi (mis. "bottle"), atau "reinspect:<run>"
+      untuk checkpoint re-inspeksi batch
+    - last_id: Bottle.id terakhir yang sudah sukses dikirim / dinilai ulang
+    - updated_at: kapan terakhir diupdate
+    """
+    __tablename__ = "replication_state"
+
+    name = db.Column(db.String(64), primary_key=True)
+    last_id = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.String(32), default="")
+
+
+class Reinspection(db.Model):
+    """
+    Hasil re-inspeksi batch (reinspect.py): satu baris per (run, bottle_id)
+
+    Columns:
+    - run: nama run re-inspeksi (mis. "runs_v3_0401"), checkpoint-nya di
+      ReplicationState name="reinspect:<run>"
+    - bottle_id: Bottle.id yang dinilai ulang (tanpa FK: retention boleh hapus Bottle)
+    - category: label dari model baru ("" kalau tidak ada box)
+    - confidence: confidence model baru
+    - status: ok | nobox | missing (gambar tidak ada) | error
+    """
+    __tablename__ = "reinspection"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    run = db.Column(db.String(48), nullable=False, index=True)
+    bottle_id = db.Column(db.Integer, nullable=False)
+    category = db.Column(db.String(64), default="")
+    confidence = db.Column(db.Float, default=0.0)
+    status = db.Column(db.String(16), default="ok")
+
+    __table_args__ = (db.UniqueConstraint("run", "bottle_id", name="uq_reinspection_run_bottle"),)
+
+
+class Station(db.Model):
+    """
+    Line station yang mengirim batch ke aggregator (ENGINE_MODE=aggregator, aggregator.py)
+
+    Columns:
+    - station: ID station (env STATION_ID di station, default hostname)
+    - line: nama line produksi (env LINE_ID di station)
+    - last_seq: Bottle.id lokal terakhir yang sudah masuk rollup — kunci idempotensi:
+      baris dengan id <= last_seq diabaikan kalau batch dikirim ulang
+    - epoch: reset epoch station (replicator.read_epoch); setelah reset id mulai lagi
+      dari 1, epoch baru -> last_seq mulai dari 0 lagi
+    - rows / batches / duplicates: total baris diterapkan, batch diterapkan, batch duplikat
+    - last_seen: kapan batch terakhir diterima (waktu aggregator)
+    """
+    __tablename__ = "station"
+
+    station = db.Column(db.String(64), primary_key=True)
+    line = db.Column(db.String(64), default="", index=True)
+    last_seq = db.Column(db.Integer, default=0, nullable=False)
+    epoch = db.Column(db.String(40), default="")
+    rows = db.Column(db.Integer, default=0, nullable=False)
+    batches = db.Column(db.Integer, default=0, nullable=False)
+    duplicates = db.Column(db.Integer, default=0, nullable=False)
+    last_seen = db.Column(db.String(32), default="")
+
+
+class Rollup(db.Model):
+    """
+    Rollup per jam dari semua station (aggregator): satu baris per (station, line, jam, kategori)
+
+    Columns:
+    - hour: "YYYY-MM-DD HH" dari timestamp botol (jam lokal station)
+    - count: jumlah botol
+    - conf_sum: jumlah confidence (rata-rata = conf_sum / count)
+    """
+    __tablename__ = "rollup_hourly"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    station = db.Column(db.String(64), nullable=False)
+    line = db.Column(db.String(64), default="", nullable=False, index=True)
+    hour = db.Column(db.String(13), nullable=False, index=True)
+    category = db.Column(db.String(64), nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    conf_sum = db.Column(db.Float, default=0.0, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint("station", "line", "hour", "category", name="uq_rollup_key"),)
+
+
 # ============================================================================
 # HELPER FUNCTIONS (OPTIONAL)
 # ============================================================================
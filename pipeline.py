@@ -0,0 +1,251 @@
+# pipeline.py — PIPELINED PARALLEL INFERENCE FOR ONE CAMERA (PIPELINE_WORKERS=N)
+#
+#   frames ──▶ [shm frame slots] ──▶ N detector processes (own YOLO, bounded torch threads)
+#                                         │ boxes (n x 6, tiny)
+#                                         ▼
+#                          reorder stage (strict frame order) ──▶ tracker ──▶ LineCounter
+#
+# Detection runs on N cores at once; tracking + crossing logic still sees every
+# inspected frame exactly once and in capture order, so counting stays
+# deterministic no matter which worker finished first.
+#
+# Slots carry a generation number (bumped before each write): a worker copies its
+# frame and checks the generation before and after, so a slot reclaimed from a
+# slow worker (lost_timeout) and reused can never hand it a torn frame.
+
+import os, time, queue, traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import metrics
+from inspection import norm, GOOD_KEY
+
+PIPE_DROPPED = metrics.Counter("pipeline_frames_dropped_total",
+                               "Frames not inspected (all slots busy, or result lost)")
+PIPE_INFLIGHT = metrics.Gauge("pipeline_frames_inflight", "Frames handed to detector workers")
+
+
+WARMUP_SHAPE = (720, 1280, 3)
+
+
+def _load_model(path):
+    """YOLO + two dummy predicts, so the first real frame isn't the slow one."""
+    from ultralytics import YOLO
+    model = YOLO(path)
+    dummy = np.zeros(WARMUP_SHAPE, dtype=np.uint8)
+    for _ in range(2):
+        model.predict(dummy, verbose=False)
+    return model
+
+
+def _detect_worker(idx, model_path, threads, shm_name, slots, slot_bytes, gens, task_q, ctl_q, result_q):
+    """Detector process: predict() only — no tracker state lives here."""
+    import cv2, torch
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    pool = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=shm.buf)
+    # warmed up before the first task -> a (re)spawned worker joins the pool at full speed
+    model = _load_model(model_path)
+    result_q.put(("names", idx, dict(model.names)))
+    parent = mp.parent_process()
+
+    while True:
+        try:
+            ctl = ctl_q.get_nowait()
+            if ctl[0] == "stop":
+                break
+            if ctl[0] == "model":
+                model = _load_model(ctl[1])   # takes no task until the new model is warm
+                result_q.put(("names", idx, dict(model.names)))
+        except queue.Empty:
+            pass
+        try:
+            task = task_q.get(timeout=1.0)
+        except queue.Empty:
+            if parent is not None and not parent.is_alive():
+                break  # orphaned (engine killed) -> don't linger
+            continue
+        if task is None:
+            break
+        seq, slot, gen, h, w, conf = task
+        try:
+            if gens[slot] != gen:
+                result_q.put(("stale", seq, slot, None))   # slot already reclaimed + reused
+                continue
+            frame = pool[slot, :h * w * 3].reshape(h, w, 3).copy()
+            if gens[slot] != gen:
+                result_q.put(("stale", seq, slot, None))   # overwritten while copying
+                continue
+            r = model.predict(frame, conf=conf, verbose=False)[0]
+            data = r.boxes.data.cpu().numpy() if r.boxes is not None else np.zeros((0, 6), np.float32)
+            result_q.put(("ok", seq, slot, data))
+        except Exception as e:
+            traceback.print_exc()
+            result_q.put(("err", seq, slot, str(e)))
+    shm.close()
+
+
+class PipelinedTracker:
+    def __init__(self, model_path, workers=2, threads_per_worker=None, conf=0.45,
+                 max_frame=(1080, 1920), frame_rate=30, lost_timeout=2.0, tracker_cfg="botsort.yaml"):
+        self.workers = workers
+        self.threads = threads_per_worker or max(1, (os.cpu_count() or 2) // workers)
+        self.conf = conf
+        self.model_path = model_path
+        self.frame_rate = frame_rate
+        self.tracker_cfg = tracker_cfg
+        self.lost_timeout = lost_timeout
+        self.slots = workers * 2            # at most 2 frames queued per worker
+        self.slot_bytes = max_frame[0] * max_frame[1] * 3
+        self.ctx = mp.get_context("spawn")
+        self.names = {}
+        self._procs = []
+        self._next_seq = 1       # next seq to submit
+        self._emit_seq = 1       # next seq the reorder stage may release
+        self._pending = {}       # seq -> (frame, meta, submitted_at, slot)
+        self._done = {}          # seq -> boxes ndarray | None
+        self._free = list(range(self.slots))
+        self._tracker = None
+
+    # ----------------- LIFECYCLE -----------------
+    def start(self):
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        self._pool = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf)
+        self._gens = self.ctx.Array("Q", self.slots, lock=False)   # per-slot write generation
+        self.task_q = self.ctx.Queue()
+        self.result_q = self.ctx.Queue()
+        self._procs = [None] * self.workers
+        self._ctl = [None] * self.workers
+        for i in range(self.workers):
+            self._spawn(i)
+        self._last_check = time.monotonic()
+        self._tracker = self._new_tracker()
+        PIPE_INFLIGHT.fn = lambda: {(): len(self._pending)}
+        print(f"[pipeline] {self.workers} detector workers x {self.threads} threads")
+        return self
+
+    def _spawn(self, i):
+        ctl_q = self.ctx.Queue()
+        p = self.ctx.Process(target=_detect_worker, daemon=True, name=f"qc-detect-{i}",
+                             args=(i, self.model_path, self.threads, self.shm.name,
+                                   self.slots, self.slot_bytes, self._gens, self.task_q, ctl_q,
+                                   self.result_q))
+        p.start()
+        self._procs[i] = p
+        self._ctl[i] = ctl_q
+
+    def _check_workers(self):
+        """Respawn crashed detector workers (their in-flight frame is dropped by poll)."""
+        if time.monotonic() - self._last_check < 1.0:
+            return
+        self._last_check = time.monotonic()
+        for i, p in enumerate(self._procs):
+            if not p.is_alive():
+                print(f"[pipeline] detector {i} exited ({p.exitcode}), respawning")
+                self._spawn(i)
+
+    def stop(self):
+        for q in self._ctl:
+            q.put(("stop",))
+        for _ in self._procs:
+            self.task_q.put(None)
+        for p in self._procs:
+            p.join(2.0)
+            if p.is_alive():
+                p.terminate()
+        self._pool = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def _new_tracker(self):
+        # same tracker config model.track() uses by default, so ids behave the same
+        from ultralytics.trackers.track import TRACKER_MAP
+        from ultralytics.utils import IterableSimpleNamespace, YAML
+        from ultralytics.utils.checks import check_yaml
+        args = IterableSimpleNamespace(**YAML.load(check_yaml(self.tracker_cfg)))
+        return TRACKER_MAP[args.tracker_type](args=args, frame_rate=self.frame_rate)
+
+    def swap_model(self, path):
+        """Workers reload between two frames; the tracker keeps its ids."""
+        self.model_path = path
+        for q in self._ctl:
+            q.put(("model", path))
+
+    # ----------------- PRODUCER -----------------
+    def submit(self, frame, meta=None):
+        """Hand a frame to the workers. False (= frame skipped) if every slot is busy."""
+        h, w = frame.shape[:2]
+        if not self._free or h * w * 3 > self.slot_bytes:
+            PIPE_DROPPED.inc(reason="busy" if self._free == [] else "too_large")
+            return False
+        slot = self._free.pop()
+        gen = self._gens[slot] + 1
+        self._gens[slot] = gen          # before the write: a worker still reading sees the change
+        self._pool[slot, :h * w * 3] = frame.reshape(-1)
+        seq = self._next_seq
+        self._next_seq += 1
+        self._pending[seq] = (frame, meta, time.monotonic(), slot)
+        self.task_q.put((seq, slot, gen, h, w, self.conf))
+        return True
+
+    # ----------------- REORDER + TRACK -----------------
+    def poll(self, timeout=0.0):
+        """
+        Collect finished detections and release them strictly in submit order.
+        Returns [(frame, meta, dets)] with dets = [(tid, label, conf, (x1,y1,x2,y2))].
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                msg = self.result_q.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            kind = msg[0]
+            if kind == "names":
+                self.names = msg[2]
+                continue
+            _, seq, slot, data = msg
+            deadline = 0  # got something: drain the rest without waiting
+            if seq not in self._pending:
+                continue  # already given up on (slot was reclaimed then)
+            self._free.append(slot)
+            self._done[seq] = data if kind == "ok" else None
+        self._check_workers()
+
+        out = []
+        while self._emit_seq in self._pending:
+            seq = self._emit_seq
+            frame, meta, t_sub, slot = self._pending[seq]
+            if seq not in self._done:
+                # never came back (worker died mid-frame, or very slow): give up once later
+                # frames are done, or after a long grace period if nothing else finishes either.
+                # Reusing the slot is safe: the generation check discards the late reader.
+                age = time.monotonic() - t_sub
+                if age > self.lost_timeout and (self._done or age > 5 * self.lost_timeout):
+                    PIPE_DROPPED.inc(reason="lost")
+                    self._pending.pop(seq)
+                    self._free.append(slot)
+                    self._emit_seq += 1
+                    continue
+                break
+            data = self._done.pop(seq)
+            self._pending.pop(seq)
+            self._emit_seq += 1
+            out.append((frame, meta, self._track(frame, data)))
+        return out
+
+    def _track(self, frame, data):
+        from ultralytics.engine.results import Boxes
+        if data is None:
+            data = np.zeros((0, 6), np.float32)
+        tracks = self._tracker.update(Boxes(data, frame.shape[:2]), frame)
+        dets = []
+        # rows: x1, y1, x2, y2, track_id, score, cls, idx
+        for t in tracks:
+            cls = int(t[6])
+            label = norm(self.names[cls]) if cls in self.names else GOOD_KEY
+            dets.append((int(t[4]), label, float(t[5]), tuple(float(v) for v in t[:4])))
+        return dets
@@ -0,0 +1,124 @@
+# profiler.py — ON-DEMAND SAMPLING PROFILER (POST /admin/profile)
+# For "the line got slow" in production without a debugger or a restart:
+#
+#   stacks  every `interval` s, sys._current_frames() of the selected threads is
+#           walked and the stack counted -> collapsed format, one line per stack:
+#             worker;yolo_worker (app.py:289);track (model.py:...);... 123
+#           feed it to flamegraph.pl / speedscope / inferno as is
+#   memory  tracemalloc runs only for the window (25 frames deep): allocation sites
+#           that grew the most between start and end + biggest live sites at the end
+#
+# Overhead: one frame walk per thread per sample (~20-50 µs at the default 200 Hz);
+# tracemalloc slows allocations down noticeably, so it is opt-out ("memory": false).
+# In ENGINE_MODE=process the engine child runs the same function on its own
+# threads (engine.py "profile" command) — stacks are prefixed "engine/<thread>".
+
+import os, sys, time, threading, tracemalloc
+from collections import Counter
+
+PROFILE_DIR = "reports"
+MAX_SECONDS = 120
+MEM_FRAMES = 25
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame):
+    out = []
+    while frame is not None:
+        out.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(out))
+
+
+def _select(threads):
+    """{ident: name} of the threads to sample; threads = name prefixes, None = all."""
+    me = threading.get_ident()
+    out = {}
+    for t in threading.enumerate():
+        if t.ident == me or t.ident is None:
+            continue
+        if threads is None or any(t.name.startswith(p) for p in threads):
+            out[t.ident] = t.name
+    return out
+
+
+def _alloc_sites(stats, top):
+    rows = []
+    for s in stats[:top]:
+        fr = s.traceback[0]
+        rows.append({"site": f"{fr.filename}:{fr.lineno}",
+                     "size_kb": round(s.size / 1024, 1),
+                     "count": s.count,
+                     "size_diff_kb": round(getattr(s, "size_diff", 0) / 1024, 1),
+                     "count_diff": getattr(s, "count_diff", 0)})
+    return rows
+
+
+def profile(seconds, threads=None, interval=0.005, memory=True, top=25, prefix="", stop=None):
+    """
+    Sample the stacks of `threads` for `seconds`. Returns {"stacks": {collapsed: n},
+    "samples", "threads", "alloc_growth", "alloc_top", "seconds"}.
+    """
+    seconds = max(0.5, min(float(seconds), MAX_SECONDS))
+    own_trace = memory and not tracemalloc.is_tracing()
+    if own_trace:
+        tracemalloc.start(MEM_FRAMES)
+    before = tracemalloc.take_snapshot() if memory else None
+
+    stacks = Counter()
+    samples = 0
+    seen = set()
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    try:
+        while time.perf_counter() < deadline:
+            if stop is not None and stop():
+                break
+            targets = _select(threads)
+            frames = sys._current_frames()
+            for ident, name in targets.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    stacks[f"{prefix}{name};{_stack(frame)}"] += 1
+                    seen.add(prefix + name)
+            samples += 1
+            del frames
+            time.sleep(interval)
+
+        result = {"stacks": dict(stacks), "samples": samples, "threads": sorted(seen),
+                  "seconds": round(time.perf_counter() - t0, 2), "alloc_growth": [], "alloc_top": []}
+        if memory:
+            after = tracemalloc.take_snapshot()
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            after, before = after.filter_traces(filters), before.filter_traces(filters)
+            result["alloc_growth"] = _alloc_sites(after.compare_to(before, "lineno"), top)
+            result["alloc_top"] = _alloc_sites(after.statistics("lineno"), top)
+        return result
+    finally:
+        if own_trace:
+            tracemalloc.stop()
+
+
+def collapsed(stacks):
+    """{stack: n} -> flamegraph.pl input (heaviest first)."""
+    return "".join(f"{s} {n}\n" for s, n in sorted(stacks.items(), key=lambda kv: -kv[1]))
+
+
+def hot_functions(stacks, top=20):
+    """Self time per function (leaf frame) in % of the samples."""
+    leaf = Counter()
+    for s, n in stacks.items():
+        leaf[s.rsplit(";", 1)[-1]] += n
+    total = sum(leaf.values()) or 1
+    return [{"function": f, "samples": n, "pct": round(100 * n / total, 1)} for f, n in leaf.most_common(top)]
+
+
+def save(stacks, out_dir=PROFILE_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    name = time.strftime("profile_%Y%m%d_%H%M%S.collapsed")
+    with open(os.path.join(out_dir, name), "w", encoding="utf-8") as f:
+        f.write(collapsed(stacks))
+    return name
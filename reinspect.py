@@ -0,0 +1,351 @@
+# reinspect.py — BATCH RE-INSPECTION OF ARCHIVED CAPTURES WITH A NEW MODEL
+#
+#   bottle rows (id > checkpoint, keyset pages of `batch`)
+#        │ (id, image_path) only — workers read captured/ or archive/*.tar themselves
+#        ▼
+#   process pool (spawn, N workers x cpu/N torch threads, model loaded once per worker)
+#        │ batched model.predict() -> (id, status, label, conf)
+#        ▼
+#   in submission order: INSERT IGNORE into `reinspection` + advance the checkpoint
+#   (ReplicationState name="reinspect:<run>") in the same transaction
+#
+# Killing it (Ctrl+C, reboot, cancelled job) loses at most the batches in flight;
+# the next start with the same run name continues after the checkpoint. When the
+# run is through, report() writes reports/reinspect_<run>.json (confusion matrix
+# production label x new label) and reports/reinspect_<run>_diff.csv (every
+# bottle the new model judges differently, with its image path).
+#
+# Label of a captured frame = box whose center is closest to the counting line
+# (the frame was saved the moment that bottle crossed it).
+#
+# CLI (overnight on a CPU box, same DB_MODE / MYSQL_URI / SQLITE_URI env as the app):
+#   python reinspect.py model/runs_v3/detect/train/weights/best.pt --workers 8
+#   python reinspect.py --report runs_v3
+
+import os, re, csv, json, time, tarfile
+import multiprocessing as mp
+from collections import deque, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from sqlalchemy import select, func, and_
+
+from inspection import norm, GOOD_KEY, DEFECT_KEYS
+
+REPORT_DIR = "reports"
+ARCHIVE_PREFIX = "archive/"
+NONE_LABEL = "(none)"   # new model found no bottle in the capture
+
+
+def run_name(model_path):
+    """model/runs_v3/detect/train/weights/best.pt -> "runs_v3" (also a safe file name)."""
+    parts = os.path.normpath(model_path).split(os.sep)
+    name = parts[1] if len(parts) > 2 and parts[0] == "model" else os.path.splitext(parts[-1])[0]
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)[:40]
+
+
+def valid_run(name):
+    return bool(re.fullmatch(r"[A-Za-z0-9_.-]{1,40}", name or ""))
+
+
+# ====================================================================
+# WORKER PROCESS
+# ====================================================================
+_model = None
+_opts = {}
+_tars = {}
+
+
+def _init_worker(model_path, threads, imgsz, conf, line_rel_pos):
+    global _model
+    import torch
+    from ultralytics import YOLO
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+    _model = YOLO(model_path)
+    _opts.update(imgsz=imgsz, conf=conf, line_rel_pos=line_rel_pos)
+
+
+def load_image(path):
+    """captured/... file or archive/<tar>#<member> (retention.py) -> BGR image, None if gone."""
+    if path.startswith(ARCHIVE_PREFIX) and "#" in path:
+        tar_path, member = path.split("#", 1)
+        for attempt in (0, 1):
+            tar = _tars.get(tar_path)
+            if tar is None:
+                if not os.path.exists(tar_path):
+                    return None
+                tar = _tars[tar_path] = tarfile.open(tar_path, "r")
+            try:
+                data = tar.extractfile(member).read()
+                break
+            except KeyError:
+                # retention appends to today's tar -> our member index may be stale
+                tar.close()
+                _tars.pop(tar_path, None)
+                if attempt:
+                    return None
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    return cv2.imread(path) if os.path.exists(path) else None
+
+
+def _pick(result, width):
+    """One Ultralytics result -> (status, label, conf)."""
+    names = _model.names
+    if getattr(result, "probs", None) is not None:   # classify model
+        k = int(result.probs.top1)
+        return "ok", norm(names[k]), float(result.probs.top1conf)
+    boxes = result.boxes
+    if boxes is None or not len(boxes):
+        return "nobox", "", 0.0
+    xyxy = boxes.xyxy.cpu().numpy()
+    cx = (xyxy[:, 0] + xyxy[:, 2]) / 2.0
+    k = int(np.abs(cx - width * _opts["line_rel_pos"]).argmin())
+    return "ok", norm(names[int(boxes.cls[k])]), float(boxes.conf[k])
+
+
+def _inspect_batch(items):
+    """[(bottle_id, image_path)] -> [(bottle_id, status, label, conf)]"""
+    out, ids, imgs = [], [], []
+    for bid, path in items:
+        try:
+            img = load_image(path)
+        except (OSError, tarfile.TarError) as e:
+            print(f"[reinspect] #{bid} {path}: {e}")
+            img = None
+        if img is None:
+            out.append((bid, "missing", "", 0.0))
+        else:
+            ids.append(bid)
+            imgs.append(img)
+    if imgs:
+        try:
+            results = _model.predict(imgs, imgsz=_opts["imgsz"], conf=_opts["conf"], verbose=False)
+            for bid, img, r in zip(ids, imgs, results):
+                out.append((bid,) + _pick(r, img.shape[1]))
+        except Exception as e:
+            print(f"[reinspect] batch #{ids[0]}..#{ids[-1]} failed: {e}")
+            out.extend((bid, "error", "", 0.0) for bid in ids)
+    return out
+
+
+# ====================================================================
+# CHECKPOINT
+# ====================================================================
+def _ckpt_name(run):
+    return f"reinspect:{run}"
+
+
+def load_checkpoint(conn, state_table, run):
+    st = state_table
+    row = conn.execute(select(st.c.last_id).where(st.c.name == _ckpt_name(run))).first()
+    return int(row[0]) if row else 0
+
+
+def _save_checkpoint(conn, state_table, run, last_id):
+    st = state_table
+    now = time.strftime("%Y-%m-%d %H:%M:%S")
+    n = conn.execute(st.update().where(st.c.name == _ckpt_name(run))
+                     .values(last_id=last_id, updated_at=now)).rowcount
+    if not n:
+        conn.execute(st.insert().values(name=_ckpt_name(run), last_id=last_id, updated_at=now))
+
+
+def _insert_ignore(engine, table):
+    ins = table.insert()
+    if engine.dialect.name == "mysql":
+        return ins.prefix_with("IGNORE")
+    if engine.dialect.name == "sqlite":
+        return ins.prefix_with("OR IGNORE")
+    return ins
+
+
+# ====================================================================
+# RUN (job function: JobManager or CLI)
+# ====================================================================
+def reinspect(job, engine, bottle_table, result_table, state_table, model_path, run=None,
+              workers=None, batch=16, imgsz=640, conf=0.25, line_rel_pos=0.5,
+              since=None, until=None):
+    """
+    Re-inspect every Bottle with an image (optionally since <= timestamp < until)
+    after the run's checkpoint. Returns report() of the run.
+    Resume with the same run name (and filters).
+    """
+    run = run or run_name(model_path)
+    if not valid_run(run):
+        raise ValueError(f"invalid run name {run!r}")
+    if not os.path.exists(model_path):
+        raise ValueError(f"model not found: {model_path}")
+    workers = max(1, workers or (os.cpu_count() or 2) // 2)
+    threads = max(1, (os.cpu_count() or 2) // workers)
+
+    b = bottle_table
+    where = b.c.image_path != ""
+    if since:
+        where = and_(where, b.c.timestamp >= since)
+    if until:
+        where = and_(where, b.c.timestamp < until)
+
+    with engine.connect() as conn:
+        last = load_checkpoint(conn, state_table, run)
+        todo = conn.execute(select(func.count()).select_from(b).where(and_(where, b.c.id > last))).scalar() or 0
+    print(f"[reinspect] run {run}: {todo} captures after #{last}, {workers} workers x {threads} threads")
+    job.report(0.0, f"{run}: {todo} to go")
+
+    done = 0
+    counts = defaultdict(int)
+    t0 = time.time()
+    ins = _insert_ignore(engine, result_table)
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(model_path, threads, imgsz, conf, line_rel_pos)) as pool:
+        inflight = deque()   # (last id of the batch, future) in id order
+        cursor, exhausted = last, False
+        while True:
+            # keep every worker busy with ~2 batches, never read the whole table at once
+            while not exhausted and not job.cancelled and len(inflight) < workers * 2:
+                with engine.connect() as conn:
+                    rows = conn.execute(select(b.c.id, b.c.image_path).where(and_(where, b.c.id > cursor))
+                                        .order_by(b.c.id).limit(batch)).all()
+                if not rows:
+                    exhausted = True
+                    break
+                cursor = rows[-1][0]
+                inflight.append((cursor, pool.submit(_inspect_batch, [tuple(r) for r in rows])))
+            if not inflight:
+                break
+
+            hi, fut = inflight.popleft()
+            results = fut.result()
+            with engine.begin() as conn:
+                conn.execute(ins, [{"run": run, "bottle_id": bid, "status": status,
+                                    "category": label, "confidence": c}
+                                   for bid, status, label, c in results])
+                _save_checkpoint(conn, state_table, run, hi)
+            done += len(results)
+            for r in results:
+                counts[r[1]] += 1
+            rate = done / max(1e-6, time.time() - t0)
+            job.report(done / max(1, todo), f"{run}: {done}/{todo} (#{hi}, {rate:.1f} img/s)")
+
+    print(f"[reinspect] run {run}: {done} in {time.time() - t0:.0f}s {dict(counts)}"
+          + (" (cancelled, resumable)" if job.cancelled else ""))
+    if job.cancelled:
+        return {"run": run, "done": done, "checkpoint": cursor, "cancelled": True}
+    return report(engine, bottle_table, result_table, run, model_path=model_path)
+
+
+# ====================================================================
+# REPORT
+# ====================================================================
+def _kind(label):
+    return "good" if label == GOOD_KEY else "defect" if label in DEFECT_KEYS else "other"
+
+
+def report(engine, bottle_table, result_table, run, out_dir=REPORT_DIR, model_path=None):
+    """Confusion matrix production x new label + diff CSV. Returns the summary dict."""
+    b, r = bottle_table, result_table
+    joined = r.join(b, b.c.id == r.c.bottle_id)
+    confusion = defaultdict(lambda: defaultdict(int))
+    status = defaultdict(int)
+    with engine.connect() as conn:
+        for prod, new, st, n in conn.execute(
+                select(b.c.category, r.c.category, r.c.status, func.count())
+                .select_from(joined).where(r.c.run == run)
+                .group_by(b.c.category, r.c.category, r.c.status)):
+            status[st] += n
+            if st in ("ok", "nobox"):
+                confusion[prod][new or NONE_LABEL] += n
+
+    total = sum(sum(row.values()) for row in confusion.values())
+    agree = sum(row.get(prod, 0) for prod, row in confusion.items())
+    flips = defaultdict(int)   # good->defect / defect->good / defect->other defect / ...
+    for prod, row in confusion.items():
+        for new, n in row.items():
+            if new != prod:
+                flips[f"{_kind(prod)}->{_kind(new) if new != NONE_LABEL else 'none'}"] += n
+    summary = {
+        "run": run,
+        "model_path": model_path,
+        "generated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "compared": total,
+        "agree": agree,
+        "agreement": round(agree / total, 4) if total else None,
+        "status": dict(status),
+        "changes": dict(flips),
+        "confusion": {prod: dict(row) for prod, row in sorted(confusion.items())},
+    }
+
+    os.makedirs(out_dir, exist_ok=True)
+    diff_path = os.path.join(out_dir, f"reinspect_{run}_diff.csv")
+    n_diff = 0
+    with open(diff_path, "w", newline="", encoding="utf-8") as f, engine.connect() as conn:
+        w = csv.writer(f)
+        w.writerow(["bottle_id", "timestamp", "production", "production_conf", "new", "new_conf", "image_path"])
+        rows = conn.execution_options(stream_results=True, yield_per=1000).execute(
+            select(b.c.id, b.c.timestamp, b.c.category, b.c.confidence, r.c.category, r.c.confidence,
+                   b.c.image_path)
+            .select_from(joined)
+            .where(and_(r.c.run == run, r.c.status.in_(("ok", "nobox")), b.c.category != r.c.category))
+            .order_by(b.c.id))
+        for bid, ts, prod, pconf, new, nconf, path in rows:
+            w.writerow([bid, ts, prod, round(pconf or 0, 4), new or NONE_LABEL, round(nconf or 0, 4), path])
+            n_diff += 1
+    summary["diff_csv"] = diff_path.replace(os.sep, "/")
+    summary["diff_rows"] = n_diff
+
+    with open(os.path.join(out_dir, f"reinspect_{run}.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(f"[reinspect] report {run}: {agree}/{total} agree, {n_diff} diffs -> {diff_path}")
+    return summary
+
+
+# ====================================================================
+# CLI
+# ====================================================================
+if __name__ == "__main__":
+    import argparse
+    from db_engine import standalone_engine
+    from jobs import Job
+    from models import Bottle, Reinspection, ReplicationState
+
+    ap = argparse.ArgumentParser(description="Re-inspect archived captures with another model")
+    ap.add_argument("model_path", nargs="?")
+    ap.add_argument("--run", help="run name (default: from the model path); same name = resume")
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: cpu/2)")
+    ap.add_argument("--batch", type=int, default=16)
+    ap.add_argument("--imgsz", type=int, default=640)
+    ap.add_argument("--conf", type=float, default=0.25)
+    ap.add_argument("--line", type=float, default=0.5, help="line_rel_pos used at capture time")
+    ap.add_argument("--since", help='timestamp >= "YYYY-MM-DD[ HH:MM:SS]"')
+    ap.add_argument("--until", help='timestamp < "YYYY-MM-DD[ HH:MM:SS]"')
+    ap.add_argument("--report", metavar="RUN", help="only (re)write the report of RUN")
+    args = ap.parse_args()
+
+    eng = standalone_engine()
+    for t in (Reinspection.__table__, ReplicationState.__table__):
+        t.create(eng, checkfirst=True)
+    if args.report:
+        print(json.dumps(report(eng, Bottle.__table__, Reinspection.__table__, args.report), indent=2))
+        raise SystemExit(0)
+    if not args.model_path:
+        ap.error("model_path is required (or --report RUN)")
+
+    job = Job("reinspect")
+    last_print = [0.0]
+    def _progress(progress=None, message=None, _report=job.report):
+        _report(progress, message)
+        if time.time() - last_print[0] > 10:
+            last_print[0] = time.time()
+            print(f"[reinspect] {job.progress * 100:5.1f}% {job.message}")
+    job.report = _progress
+    try:
+        res = reinspect(job, eng, Bottle.__table__, Reinspection.__table__, ReplicationState.__table__,
+                        args.model_path, run=args.run, workers=args.workers, batch=args.batch,
+                        imgsz=args.imgsz, conf=args.conf, line_rel_pos=args.line,
+                        since=args.since, until=args.until)
+    except KeyboardInterrupt:
+        print("[reinspect] interrupted — run again with the same --run to resume")
+        raise SystemExit(130)
+    print(json.dumps(res, indent=2))
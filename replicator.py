@@ -0,0 +1,187 @@
+# replicator.py — SHIP LOCAL (SQLite) ROWS TO CENTRAL MySQL
+# Runs in the background on a line station in DB_MODE=sqlite. Rows with
+# id > high-water mark are copied in bulk; the mark is only advanced after the
+# central commit succeeded. Central assigns its own id; each row carries its
+# origin (station, station_epoch, local_id), unique on central, so a retry after a
+# crash is ignored as a duplicate while rows of different stations never collide.
+
+import os, time, socket, threading
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, select, update, func
+
+from db_engine import add_missing_columns
+
+# ====================================================================
+# RESET EPOCH — bottle ids can start again at 1
+# ====================================================================
+# bottle.id is INTEGER PRIMARY KEY without AUTOINCREMENT: after a reset (or on a
+# new database.db) SQLite hands out max(id)+1 again, i.e. ids a high-water mark
+# already passed. ReplicationState "reset_epoch" records every reset:
+#   last_id    = highest id still in the table after the reset (new rows are above it)
+#   updated_at = when the reset happened / the DB was created (microseconds,
+#                always later than the previous epoch even if the clock stepped back)
+# Epoch token "<updated_at>#<last_id>" (sorts by time) goes with shipped batches.
+EPOCH_NAME = "reset_epoch"
+HWM_NAMES = ("bottle", "uplink")   # replicator / uplink marks pulled down by a reset
+
+
+def default_station_id():
+    return os.getenv("STATION_ID") or socket.gethostname()
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def read_epoch(conn, state_table):
+    """(token, top) of the last reset; ("", 0) if ensure_epoch never ran on this DB."""
+    st = state_table
+    row = conn.execute(select(st.c.last_id, st.c.updated_at).where(st.c.name == EPOCH_NAME)).first()
+    return (f"{row[1]}#{int(row[0])}", int(row[0])) if row else ("", 0)
+
+
+def ensure_epoch(engine, state_table):
+    """Start an epoch for a DB that has none yet (new database.db -> new token)."""
+    with engine.begin() as conn:
+        if not read_epoch(conn, state_table)[0]:
+            conn.execute(state_table.insert().values(name=EPOCH_NAME, last_id=0, updated_at=_now()))
+        return read_epoch(conn, state_table)[0]
+
+
+def new_epoch(conn, state_table, table, names=HWM_NAMES):
+    """Called by reset_all after the rows are gone: new epoch + marks rewound to the kept rows."""
+    st = state_table
+    top = conn.execute(select(func.max(table.c.id))).scalar() or 0
+    now = _now()
+    prev = read_epoch(conn, st)[0].split("#")[0]
+    if prev and now <= prev:   # same microsecond / clock stepped back: a new epoch must sort later
+        fmt = "%Y-%m-%d %H:%M:%S.%f" if "." in prev else "%Y-%m-%d %H:%M:%S"
+        now = (datetime.strptime(prev, fmt) + timedelta(microseconds=1)).strftime("%Y-%m-%d %H:%M:%S.%f")
+    if not conn.execute(update(st).where(st.c.name == EPOCH_NAME).values(last_id=top, updated_at=now)).rowcount:
+        conn.execute(st.insert().values(name=EPOCH_NAME, last_id=top, updated_at=now))
+    conn.execute(update(st).where(st.c.name.in_(names), st.c.last_id > top).values(last_id=top))
+    return read_epoch(conn, st)[0]
+
+
+def load_mark(conn, state_table, table, name):
+    """
+    (high-water mark, epoch token). A mark saved before the last reset is pulled
+    down to the reset's top, a mark above max(id) (rows deleted by hand) to max(id).
+    Rewinding too far is safe: the receiving side dedups per (station, epoch, id).
+    """
+    st = state_table
+    token, top = read_epoch(conn, st)
+    row = conn.execute(select(st.c.last_id, st.c.updated_at).where(st.c.name == name)).first()
+    if row is None:
+        return 0, token
+    mark = int(row[0])
+    if token and (row[1] or "") < token.split("#")[0]:   # same second: new_epoch already rewound it
+        mark = min(mark, top)
+    return min(mark, conn.execute(select(func.max(table.c.id))).scalar() or 0), token
+
+
+def save_mark(conn, state_table, name, last_id, token):
+    """Store the mark unless a reset started a new epoch meanwhile (-> False, reload)."""
+    st = state_table
+    if read_epoch(conn, st)[0] != token:
+        return False
+    if not conn.execute(update(st).where(st.c.name == name).values(last_id=last_id, updated_at=_now())).rowcount:
+        conn.execute(st.insert().values(name=name, last_id=last_id, updated_at=_now()))
+    return True
+
+
+class Replicator:
+    def __init__(self, local_engine, central_uri, table, state_table, name="bottle", station=None,
+                 batch_size=1000, interval=5.0, engine_options=None):
+        self.local = local_engine
+        self.central_uri = central_uri
+        self.table = table
+        self.state_table = state_table
+        self.name = name
+        self.station = station or default_station_id()
+        self.batch_size = batch_size
+        self.interval = interval
+        self.engine_options = engine_options or {}
+        self._central = None
+        self._stop = threading.Event()
+        self.status = {"online": False, "high_water": 0, "lag_rows": 0, "shipped": 0,
+                       "last_ok": None, "last_error": None}
+
+    # ----------------- CENTRAL -----------------
+    def _central_engine(self):
+        if self._central is None:
+            opts = {"pool_pre_ping": True, "pool_recycle": 1800}
+            opts.update(self.engine_options)
+            self._central = create_engine(self.central_uri, **opts)
+            self.table.create(self._central, checkfirst=True)
+            add_missing_columns(self._central, self.table)  # central may predate new columns
+        return self._central
+
+    def _insert_ignore(self):
+        ins = self.table.insert()
+        dialect = self._central.dialect.name
+        if dialect == "mysql":
+            return ins.prefix_with("IGNORE")
+        if dialect == "sqlite":
+            return ins.prefix_with("OR IGNORE")
+        return ins
+
+    def _origin_rows(self, rows, token):
+        """Local rows -> central rows: no id (central assigns it), origin columns set."""
+        out = []
+        for r in rows:
+            row = {k: v for k, v in r.items() if k != "id"}
+            row.update(station=self.station, station_epoch=token, local_id=r["id"])
+            out.append(row)
+        return out
+
+    def ship_once(self):
+        """Copy one or more batches. Returns the number of rows shipped."""
+        central = self._central_engine()
+        shipped = 0
+        with self.local.connect() as lconn:
+            hwm, token = load_mark(lconn, self.state_table, self.table, self.name)
+            while not self._stop.is_set():
+                rows = lconn.execute(select(self.table).where(self.table.c.id > hwm)
+                                     .order_by(self.table.c.id).limit(self.batch_size)).mappings().all()
+                if not rows:
+                    break
+                with central.begin() as cconn:
+                    cconn.execute(self._insert_ignore(), self._origin_rows(rows, token))
+                with self.local.begin() as wconn:
+                    if not save_mark(wconn, self.state_table, self.name, rows[-1]["id"], token):
+                        print("[replicator] reset during shipping, reloading high-water mark")
+                        break
+                hwm = rows[-1]["id"]
+                shipped += len(rows)
+            lag = lconn.execute(select(func.count()).select_from(self.table)
+                                .where(self.table.c.id > hwm)).scalar() or 0
+        self.status.update(online=True, high_water=hwm, lag_rows=int(lag), last_ok=time.time(), last_error=None)
+        self.status["shipped"] += shipped
+        return shipped
+
+    # ----------------- LOOP -----------------
+    def start(self):
+        threading.Thread(target=self._run, daemon=True, name="replicator").start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        backoff = self.interval
+        print(f"[replicator] shipping {self.table.name} -> central every {self.interval:.0f}s")
+        while not self._stop.is_set():
+            try:
+                n = self.ship_once()
+                if n:
+                    print(f"[replicator] shipped {n} rows (hwm={self.status['high_water']})")
+                backoff = self.interval
+            except Exception as e:
+                if self.status["online"] or self.status["last_error"] is None:
+                    print("[replicator] central DB unreachable, buffering locally:", e)
+                self.status.update(online=False, last_error=str(e))
+                if self._central is not None:
+                    self._central.dispose()
+                backoff = min(backoff * 2, 300.0)
+            self._stop.wait(backoff)
@@ -0,0 +1,257 @@
+# retention.py — RETENTION, ARCHIVAL & COMPACTION
+# Policies (from config.yaml, hot-reloadable):
+#   retention_images: {Normal: 24h, defect: 90d}   -> images are packed into
+#                     archive/images_YYYY-MM-DD.tar, removed from captured/ and
+#                     Bottle.image_path points at "archive/<tar>#<member>"
+#   retention_rows:   {Normal: 30d, defect: 365d}  -> rows are deleted
+# Defect clips (clips.py) follow the image policy but are never archived:
+# the clip file is deleted when its image is archived/removed or its row deleted.
+# Everything works in chunks by primary-key range so no single statement
+# locks the table for long, and runs as a background job with progress.
+# Files are only unlinked after the chunk's transaction committed: a rollback
+# leaves every row pointing at a file that still exists.
+
+import os, time, tarfile, threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, func, and_, text
+
+from config import parse_duration
+
+ARCHIVE_DIR = "archive"
+CAPTURE_DIR = "captured"
+CLIP_DIR = "clips"
+CHUNK_SIZE = 2000   # primary keys per chunk
+CHUNK_PAUSE = 0.05  # s between chunks — leave DB time for the live write path
+
+
+def _category_groups(policy, good_key, defect_keys):
+    """{"Normal": "24h", "defect": "90d", "Missing_Text": "7d"} -> {seconds: [categories]}"""
+    per_cat = {}
+    if "defect" in policy:
+        for k in defect_keys:
+            per_cat[k] = policy["defect"]
+    for k, v in policy.items():
+        if k != "defect":
+            per_cat[k] = v
+    groups = defaultdict(list)
+    for cat, dur in per_cat.items():
+        secs = parse_duration(dur)
+        if secs is not None:
+            groups[secs].append(cat)
+    return groups
+
+
+def _cutoff(seconds, now=None):
+    return ((now or datetime.now()) - timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def archive_images(rows, archive_dir=ARCHIVE_DIR):
+    """
+    Append the image files of `rows` (id, timestamp, image_path) to dated tar
+    archives. Returns {id: new_image_path} ("" if the file was missing); the
+    originals are left for the caller to unlink once the DB commit succeeded.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    by_day = defaultdict(list)
+    for rid, ts, path in rows:
+        by_day[(ts or "")[:10] or "unknown"].append((rid, path))
+    moved = {}
+    for day, items in by_day.items():
+        tar_name = f"images_{day}.tar"
+        tar_path = os.path.join(archive_dir, tar_name)
+        # uncompressed tar: JPEGs don't compress, and "a" mode allows appending
+        with tarfile.open(tar_path, "a") as tar:
+            for rid, path in items:
+                if not os.path.exists(path):
+                    moved[rid] = ""
+                    continue
+                member = os.path.relpath(path, CAPTURE_DIR).replace(os.sep, "/")
+                tar.add(path, arcname=member)
+                moved[rid] = f"{archive_dir}/{tar_name}#{member}"
+    return moved
+
+
+def remove_files(paths, tag="[retention]"):
+    """Unlink `paths` (missing files are skipped). Returns how many were removed."""
+    n = 0
+    for path in paths:
+        try:
+            os.remove(path)
+            n += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(tag, "failed remove", path, e)
+    return n
+
+
+def clip_paths(conn, table, where):
+    """Clip files of the rows matching `where`."""
+    t = table
+    return [p for (p,) in conn.execute(select(t.c.clip_path).where(and_(where, t.c.clip_path != ""))).all()]
+
+
+def remove_empty_dirs(root=CAPTURE_DIR):
+    """Drop empty sub-directories left behind after images were removed."""
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        if dirpath != root and not dirnames and not filenames:
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+
+
+def _pk_chunks(conn, table, where, chunk_size):
+    lo, hi = conn.execute(select(func.min(table.c.id), func.max(table.c.id)).where(where)).first()
+    if lo is None:
+        return
+    start = lo
+    while start <= hi:
+        yield start, min(start + chunk_size - 1, hi), (start - lo) / max(1, hi - lo + 1)
+        start += chunk_size
+
+
+class RetentionManager:
+    def __init__(self, engine, table, config, jobs, good_key, defect_keys):
+        self.engine = engine
+        self.table = table
+        self.config = config
+        self.jobs = jobs
+        self.good_key = good_key
+        self.defect_keys = set(defect_keys)
+        self.last_run = None
+        self.rows_deleted = 0    # all passes, also cancelled ones (app.py: changed -> recount)
+
+    # ----------------- ONE PASS -----------------
+    def run(self, job):
+        cfg = self.config.snapshot()
+        t = self.table
+        stats = {"images_archived": 0, "images_removed": 0, "rows_deleted": 0, "clips_removed": 0}
+        img_groups = _category_groups(cfg.get("retention_images") or {}, self.good_key, self.defect_keys)
+        row_groups = _category_groups(cfg.get("retention_rows") or {}, self.good_key, self.defect_keys)
+        archive = cfg.get("retention_archive", True)
+        passes = [("images", s, c) for s, c in img_groups.items()] + [("rows", s, c) for s, c in row_groups.items()]
+
+        for p_idx, (kind, secs, cats) in enumerate(passes):
+            where = and_(t.c.category.in_(cats), t.c.timestamp < _cutoff(secs))
+            if kind == "images":
+                where = and_(where, t.c.image_path.like(f"{CAPTURE_DIR}/%"))
+            with self.engine.connect() as conn:
+                chunks = list(_pk_chunks(conn, t, where, CHUNK_SIZE))
+
+            for lo, hi, frac in chunks:
+                if job.cancelled:
+                    return stats
+                job.report((p_idx + frac) / len(passes), f"{kind} {','.join(cats)} id {lo}-{hi}")
+                rng = and_(where, t.c.id.between(lo, hi))
+                deleted = 0
+                unlink = []
+                with self.engine.begin() as conn:
+                    rows = conn.execute(select(t.c.id, t.c.timestamp, t.c.image_path).where(rng)).all()
+                    if not rows:
+                        continue
+                    with_img = [r for r in rows if r[2] and r[2].startswith(f"{CAPTURE_DIR}/")]
+                    clips = clip_paths(conn, t, rng)
+                    if kind == "images":
+                        conn.execute(update(t).where(and_(rng, t.c.clip_path != "")).values(clip_path=""))
+                        if archive:
+                            moved = archive_images(with_img)
+                            stats["images_archived"] += sum(1 for v in moved.values() if v)
+                            for rid, new_path in moved.items():
+                                conn.execute(update(t).where(t.c.id == rid).values(image_path=new_path))
+                        else:
+                            conn.execute(update(t).where(rng).values(image_path=""))
+                    else:
+                        if archive:
+                            stats["images_archived"] += sum(1 for v in archive_images(with_img).values() if v)
+                        deleted = conn.execute(delete(t).where(rng)).rowcount
+                        stats["rows_deleted"] += deleted
+                    unlink = [r[2] for r in with_img]
+                # committed: now the files can go (archived copies are in the tar already)
+                stats["clips_removed"] += remove_files(clips)
+                removed = remove_files(unlink)
+                if not archive:
+                    stats["images_removed"] += removed
+                self.rows_deleted += deleted   # bumped after the commit
+                time.sleep(CHUNK_PAUSE)
+
+        job.report(0.99, "compacting")
+        self.compact(stats["rows_deleted"])
+        remove_empty_dirs()
+        remove_empty_dirs(CLIP_DIR)
+        self.last_run = time.time()
+        print(f"[retention] done: {stats}")
+        return stats
+
+    def compact(self, rows_deleted):
+        """Give space back after deletes without blocking the live writer."""
+        if not rows_deleted:
+            return
+        try:
+            with self.engine.connect() as conn:
+                if self.engine.dialect.name == "sqlite":
+                    conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+                    conn.execute(text("PRAGMA optimize"))
+                elif self.engine.dialect.name == "mysql":
+                    conn.execute(text(f"ANALYZE TABLE {self.table.name}"))
+        except Exception as e:
+            print("[retention] compaction skipped:", e)
+
+    # ----------------- SCHEDULER -----------------
+    def submit(self):
+        return self.jobs.submit("retention", self.run)
+
+    def start(self):
+        def _loop():
+            while True:
+                interval = self.config.snapshot().get("retention_interval_min", 60) * 60
+                time.sleep(interval)
+                self.submit()
+        threading.Thread(target=_loop, daemon=True, name="retention").start()
+        return self
+
+
+# ====================================================================
+# RESET (async job)
+# ====================================================================
+def reset_all(job, engine, table, chunk_size=CHUNK_SIZE, capture_dir=CAPTURE_DIR, clip_dir=CLIP_DIR,
+              state_table=None):
+    """
+    Delete every row (chunked by PK) with its captured image and defect clip.
+    Rows inserted after the reset started are kept, and so are their files: only
+    the paths of deleted rows are unlinked (after each chunk's commit).
+    With `state_table` a new reset epoch is started (replicator.new_epoch): ids may
+    start again at 1, the replicator / uplink marks are pulled down.
+    """
+    t = table
+    deleted_rows = deleted_images = deleted_clips = 0
+    with engine.connect() as conn:
+        max_id = conn.execute(select(func.max(t.c.id))).scalar()
+    if max_id is not None:
+        where = t.c.id <= max_id  # rows inserted after the reset started are kept
+        with engine.connect() as conn:
+            chunks = list(_pk_chunks(conn, t, where, chunk_size))
+        for lo, hi, frac in chunks:
+            job.report(frac * 0.95, f"rows {lo}-{hi}")
+            rng = t.c.id.between(lo, hi)
+            with engine.begin() as conn:
+                files = conn.execute(select(t.c.image_path, t.c.clip_path).where(rng)).all()
+                deleted_rows += conn.execute(delete(t).where(rng)).rowcount
+            deleted_images += remove_files([img for img, _ in files
+                                            if img and img.startswith(f"{capture_dir}/")], "[RESET]")
+            deleted_clips += remove_files([clip for _, clip in files
+                                           if clip and clip.startswith(f"{clip_dir}/")], "[RESET]")
+            time.sleep(CHUNK_PAUSE)
+    epoch = None
+    if state_table is not None:
+        from replicator import new_epoch
+        with engine.begin() as conn:
+            epoch = new_epoch(conn, state_table, t)
+        print(f"[RESET] new epoch {epoch}")
+
+    job.report(0.95, "empty dirs")
+    remove_empty_dirs(capture_dir)
+    remove_empty_dirs(clip_dir)
+    return {"deleted_rows": deleted_rows, "deleted_images": deleted_images, "deleted_clips": deleted_clips,
+            "epoch": epoch}
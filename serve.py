@@ -0,0 +1,31 @@
+# serve.py — PRODUCTION SERVER (waitress, pure Python, works on Windows + Linux)
+#   python serve.py            instead of   python app.py  (Werkzeug dev server)
+#
+# Thread budget: every open /video_feed holds one waitress thread while it streams,
+# so threads = MAX_STREAM_VIEWERS (app.py) + HTTP_API_THREADS for the JSON polls.
+# Viewers above the limit get 503 + Retry-After from /video_feed; sockets above
+# HTTP_CONNECTION_LIMIT wait in the accept backlog instead of eating memory.
+
+import os
+
+from waitress import serve
+
+import app as qc
+
+HOST = os.getenv("HTTP_HOST", "0.0.0.0")
+PORT = int(os.getenv("HTTP_PORT", "5000"))
+API_THREADS = int(os.getenv("HTTP_API_THREADS", "8"))
+CONNECTION_LIMIT = int(os.getenv("HTTP_CONNECTION_LIMIT", "200"))
+
+if __name__ == "__main__":
+    qc.startup()
+    threads = qc.MAX_STREAM_VIEWERS + API_THREADS
+    print(f"[http] waitress on {HOST}:{PORT} — {threads} threads, "
+          f"{qc.MAX_STREAM_VIEWERS} stream viewers, {CONNECTION_LIMIT} connections")
+    serve(qc.app, host=HOST, port=PORT,
+          threads=threads,
+          connection_limit=CONNECTION_LIMIT,
+          channel_timeout=60,                       # idle keep-alive sockets
+          channel_request_lookahead=1,              # enables environ["waitress.client_disconnected"]
+          outbuf_high_watermark=2 * 1024 * 1024,    # slow viewer: block its thread, not grow RAM
+          ident="qc-bottle")
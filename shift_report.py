@@ -0,0 +1,306 @@
+# shift_report.py — SHIFT & DAILY REPORTS, MATERIALIZED IN THE BACKGROUND
+# Replaces building the end-of-shift report by hand from the analysis page.
+# Every report_interval_min the scheduler reads ONLY the rows written since its
+# last run (id > cursor, by primary key, in chunks) and folds them into running
+# totals per period:
+#
+#   shift   report_shifts "06:00,14:00,22:00" -> 2025-01-15_S1_0600-1400, _S2_1400-2200,
+#           _S3_2200-0600
+#   day     production day = from the first shift start to the next -> 2025-01-15_0600
+#
+# The bounds are part of the key: after report_shifts changes, a new "S2" never
+# reuses (or overwrites) the old one. Open periods of the old schedule are closed
+# (written final) on the first run after the change.
+#
+# Per period: bottles per category (+ % and avg conf), good / defect per hour,
+# the highest-confidence defect images. Artifacts in reports/shifts/ and
+# reports/daily/: <key>.csv (hourly table + total), <key>.html (printable,
+# self-contained), <key>.json (totals, re-opened if a late row still arrives).
+# A period becomes final GRACE s after its end.
+#
+# The cursor and the open totals live in one atomically written state file
+# (instance/report_state.dat, snapshot.py format) -> a crash never counts a row twice.
+# The state remembers the reset epoch (replicator.read_epoch): after a reset ids
+# start again above the epoch's top, so a new epoch pulls the cursor down to it.
+# Totals already reported stay.
+
+import os, io, csv, json, heapq, time, threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+
+import snapshot
+from config import parse_shifts
+from replicator import read_epoch
+from retention import CHUNK_PAUSE
+
+REPORT_DIR = "reports"
+STATE_PATH = os.path.join("instance", "report_state.dat")
+BATCH = 5000      # rows per query
+GRACE = 120       # s after the end of a period before it is final (BatchWriter lag)
+KINDS = ("shifts", "daily")
+
+
+def period_of(ts, starts):
+    """"2025-01-15 03:10:00" -> ("2025-01-14", 2): production day + shift index."""
+    d = datetime.strptime(ts[:16], "%Y-%m-%d %H:%M")
+    m = d.hour * 60 + d.minute
+    if m < starts[0]:
+        return (d - timedelta(days=1)).strftime("%Y-%m-%d"), len(starts) - 1
+    return d.strftime("%Y-%m-%d"), max(i for i, s in enumerate(starts) if s <= m)
+
+
+def bounds(day, starts, shift=None):
+    """(start, end) datetimes of a shift, or of the whole production day when shift is None."""
+    d0 = datetime.strptime(day, "%Y-%m-%d")
+    if shift is None:
+        start = d0 + timedelta(minutes=starts[0])
+        return start, start + timedelta(days=1)
+    start = d0 + timedelta(minutes=starts[shift])
+    if shift + 1 < len(starts):
+        return start, d0 + timedelta(minutes=starts[shift + 1])
+    return start, d0 + timedelta(days=1, minutes=starts[0])
+
+
+def period_key(day, start, end, shift=None):
+    """Artifact / state key, bounds included: 2025-01-15_S1_0600-1400 or 2025-01-15_0600."""
+    if shift is None:
+        return f"{day}_{start:%H%M}"
+    return f"{day}_S{shift + 1}_{start:%H%M}-{end:%H%M}"
+
+
+def _new_period(kind, key, start, end, schedule):
+    fmt = "%Y-%m-%d %H:%M:%S"
+    return {"kind": kind, "key": key, "start": start.strftime(fmt), "end": end.strftime(fmt),
+            "schedule": schedule,
+            "categories": {}, "conf_sum": {}, "hours": {}, "top": [], "first": None, "last": None}
+
+
+def _write_text(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class ShiftReports:
+    def __init__(self, engine, table, config, good_key, defect_keys, render=None, out_dir=REPORT_DIR,
+                 state_path=STATE_PATH, state_table=None):
+        self.engine = engine
+        self.table = table
+        self.state_table = state_table   # ReplicationState: reset epoch (None = only the max(id) check)
+        self.config = config
+        self.good_key = good_key
+        self.defect_keys = set(defect_keys)
+        self.render = render            # render(summary) -> HTML (app.py: templates/shift_report.html)
+        self.out_dir = out_dir
+        self.state_path = state_path
+        self.state = snapshot.read(state_path) or {"cursor": 0, "open": {}}
+        self.index = {}                 # key -> summary without hours/top (GET /api/reports)
+        self.last_run = None
+        self._lock = threading.Lock()
+        self._dirty = set(self.state["open"])   # rewrite open artifacts once after a restart
+        self._load_index()
+
+    # ----------------- FOLD -----------------
+    def _period(self, kind, key, start, end, schedule):
+        """Open totals of a period; a final report is re-opened when a late row arrives."""
+        acc = self.state["open"].get(key)
+        if acc is None:
+            acc = self._read_json(kind, key) or _new_period(kind, key, start, end, schedule)
+            acc["schedule"] = schedule
+            acc.pop("summary", None)
+            acc.pop("final", None)
+            self.state["open"][key] = acc
+        return acc
+
+    def _fold(self, acc, rid, ts, category, conf, image_path, cam, top_n):
+        cats = acc["categories"]
+        cats[category] = cats.get(category, 0) + 1
+        acc["conf_sum"][category] = acc["conf_sum"].get(category, 0.0) + float(conf or 0.0)
+        hour = acc["hours"].setdefault(ts[:13], {})
+        hour[category] = hour.get(category, 0) + 1
+        acc["first"] = min(acc["first"] or ts, ts)
+        acc["last"] = max(acc["last"] or ts, ts)
+        if top_n and category in self.defect_keys and image_path:
+            item = [round(float(conf or 0.0), 4), rid, category, ts, image_path, cam]
+            if len(acc["top"]) < top_n:
+                heapq.heappush(acc["top"], item)
+            elif item > acc["top"][0]:
+                heapq.heapreplace(acc["top"], item)
+
+    def _check_cursor(self, conn, st):
+        """Pull the cursor down after a reset (new epoch) or rows deleted by hand (max(id) < cursor)."""
+        max_id = conn.execute(select(func.max(self.table.c.id))).scalar() or 0
+        if self.state_table is not None:
+            token, top = read_epoch(conn, self.state_table)
+            if st.get("epoch") is not None and st["epoch"] != token and st["cursor"] > top:
+                print(f"[report] new reset epoch {token}, cursor {st['cursor']} -> {top}")
+                st["cursor"] = top
+            st["epoch"] = token   # state without "epoch" (older file): adopted, no rewind
+        if max_id < st["cursor"]:
+            print(f"[report] rows deleted, cursor {st['cursor']} -> {max_id}")
+            st["cursor"] = max_id
+        return max_id
+
+    def _close_stale(self, st, schedule):
+        """report_shifts changed: open periods of the old schedule are written final."""
+        stale = [k for k, acc in st["open"].items() if acc.get("schedule") != schedule]
+        for key in stale:
+            self._write(st["open"].pop(key), True)
+            self._dirty.discard(key)
+        if stale:
+            snapshot.write_atomic(self.state_path, st)
+            print(f"[report] shifts changed to {schedule}, closed: {', '.join(sorted(stale))}")
+
+    # ----------------- ONE RUN -----------------
+    def run(self, job=None):
+        with self._lock:
+            cfg = self.config.snapshot()
+            starts = parse_shifts(cfg["report_shifts"])
+            schedule = ",".join(f"{m // 60:02d}:{m % 60:02d}" for m in starts)
+            top_n = cfg["report_top_images"]
+            st, t = self.state, self.table
+            cols = (t.c.id, t.c.timestamp, t.c.category, t.c.confidence, t.c.image_path, t.c.cam)
+
+            self._close_stale(st, schedule)
+            with self.engine.connect() as conn:
+                max_id = self._check_cursor(conn, st)
+
+            rows_read = 0
+            while not (job is not None and job.cancelled):
+                with self.engine.connect() as conn:
+                    rows = conn.execute(select(*cols).where(t.c.id > st["cursor"])
+                                        .order_by(t.c.id).limit(BATCH)).all()
+                if not rows:
+                    break
+                for rid, ts, category, conf, image_path, cam in rows:
+                    try:
+                        day, shift = period_of(ts, starts)
+                    except (TypeError, ValueError):
+                        continue   # malformed timestamp: skipped, never blocks the cursor
+                    for kind, s in (("shifts", shift), ("daily", None)):
+                        start, end = bounds(day, starts, s)
+                        key = period_key(day, start, end, s)
+                        self._fold(self._period(kind, key, start, end, schedule), rid, ts, category,
+                                   conf, image_path, cam, top_n)
+                        self._dirty.add(key)
+                st["cursor"] = rows[-1][0]
+                snapshot.write_atomic(self.state_path, st)   # cursor + totals together
+                rows_read += len(rows)
+                if job is not None:
+                    job.report(0.9 * min(1.0, st["cursor"] / max(max_id, 1)), f"id {st['cursor']}/{max_id}")
+                time.sleep(CHUNK_PAUSE)   # leave DB time for the live write path
+
+            # artifacts for changed periods; finished periods become final and leave the state
+            now = datetime.now()
+            closed = []
+            for key, acc in list(st["open"].items()):
+                final = now > datetime.strptime(acc["end"], "%Y-%m-%d %H:%M:%S") + timedelta(seconds=GRACE)
+                if key in self._dirty or final:
+                    self._write(acc, final)
+                    self._dirty.discard(key)
+                if final:
+                    del st["open"][key]
+                    closed.append(key)
+            if closed:
+                snapshot.write_atomic(self.state_path, st)
+                print(f"[report] final: {', '.join(sorted(closed))}")
+            self.last_run = time.time()
+            return {"rows": rows_read, "cursor": st["cursor"], "open": sorted(st["open"]), "closed": closed}
+
+    # ----------------- ARTIFACTS -----------------
+    def summarize(self, acc, final):
+        cats = acc["categories"]
+        total = sum(cats.values())
+        good = cats.get(self.good_key, 0)
+        defect = sum(n for c, n in cats.items() if c in self.defect_keys)
+        hours = []
+        for h, counts in sorted(acc["hours"].items()):
+            n = sum(counts.values())
+            d = sum(v for c, v in counts.items() if c in self.defect_keys)
+            hours.append({"hour": h, "total": n, "good": counts.get(self.good_key, 0), "defect": d,
+                          "defect_pct": round(100.0 * d / n, 2) if n else 0.0, "categories": counts})
+        return {
+            "kind": acc["kind"], "key": acc["key"], "start": acc["start"], "end": acc["end"],
+            "first": acc["first"], "last": acc["last"], "final": final,
+            "generated": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "total": total, "good": good, "defect": defect,
+            "defect_pct": round(100.0 * defect / total, 2) if total else 0.0,
+            "per_hour": round(total / len(hours), 1) if hours else 0.0,
+            "peak_hour": max(hours, key=lambda h: h["total"])["hour"] if hours else None,
+            "categories": [{"category": c, "count": n, "pct": round(100.0 * n / total, 2) if total else 0.0,
+                            "avg_conf": round(acc["conf_sum"].get(c, 0.0) / n, 4) if n else 0.0,
+                            "defect": c in self.defect_keys}
+                           for c, n in sorted(cats.items(), key=lambda kv: -kv[1])],
+            "hours": hours,
+            "top_images": [{"confidence": c, "id": rid, "category": cat, "timestamp": ts, "image_path": p,
+                            "cam": cam} for c, rid, cat, ts, p, cam in sorted(acc["top"], reverse=True)],
+        }
+
+    def csv_text(self, summary):
+        """Hourly table (one column per category) + TOTAL row."""
+        cats = [c["category"] for c in summary["categories"]]
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        w.writerow(["hour", "total", "good", "defect", "defect_pct"] + cats)
+        for h in summary["hours"]:
+            w.writerow([h["hour"] + ":00", h["total"], h["good"], h["defect"], h["defect_pct"]]
+                       + [h["categories"].get(c, 0) for c in cats])
+        w.writerow(["TOTAL", summary["total"], summary["good"], summary["defect"], summary["defect_pct"]]
+                   + [c["count"] for c in summary["categories"]])
+        return buf.getvalue()
+
+    def _write(self, acc, final):
+        summary = self.summarize(acc, final)
+        folder = os.path.join(self.out_dir, acc["kind"])
+        os.makedirs(folder, exist_ok=True)
+        base = os.path.join(folder, acc["key"])
+        _write_text(base + ".csv", self.csv_text(summary))
+        if self.render is not None:
+            try:
+                _write_text(base + ".html", self.render(summary))
+            except Exception as e:
+                print(f"[report] HTML for {acc['key']} failed:", e)
+        _write_text(base + ".json", json.dumps({**acc, "final": final, "summary": summary}, indent=1))
+        self.index[acc["key"]] = self._index_entry(summary)
+
+    # ----------------- READ SIDE -----------------
+    @staticmethod
+    def _index_entry(summary):
+        return {k: summary[k] for k in ("kind", "key", "start", "end", "final", "generated", "total",
+                                        "good", "defect", "defect_pct", "per_hour")}
+
+    def _read_json(self, kind, key):
+        try:
+            with open(os.path.join(self.out_dir, kind, key + ".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _load_index(self):
+        for kind in KINDS:
+            folder = os.path.join(self.out_dir, kind)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if name.endswith(".json"):
+                    data = self._read_json(kind, name[:-5])
+                    if data and "summary" in data:
+                        self.index[data["key"]] = self._index_entry(data["summary"])
+
+    def list(self, kind=None, limit=50):
+        items = [v for v in self.index.values() if kind is None or v["kind"] == kind]
+        return sorted(items, key=lambda v: (v["start"], v["kind"]), reverse=True)[:limit]
+
+    # ----------------- SCHEDULER -----------------
+    def start(self):
+        def _loop():
+            while True:
+                try:
+                    self.run()
+                except Exception as e:
+                    print("[report] run failed:", e)
+                time.sleep(self.config.snapshot().get("report_interval_min", 5) * 60)
+        threading.Thread(target=_loop, daemon=True, name="report").start()
+        return self
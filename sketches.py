@@ -0,0 +1,235 @@
+# sketches.py — STREAMING CONFIDENCE DISTRIBUTIONS + DRIFT ALERTS
+#
+# Every crossing (record_crossing, both ENGINE_MODEs) adds its confidence to a
+# per-category sliding-window histogram. Memory is fixed: confidence lives in
+# [0, 1], so BINS equal-width bins (0.02 wide) give quantiles accurate to one bin
+# width, and a window is a ring of time buckets:
+#
+#   "1h"  = 60 x 1 min buckets     (what the line looks like right now)
+#   "24h" = 96 x 15 min buckets    (the reference a baseline is frozen from)
+#
+# Drift = Population Stability Index between the frozen baseline and the 1h window
+# (on 10 coarse bins). PSI >= drift_psi with >= drift_min_samples in the window ->
+# alert (cleared below drift_psi / 2). Typical causes: lighting change, new bottle
+# design, dirty lens, wrong model deployed.
+#
+# The baseline is frozen automatically once the 24h window of a category holds
+# drift_baseline_samples, or on demand via POST /admin/drift/baseline, and kept in
+# instance/confidence_baseline.json across restarts.
+#
+# /api/confidence serves snapshot() straight from memory — no DB query per request.
+
+import os, json, time, threading
+
+import numpy as np
+
+import metrics
+from inspection import GOOD_KEY, DEFECT_KEYS
+
+BINS = 50
+COARSE = 10                       # bins for PSI + the chart (5 fine bins each)
+WINDOWS = {"1h": (3600, 60), "24h": (86400, 900)}   # name -> (window_s, bucket_s)
+CHECK_EVERY = 10.0                # s between drift evaluations
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+BASELINE_PATH = os.path.join("instance", "confidence_baseline.json")
+CATEGORIES = [GOOD_KEY] + sorted(DEFECT_KEYS)
+
+DRIFT_ALERTS = metrics.Counter("conf_drift_alerts_total", "Confidence drift alerts raised")
+
+
+class SlidingHistogram:
+    """Counts per confidence bin over the last window_s seconds, in bucket_s steps."""
+
+    def __init__(self, window_s, bucket_s, bins=BINS):
+        self.bucket_s = bucket_s
+        self.n = int(window_s // bucket_s)
+        self.bins = bins
+        self.counts = np.zeros((self.n, bins), dtype=np.int64)
+        self.slot_of = np.full(self.n, -1, dtype=np.int64)   # absolute bucket number per slot
+
+    def add(self, value, now):
+        b = int(now // self.bucket_s)
+        slot = b % self.n
+        if self.slot_of[slot] != b:      # slot last used a full window ago -> recycle
+            self.counts[slot] = 0
+            self.slot_of[slot] = b
+        self.counts[slot, min(self.bins - 1, max(0, int(value * self.bins)))] += 1
+
+    def histogram(self, now):
+        b = int(now // self.bucket_s)
+        live = self.slot_of > b - self.n
+        return self.counts[live].sum(axis=0)
+
+
+def quantile(hist, q):
+    """q-quantile of a [0, 1] histogram, linear inside the bin. None if empty."""
+    total = hist.sum()
+    if not total:
+        return None
+    cum = np.cumsum(hist)
+    target = q * total
+    i = int(np.searchsorted(cum, target))
+    i = min(i, len(hist) - 1)
+    below = cum[i - 1] if i else 0
+    frac = (target - below) / hist[i] if hist[i] else 0.0
+    return round((i + frac) / len(hist), 4)
+
+
+def coarse(hist, bins=COARSE):
+    return hist.reshape(bins, -1).sum(axis=1)
+
+
+def psi(base, cur, eps=1e-4):
+    """Population Stability Index of two histograms (same bins). <0.1 stable, >0.25 shifted."""
+    p = base / max(1, base.sum()) + eps
+    q = cur / max(1, cur.sum()) + eps
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def _summary(hist):
+    return {"n": int(hist.sum()),
+            "q": {f"p{int(q * 100):02d}": quantile(hist, q) for q in QUANTILES},
+            "hist": coarse(hist).tolist()}
+
+
+class ConfidenceMonitor:
+    def __init__(self, config, path=BASELINE_PATH, categories=CATEGORIES):
+        self.config = config
+        self.path = path
+        self.categories = list(categories)
+        self._lock = threading.Lock()
+        self.windows = {c: {w: SlidingHistogram(*spec) for w, spec in WINDOWS.items()}
+                        for c in self.categories}
+        self.baseline = {}        # category -> {"hist": np.array(BINS), "frozen": ts, "source": str}
+        self.state = {c: {"psi": None, "drift": False, "since": None} for c in self.categories}
+        self._checked = 0.0
+        self._load()
+        metrics.Gauge("conf_drift_psi", "PSI of the 1h confidence histogram vs baseline",
+                      fn=lambda: {(("category", c),): s["psi"] or 0.0 for c, s in self.state.items()})
+        metrics.Gauge("conf_quantile", "Confidence quantiles over the last hour", fn=self._quantile_gauge)
+
+    # ----------------- BASELINE FILE -----------------
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            for c, b in data.items():
+                if c in self.windows and len(b.get("hist", [])) == BINS:
+                    self.baseline[c] = {**b, "hist": np.asarray(b["hist"], dtype=np.int64)}
+            print(f"[drift] baseline loaded for {', '.join(self.baseline) or 'no category'}")
+        except (OSError, ValueError) as e:
+            print("[drift] baseline unreadable, starting without:", e)
+
+    def _save(self):
+        data = {c: {**b, "hist": b["hist"].tolist()} for c, b in self.baseline.items()}
+        tmp = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print("[drift] failed to save baseline:", e)
+
+    def set_baseline(self, category=None, window="24h", now=None, source="api"):
+        """Freeze the current `window` histogram as baseline (one or all categories)."""
+        now = now or time.time()
+        cats = [category] if category else self.categories
+        frozen = []
+        with self._lock:
+            for c in cats:
+                if c not in self.windows:
+                    continue
+                h = self.windows[c][window].histogram(now)
+                if h.sum():
+                    self.baseline[c] = {"hist": h, "frozen": time.strftime("%Y-%m-%d %H:%M:%S"),
+                                        "source": source, "n": int(h.sum())}
+                    self.state[c].update(psi=None, drift=False, since=None)
+                    frozen.append(c)
+            self._save()
+        if frozen:
+            print(f"[drift] baseline frozen ({source}, {window}): {', '.join(frozen)}")
+        return frozen
+
+    def clear_baseline(self, category=None):
+        with self._lock:
+            for c in ([category] if category else list(self.baseline)):
+                if c not in self.state:
+                    continue
+                self.baseline.pop(c, None)
+                self.state[c].update(psi=None, drift=False, since=None)
+            self._save()
+
+    # ----------------- HOT PATH -----------------
+    def observe(self, category, conf, now=None):
+        """One crossing. O(1); drift is re-evaluated at most every CHECK_EVERY s."""
+        now = now or time.time()
+        wins = self.windows.get(category)
+        if wins is None:
+            return
+        with self._lock:
+            for h in wins.values():
+                h.add(conf, now)
+        if now - self._checked >= CHECK_EVERY:
+            self._checked = now
+            self.check(now)
+
+    def check(self, now=None):
+        now = now or time.time()
+        cfg = self.config.snapshot()
+        auto = []
+        with self._lock:
+            for c in self.categories:
+                cur = self.windows[c]["1h"].histogram(now)
+                base = self.baseline.get(c)
+                if base is None:
+                    if self.windows[c]["24h"].histogram(now).sum() >= cfg["drift_baseline_samples"]:
+                        auto.append(c)
+                    continue
+                st = self.state[c]
+                if cur.sum() < cfg["drift_min_samples"]:
+                    st["psi"] = None
+                    continue
+                st["psi"] = round(psi(coarse(base["hist"]), coarse(cur)), 4)
+                if not st["drift"] and st["psi"] >= cfg["drift_psi"]:
+                    st.update(drift=True, since=time.strftime("%Y-%m-%d %H:%M:%S"))
+                    DRIFT_ALERTS.inc(category=c)
+                    print(f"[drift] ALERT {c}: PSI {st['psi']:.3f} (median {quantile(cur, 0.5)} "
+                          f"vs baseline {quantile(base['hist'], 0.5)}, n={int(cur.sum())})")
+                elif st["drift"] and st["psi"] < cfg["drift_psi"] / 2:
+                    st.update(drift=False, since=None)
+                    print(f"[drift] {c} back to normal (PSI {st['psi']:.3f})")
+        for c in auto:
+            self.set_baseline(c, now=now, source="auto")
+
+    # ----------------- READ SIDE -----------------
+    def snapshot(self, now=None):
+        """Everything analysis.html needs, from memory."""
+        now = now or time.time()
+        cats = {}
+        with self._lock:
+            for c in self.categories:
+                entry = {w: _summary(h.histogram(now)) for w, h in self.windows[c].items()}
+                base = self.baseline.get(c)
+                entry["baseline"] = ({**_summary(base["hist"]), "frozen": base["frozen"], "source": base["source"]}
+                                     if base is not None else None)
+                entry.update(self.state[c])
+                cats[c] = entry
+        return {"bins": [round(i / COARSE, 2) for i in range(COARSE + 1)],
+                "categories": cats,
+                "alerts": [c for c, e in cats.items() if e["drift"]],
+                "drift_psi": self.config["drift_psi"]}
+
+    def _quantile_gauge(self):
+        now = time.time()
+        out = {}
+        with self._lock:
+            for c in self.categories:
+                h = self.windows[c]["1h"].histogram(now)
+                for q in (0.05, 0.5, 0.95):
+                    v = quantile(h, q)
+                    if v is not None:
+                        out[(("category", c), ("q", str(q)))] = v
+        return out
@@ -0,0 +1,338 @@
+# sources.py — PLUGGABLE CAPTURE SOURCES
+# One spec string per camera button, from env QC_CAMERAS (";"-separated):
+#
+#   0                      local device 0, platform backend (V4L2 on Linux, DSHOW on Windows)
+#   v4l2:/dev/video2       V4L2 explicitly; MJPG fourcc negotiated by default
+#   dshow:1                DirectShow explicitly
+#   rtsp://10.0.0.21/s1    IP camera via FFmpeg, buffer size 1, TCP, low-delay flags
+#   gst:<pipeline>         raw GStreamer pipeline (must end in appsink)
+#   file:replay/l1.mp4     video replay at native fps (loops)
+#   folder:samples/        image folder replay (sorted, loops)
+#
+# Options after "|" as key=value pairs separated by ",":
+#   0|width=1920,height=1080,fps=30,fourcc=MJPG
+#   rtsp://cam/stream|transport=udp,gst=1,decoder=vaapih264dec
+#   folder:samples/|fps=5,loop=0
+#
+# Every source reports the negotiated width/height/fps/fourcc plus measured fps
+# and capture latency (info()). Sources quack like cv2.VideoCapture
+# (read / grab / release / isOpened), so CameraSupervisor doesn't care which.
+
+import os, sys, glob, time
+
+import cv2
+
+DEFAULT_SPECS = "0;1;2"
+IMAGE_EXT = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def _fourcc_str(v):
+    v = int(v)
+    s = "".join(chr((v >> 8 * i) & 0xFF) for i in range(4))
+    return s if s.isprintable() and s.strip() else ""
+
+
+def parse_spec(spec):
+    """'kind:target|k=v,k=v' -> (kind, target, opts)."""
+    spec = spec.strip()
+    target, _, optstr = spec.partition("|")
+    opts = {}
+    for part in filter(None, (p.strip() for p in optstr.split(","))):
+        k, _, v = part.partition("=")
+        opts[k.strip()] = v.strip()
+    target = target.strip()
+    if target.isdigit():
+        return "device", target, opts
+    low = target.lower()
+    for scheme in ("rtsp://", "rtsps://", "rtmp://", "http://", "https://"):
+        if low.startswith(scheme):
+            return "stream", target, opts
+    kind, sep, rest = target.partition(":")
+    if sep and kind.lower() in ("v4l2", "dshow", "msmf", "gst", "file", "folder"):
+        return kind.lower(), rest, opts
+    raise ValueError(f"unknown capture source {spec!r}")
+
+
+def load_specs(text=None):
+    text = text if text is not None else os.getenv("QC_CAMERAS", DEFAULT_SPECS)
+    return [s.strip() for s in text.split(";") if s.strip()]
+
+
+# ====================================================================
+# BASE
+# ====================================================================
+class CaptureSource:
+    kind = "base"
+
+    def __init__(self, target, opts=None):
+        self.target = target
+        self.opts = opts or {}
+        self.cap = None
+        self.width = self.height = 0
+        self.fps = 0.0           # negotiated / nominal
+        self.fourcc = ""
+        self.measured_fps = 0.0
+        self.latency_ms = 0.0    # see _latency()
+        self.latency_src = "decode"
+        self._last_frame_at = None
+
+    def opt(self, key, default, cast=str):
+        v = self.opts.get(key)
+        return default if v in (None, "") else cast(v)
+
+    # ---- subclass API ----
+    def _open(self):
+        """-> cv2.VideoCapture-like or None"""
+        raise NotImplementedError
+
+    def open(self):
+        self.cap = self._open()
+        if self.cap is None or not self.cap.isOpened():
+            self.release()
+            return False
+        self._negotiated()
+        ok, _ = self.read()  # probe: opened is not the same as delivering frames
+        if not ok:
+            self.release()
+            return False
+        return True
+
+    def _negotiated(self):
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = float(self.cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        self.fourcc = _fourcc_str(self.cap.get(cv2.CAP_PROP_FOURCC))
+
+    def grab(self):
+        return self.cap.grab()
+
+    def read(self):
+        # grab() = wait for the next frame, retrieve() = decode/convert it
+        if not self.grab():
+            return False, None
+        t0 = time.perf_counter()
+        ok, frame = self.cap.retrieve()
+        if not ok:
+            return False, None
+        self._measure(t0)
+        return True, frame
+
+    def _latency(self, t_grabbed):
+        return (time.perf_counter() - t_grabbed) * 1000.0
+
+    def _measure(self, t_grabbed):
+        lat = self._latency(t_grabbed)
+        self.latency_ms = lat if not self.latency_ms else 0.9 * self.latency_ms + 0.1 * lat
+        now = time.perf_counter()
+        if self._last_frame_at is not None and now > self._last_frame_at:
+            inst = 1.0 / (now - self._last_frame_at)
+            self.measured_fps = inst if not self.measured_fps else 0.9 * self.measured_fps + 0.1 * inst
+        self._last_frame_at = now
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def release(self):
+        if self.cap is not None:
+            try: self.cap.release()
+            except Exception: pass
+        self.cap = None
+
+    def info(self):
+        return {"kind": self.kind, "target": self.target,
+                "width": self.width, "height": self.height, "fps": round(self.fps, 2),
+                "fourcc": self.fourcc, "measured_fps": round(self.measured_fps, 2),
+                "latency_ms": round(self.latency_ms, 2), "latency_src": self.latency_src}
+
+
+# ====================================================================
+# LOCAL DEVICES
+# ====================================================================
+class DeviceSource(CaptureSource):
+    """USB/UVC camera. MJPG by default: 3 x 720p YUYV does not fit one USB 2 bus, MJPG does."""
+    kind = "device"
+    BACKENDS = {"v4l2": cv2.CAP_V4L2, "dshow": cv2.CAP_DSHOW, "msmf": cv2.CAP_MSMF}
+
+    def __init__(self, target, opts=None, backend=None):
+        super().__init__(target, opts)
+        if backend is None:
+            backend = "dshow" if sys.platform.startswith("win") else "v4l2"
+        self.backend = backend
+        self.kind = backend
+
+    def _open(self):
+        dev = int(self.target) if str(self.target).isdigit() else self.target
+        cap = cv2.VideoCapture(dev, self.BACKENDS[self.backend])
+        if not cap.isOpened():
+            return cap
+        # V4L2: the pixel format has to be chosen before the frame size
+        fourcc = self.opt("fourcc", "MJPG")
+        if fourcc and fourcc.lower() != "raw":
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc[:4].ljust(4)))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.opt("width", 1280, int))
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.opt("height", 720, int))
+        cap.set(cv2.CAP_PROP_FPS, self.opt("fps", 30, float))
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, self.opt("buffers", 2, int))
+        return cap
+
+    def _negotiated(self):
+        super()._negotiated()
+        want = self.opt("fourcc", "MJPG")
+        if want.lower() != "raw" and self.fourcc and self.fourcc != want:
+            print(f"[camera] {self.target}: asked {want}, driver gave {self.fourcc}")
+
+    def _latency(self, t_grabbed):
+        # V4L2 reports the driver's buffer timestamp (CLOCK_MONOTONIC) -> real
+        # sensor-to-app latency; otherwise fall back to decode time
+        if self.backend == "v4l2":
+            ts = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+            lat = time.monotonic() * 1000.0 - ts
+            if ts > 0 and 0 <= lat < 2000:
+                self.latency_src = "driver_ts"
+                return lat
+        self.latency_src = "decode"
+        return super()._latency(t_grabbed)
+
+
+# ====================================================================
+# NETWORK / PIPELINES
+# ====================================================================
+class StreamSource(CaptureSource):
+    """RTSP / HTTP camera. FFmpeg with a 1-frame buffer, or GStreamer HW decode (gst=1)."""
+    kind = "stream"
+
+    def _open(self):
+        if self.opt("gst", "0") == "1":
+            self.kind = "stream-gst"
+            return cv2.VideoCapture(self._gst_pipeline(), cv2.CAP_GSTREAMER)
+        # process-wide FFmpeg options; only set if the operator didn't already
+        transport = self.opt("transport", "tcp")
+        os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS",
+                              f"rtsp_transport;{transport}|fflags;nobuffer|flags;low_delay")
+        timeout_ms = self.opt("timeout_ms", 5000, int)
+        cap = cv2.VideoCapture(self.target, cv2.CAP_FFMPEG,
+                               [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+                                cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms])
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def _gst_pipeline(self):
+        codec = self.opt("codec", "h264")
+        decoder = self.opt("decoder", "decodebin")
+        return (f"rtspsrc location={self.target} latency=0 protocols={self.opt('transport', 'tcp')} ! "
+                f"rtp{codec}depay ! {codec}parse ! {decoder} ! videoconvert ! "
+                "video/x-raw,format=BGR ! appsink drop=true max-buffers=1 sync=false")
+
+
+class GstSource(CaptureSource):
+    """Any GStreamer pipeline, e.g. HW-decoded MJPG from a USB cam on a Jetson."""
+    kind = "gst"
+
+    def _open(self):
+        pipeline = self.target
+        if "appsink" not in pipeline:
+            pipeline += " ! videoconvert ! video/x-raw,format=BGR ! appsink drop=true max-buffers=1 sync=false"
+        return cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+
+
+# ====================================================================
+# REPLAY
+# ====================================================================
+class FileSource(CaptureSource):
+    """Video file, paced at its own fps (realtime=0 -> as fast as possible)."""
+    kind = "file"
+
+    def _open(self):
+        self.loop = self.opt("loop", "1") == "1"
+        self.realtime = self.opt("realtime", "1") == "1"
+        self._next_at = time.perf_counter()
+        return cv2.VideoCapture(self.target)
+
+    def _negotiated(self):
+        super()._negotiated()
+        self.fps = self.opt("fps", self.fps or 25.0, float)
+
+    def _pace(self):
+        delay = self._next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        # never "catch up" more than 1 s after a pause
+        self._next_at = max(self._next_at, time.perf_counter() - 1.0) + 1.0 / self.fps
+
+    def _rewind(self):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def grab(self):
+        if self.realtime:
+            self._pace()
+        if self.cap.grab():
+            return True
+        if not self.loop:
+            return False
+        self._rewind()
+        return self.cap.grab()
+
+
+class _Folder:
+    """Minimal VideoCapture look-alike over a sorted list of image files."""
+
+    def __init__(self, files):
+        self.files = files
+        self.pos = 0
+        self._path = None
+
+    def isOpened(self):
+        return bool(self.files)
+
+    def grab(self):
+        if self.pos >= len(self.files):
+            return False
+        self._path = self.files[self.pos]
+        self.pos += 1
+        return True
+
+    def retrieve(self):
+        frame = cv2.imread(self._path) if self._path else None
+        return frame is not None, frame
+
+    def get(self, prop):
+        return 0
+
+    def release(self):
+        self.files = []
+
+
+class FolderSource(FileSource):
+    kind = "folder"
+
+    def _open(self):
+        self.loop = self.opt("loop", "1") == "1"
+        self.realtime = True
+        self._next_at = time.perf_counter()
+        files = sorted(f for f in glob.glob(os.path.join(self.target, "*"))
+                       if f.lower().endswith(IMAGE_EXT))
+        return _Folder(files)
+
+    def _negotiated(self):
+        self.fps = self.opt("fps", 10.0, float)
+        first = cv2.imread(self.cap.files[0]) if self.cap.files else None
+        if first is not None:
+            self.height, self.width = first.shape[:2]
+
+    def _rewind(self):
+        self.cap.pos = 0
+
+
+def make_source(spec):
+    kind, target, opts = parse_spec(spec)
+    if kind == "device":
+        return DeviceSource(target, opts)
+    if kind in DeviceSource.BACKENDS:
+        return DeviceSource(target, opts, backend=kind)
+    if kind == "stream":
+        return StreamSource(target, opts)
+    if kind == "gst":
+        return GstSource(target, opts)
+    if kind == "file":
+        return FileSource(target, opts)
+    return FolderSource(target, opts)
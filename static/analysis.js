@@ -3,12 +3,16 @@
 
 const $ = (s) => document.querySelector(s);
 const el = (id) => document.getElementById(id);
-const bust = () => `&_=${Date.now()}`;
 
 let pollingActive = true;
 document.addEventListener('visibilitychange', () => { pollingActive = !document.hidden; });
 
-const ctl = { stats: null, detail: null };
+const ctl = { stats: null, detail: null, conf: null };
+
+// aggregator mode: KPI + breakdown untuk seluruh plant, satu line, atau satu station
+const AGG = document.body.dataset.aggregator === '1';
+let scope = '';
+const scoped = (path) => (scope ? `${path}?${scope}` : path);
 
 function setText(id, v) { const n = el(id); if (n) n.textContent = v; }
 function fmtPct(x) { return (Math.round((x ?? 0) * 100) / 100).toFixed(2); }
@@ -88,7 +92,7 @@ async function pollStats() {
     if (ctl.stats) ctl.stats.abort();
     ctl.stats = new AbortController();
 
-    const r = await fetch(`/stats?t=${Date.now()}${bust()}`, { signal: ctl.stats.signal });
+    const r = await fetch(scoped('/stats'), { signal: ctl.stats.signal, cache: 'no-cache' });  // 304 while unchanged
     if (!r.ok) return;
     const d = await r.json();
 
@@ -120,7 +124,7 @@ async function pollDetail() {
     if (ctl.detail) ctl.detail.abort();
     ctl.detail = new AbortController();
 
-    const r = await fetch(`/stats_detail?t=${Date.now()}${bust()}`, { signal: ctl.detail.signal });
+    const r = await fetch(scoped('/stats_detail'), { signal: ctl.detail.signal, cache: 'no-cache' });
     if (!r.ok) return;
     const d = await r.json();
 
@@ -145,8 +149,206 @@ async function pollDetail() {
   }
 }
 
+/* === /api/confidence — distribusi confidence + drift (dari memori server, tanpa query DB) === */
+const CONF_COLORS = { Normal: '#66BB6A', Touching_Characters: '#64B5F6', Double_Print: '#FFB74D', Missing_Text: '#EF9A9A' };
+let confHist = null;
+
+function initConfChart(bins) {
+  const ctx = el('confHist');
+  if (!ctx || confHist) return;
+  const labels = bins.slice(0, -1).map((b, i) => `${b.toFixed(1)}–${bins[i + 1].toFixed(1)}`);
+  confHist = new Chart(ctx, {
+    type: 'line',
+    data: { labels, datasets: [] },
+    options: {
+      responsive: true,
+      maintainAspectRatio: false,
+      scales: {
+        x: { ticks: { color: '#ddd', font: { size: 10 } }, grid: { color: 'rgba(255,255,255,0.05)' } },
+        y: { ticks: { color: '#ddd', callback: (v) => `${v}%` }, grid: { color: 'rgba(255,255,255,0.05)' }, beginAtZero: true }
+      },
+      plugins: { legend: { position: 'bottom', labels: { color: '#ddd' } } }
+    }
+  });
+}
+
+function fmtQ(v) { return v == null ? '—' : v.toFixed(3); }
+
+async function pollConfidence() {
+  if (!pollingActive) return;
+  try {
+    if (ctl.conf) ctl.conf.abort();
+    ctl.conf = new AbortController();
+
+    const r = await fetch('/api/confidence', { signal: ctl.conf.signal, cache: 'no-store' });
+    if (!r.ok) return;
+    const d = await r.json();
+    if (!d.bins || !d.bins.length) return;
+    initConfChart(d.bins);
+
+    const rows = [];
+    const datasets = [];
+    for (const [cat, c] of Object.entries(d.categories)) {
+      const win = c['1h'];
+      const n = win.n || 0;
+      datasets.push({
+        label: cat.replace(/_/g, ' '),
+        data: win.hist.map((x) => (n ? Math.round(x / n * 1000) / 10 : 0)),
+        borderColor: CONF_COLORS[cat] || '#aaa',
+        backgroundColor: 'transparent',
+        tension: 0.3,
+        hidden: n === 0
+      });
+      const status = c.drift ? `<span class="conf-drift">DRIFT</span>`
+                   : c.psi == null ? `<span class="conf-na">${c.baseline ? 'sample kurang' : 'belum ada baseline'}</span>`
+                   : `<span class="conf-ok">OK</span>`;
+      rows.push(`<tr><td>${cat.replace(/_/g, ' ')}</td><td>${n}</td><td>${fmtQ(win.q.p05)}</td>` +
+                `<td>${fmtQ(win.q.p50)}</td><td>${fmtQ(win.q.p95)}</td>` +
+                `<td>${c.baseline ? fmtQ(c.baseline.q.p50) : '—'}</td>` +
+                `<td>${c.psi == null ? '—' : c.psi.toFixed(3)}</td><td>${status}</td></tr>`);
+    }
+    el('conf_rows').innerHTML = rows.join('');
+    if (confHist) {
+      confHist.data.datasets = datasets;
+      confHist.update('none');
+    }
+
+    const alert = el('drift_alert');
+    if (alert) {
+      alert.hidden = !d.alerts.length;
+      alert.textContent = d.alerts.length
+        ? `⚠ Distribusi confidence berubah (drift) untuk: ${d.alerts.map((c) => c.replace(/_/g, ' ')).join(', ')} — cek pencahayaan, kamera, atau desain botol baru.`
+        : '';
+    }
+  } catch (err) {
+    if (err.name !== 'AbortError') console.warn("pollConfidence error:", err);
+  } finally {
+    ctl.conf = null;
+  }
+}
+
+/* === aggregator: stations + throughput / defect rate per line === */
+const LINE_COLORS = ['#64B5F6', '#FFB74D', '#66BB6A', '#EF9A9A', '#BA68C8', '#4DD0E1', '#FFF176', '#A1887F'];
+const esc = (s) => String(s ?? '').replace(/[&<>"']/g, (c) => `&#${c.charCodeAt(0)};`);
+let lineThroughput = null;
+let lineDefect = null;
+
+function lineChart(id, yFmt) {
+  const ctx = el(id);
+  if (!ctx) return null;
+  return new Chart(ctx, {
+    type: 'line',
+    data: { labels: [], datasets: [] },
+    options: {
+      responsive: true,
+      maintainAspectRatio: false,
+      scales: {
+        x: { ticks: { color: '#ddd', font: { size: 10 } }, grid: { color: 'rgba(255,255,255,0.05)' } },
+        y: { ticks: { color: '#ddd', callback: yFmt }, grid: { color: 'rgba(255,255,255,0.05)' }, beginAtZero: true }
+      },
+      plugins: { legend: { position: 'bottom', labels: { color: '#ddd' } } }
+    }
+  });
+}
+
+async function pollStations() {
+  if (!pollingActive) return;
+  try {
+    const r = await fetch('/api/stations', { cache: 'no-store' });
+    if (!r.ok) return;
+    const d = await r.json();
+    el('station_rows').innerHTML = d.stations.map((s) =>
+      `<tr><td>${esc(s.station)}</td><td>${esc(s.line) || '—'}</td><td>${s.recent_per_hour}</td>` +
+      `<td>${fmtPct(s.recent_defect_pct)}%</td><td>${s.rows}</td><td>${esc(s.last_seen)}</td></tr>`).join('');
+
+    const sel = el('scope');
+    const opts = [''].concat(d.lines.filter((l) => l).map((l) => `line=${encodeURIComponent(l)}`),
+                             d.stations.map((s) => `station=${encodeURIComponent(s.station)}`));
+    if (sel && sel.options.length !== opts.length) {
+      sel.innerHTML = opts.map((v) => {
+        const label = !v ? 'Semua line &amp; station'
+          : v.startsWith('line=') ? `Line ${esc(decodeURIComponent(v.slice(5)))}`
+          : `Station ${esc(decodeURIComponent(v.slice(8)))}`;
+        return `<option value="${esc(v)}">${label}</option>`;
+      }).join('');
+      sel.value = scope;
+    }
+  } catch (err) {
+    console.warn("pollStations error:", err);
+  }
+}
+
+async function pollRollup() {
+  if (!pollingActive) return;
+  try {
+    const r = await fetch('/api/rollup?hours=24', { cache: 'no-cache' });
+    if (!r.ok) return;
+    const d = await r.json();
+    const hours = [...new Set(Object.values(d).flat().map((p) => p.hour))].sort();
+    const tp = [];
+    const dr = [];
+    Object.entries(d).forEach(([line, points], i) => {
+      const byHour = Object.fromEntries(points.map((p) => [p.hour, p]));
+      const color = LINE_COLORS[i % LINE_COLORS.length];
+      const name = line === '-' ? '(tanpa line)' : line;
+      tp.push({ label: name, borderColor: color, backgroundColor: 'transparent', tension: 0.3,
+                data: hours.map((h) => (byHour[h] ? byHour[h].good + byHour[h].defect : 0)) });
+      dr.push({ label: name, borderColor: color, backgroundColor: 'transparent', tension: 0.3,
+                data: hours.map((h) => {
+                  const p = byHour[h];
+                  const n = p ? p.good + p.defect : 0;
+                  return n ? Math.round(p.defect / n * 10000) / 100 : null;
+                }) });
+    });
+    const labels = hours.map((h) => `${h.slice(11)}:00`);
+    for (const [chart, data] of [[lineThroughput, tp], [lineDefect, dr]]) {
+      if (!chart) continue;
+      chart.data.labels = labels;
+      chart.data.datasets = data;
+      chart.update('none');
+    }
+  } catch (err) {
+    console.warn("pollRollup error:", err);
+  }
+}
+
+/* === Shift / daily reports (pre-generated files, see shift_report.py) === */
+async function pollReports() {
+  const body = el('report_rows');
+  if (!pollingActive || !body) return;
+  try {
+    const r = await fetch('/api/reports?limit=12', { cache: 'no-store' });
+    if (!r.ok) return;
+    const d = await r.json();
+    body.innerHTML = d.reports.map((p) => {
+      const base = `/reports/${p.kind}/${encodeURIComponent(p.key)}`;
+      return `<tr><td>${esc(p.key)}<div class="muted-sm">${esc(p.start.slice(5, 16))} – ${esc(p.end.slice(5, 16))}</div></td>` +
+        `<td>${p.kind === 'shifts' ? 'Shift' : 'Harian'}</td><td>${p.total}</td><td>${fmtPct(p.defect_pct)}%</td>` +
+        `<td>${p.per_hour}</td><td>${p.final ? 'final' : 'berjalan'}</td>` +
+        `<td><a href="${base}.html" target="_blank">HTML</a> · <a href="${base}.csv">CSV</a></td></tr>`;
+    }).join('') || '<tr><td colspan="7">Belum ada laporan</td></tr>';
+  } catch (err) {
+    console.warn("pollReports error:", err);
+  }
+}
+
+if (AGG) {
+  lineThroughput = lineChart('lineThroughput', (v) => v);
+  lineDefect = lineChart('lineDefect', (v) => `${v}%`);
+  const sel = el('scope');
+  if (sel) sel.addEventListener('change', () => { scope = sel.value; pollStats(); pollDetail(); });
+  pollStations();
+  pollRollup();
+  setInterval(pollStations, 10000);
+  setInterval(pollRollup, 30000);
+}
+
 /* === Start polling === */
 pollStats();
 pollDetail();
+pollConfidence();
 setInterval(pollStats, 2000);
 setInterval(pollDetail, 2000);
+setInterval(pollConfidence, 5000);
+pollReports();
+setInterval(pollReports, 60000);
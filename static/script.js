@@ -64,8 +64,8 @@ async function updateStats() {
     if (ctl.stats) ctl.stats.abort();
     ctl.stats = new AbortController();
 
-    // Use fast in-memory live counts for UI responsiveness
-    const res = await fetch(`/live_counts?t=${Date.now()}`, { signal: ctl.stats.signal });
+    // no-cache = revalidate with If-None-Match -> server answers 304 while nothing changed
+    const res = await fetch('/live_counts', { signal: ctl.stats.signal, cache: 'no-cache' });
     if (!res.ok) return;
 
     const d = await res.json();
@@ -91,7 +91,7 @@ async function pollLampState() {
     if (ctl.lamp) ctl.lamp.abort();
     ctl.lamp = new AbortController();
 
-    const res = await fetch(`/lamp_state?t=${Date.now()}`, { signal: ctl.lamp.signal });
+    const res = await fetch('/lamp_state', { signal: ctl.lamp.signal, cache: 'no-store' });
     if (!res.ok) return;
     const d = await res.json();
     const lampOn = Boolean(d.lamp);
@@ -166,7 +166,7 @@ if (camButtons && camButtons.length) {
 // -------------------------------
 async function checkCameraStatus() {
   try {
-    const res = await fetch("/camera_status?t=" + Date.now());
+    const res = await fetch("/camera_status", { cache: "no-store" });
     const data = await res.json();
     if (data.ok) {
       if (streamStatus) {
@@ -275,6 +275,20 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   }
 
+  // reset jalan sebagai background job -> poll progress sampai selesai
+  async function waitResetJob(jobId) {
+    const status = el("resetStatus");
+    while (true) {
+      const res = await fetch(`/jobs/${jobId}`, { headers: { "X-Admin-Key": validPass } });
+      const job = await res.json();
+      if (!res.ok || !job.ok) throw new Error(job.msg || "job error");
+      if (status) status.textContent = `Reset: ${Math.round((job.progress ?? 0) * 100)}% ${job.message || ""}`;
+      if (job.state === "done") return job.result;
+      if (job.state === "failed" || job.state === "cancelled") throw new Error(job.error || job.state);
+      await new Promise((r) => setTimeout(r, 500));
+    }
+  }
+
   if (confirmDeleteBtn) {
     confirmDeleteBtn.addEventListener("click", async () => {
       try {
@@ -287,6 +301,8 @@ document.addEventListener("DOMContentLoaded", () => {
 
         if (data.ok) {
           if (confirmModal) confirmModal.classList.add("hidden");
+          showToast("⏳ Reset berjalan di background...", "info");
+          await waitResetJob(data.job_id);
           showToast("✅ Semua data berhasil dihapus!", "success");
           setTimeout(() => location.reload(), 900);
         } else {
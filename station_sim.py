@@ -0,0 +1,139 @@
+# station_sim.py — MULTI-STATION SIMULATOR FOR THE AGGREGATOR (ingest throughput)
+# N fake line stations, one thread each, send gzip'd batches (uplink.encode_batch)
+# with increasing seq to POST /ingest; a fraction of the batches is sent twice to
+# exercise the (station, seq) idempotency. Prints rows/s, batches/s, latency
+# p50/p99 and checks the aggregator total equals what was generated (no double count).
+#
+#   python station_sim.py --url http://localhost:5000 --stations 20 --batches 50 --batch 500
+#   python station_sim.py --stations 8        # no --url: in-process aggregator on a temp SQLite
+#
+# Without --url the app is imported with ENGINE_MODE=aggregator / DB_MODE=sqlite and
+# driven through the Flask test client: measures ingest + rollup cost without HTTP.
+
+import os, sys, json, time, random, argparse, tempfile, threading
+from datetime import datetime, timedelta
+
+from uplink import encode_batch
+from inspection import GOOD_KEY, DEFECT_KEYS
+
+CATEGORIES = [GOOD_KEY] * 95 + sorted(DEFECT_KEYS) * 2   # ~6% defect
+
+
+def make_rows(first_id, n, t0, rng):
+    rows = []
+    for i in range(n):
+        ts = (t0 + timedelta(seconds=(first_id + i) * 0.4)).strftime("%Y-%m-%d %H:%M:%S")
+        rows.append((first_id + i, ts, rng.choice(CATEGORIES), round(rng.uniform(0.5, 0.99), 4), 0))
+    return rows
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class HttpClient:
+    def __init__(self, url, key):
+        import urllib.request
+        self.urllib = urllib.request
+        self.url = url.rstrip("/")
+        self.key = key
+
+    def post(self, body):
+        req = self.urllib.Request(self.url + "/ingest", data=body, method="POST", headers={
+            "Content-Type": "application/json", "Content-Encoding": "gzip", "X-Ingest-Key": self.key})
+        with self.urllib.urlopen(req, timeout=30) as resp:
+            return json.loads(resp.read())
+
+    def get(self, path):
+        with self.urllib.urlopen(self.url + path, timeout=30) as resp:
+            return json.loads(resp.read())
+
+
+class LocalClient:
+    """In-process aggregator (Flask test client) on a throwaway SQLite file."""
+
+    def __init__(self, key):
+        tmp = tempfile.mkdtemp(prefix="aggsim_")
+        os.environ.update(ENGINE_MODE="aggregator", DB_MODE="sqlite", INGEST_KEY=key,
+                          SQLITE_URI=f"sqlite:///{os.path.join(tmp, 'aggregator.db')}")
+        import app as qc
+        qc.startup()
+        self.client = qc.app.test_client()
+        self.key = key
+        print(f"[sim] in-process aggregator, db in {tmp}")
+
+    def post(self, body):
+        r = self.client.post("/ingest", data=body, headers={
+            "Content-Type": "application/json", "Content-Encoding": "gzip", "X-Ingest-Key": self.key})
+        if r.status_code != 200:
+            raise RuntimeError(f"ingest {r.status_code}: {r.get_data(as_text=True)}")
+        return r.get_json()
+
+    def get(self, path):
+        return self.client.get(path).get_json()
+
+
+def run_station(client, name, line, args, stats, lock):
+    rng = random.Random(name)
+    t0 = datetime.now() - timedelta(hours=args.hours)
+    next_id, hwm = 1, 0
+    lat, sent, dups = [], 0, 0
+    for _ in range(args.batches):
+        rows = make_rows(next_id, args.batch, t0, rng)
+        body = encode_batch(name, line, rows, hwm)
+        for attempt in range(2 if rng.random() < args.dup else 1):
+            t = time.perf_counter()
+            ack = client.post(body)
+            lat.append(time.perf_counter() - t)
+            if attempt:
+                dups += 1
+                assert ack["duplicate"], f"{name}: resent batch was applied again"
+        next_id += args.batch
+        hwm = rows[-1][0]
+        sent += len(rows)
+    with lock:
+        stats["latency"] += lat
+        stats["rows"] += sent
+        stats["duplicates"] += dups
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Simulate N line stations uploading to the aggregator")
+    ap.add_argument("--url", help="aggregator base URL; omitted = in-process aggregator")
+    ap.add_argument("--key", default=os.getenv("INGEST_KEY", os.getenv("RESET_KEY", "admin123")))
+    ap.add_argument("--stations", type=int, default=8)
+    ap.add_argument("--lines", type=int, default=2)
+    ap.add_argument("--batches", type=int, default=20, help="batches per station")
+    ap.add_argument("--batch", type=int, default=500, help="rows per batch")
+    ap.add_argument("--dup", type=float, default=0.1, help="fraction of batches sent twice")
+    ap.add_argument("--hours", type=float, default=6, help="spread event timestamps over the last N hours")
+    args = ap.parse_args()
+
+    client = HttpClient(args.url, args.key) if args.url else LocalClient(args.key)
+    before = sum(s["rows"] for s in client.get("/api/stations")["stations"])
+    stats = {"latency": [], "rows": 0, "duplicates": 0}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=run_station, args=(client, f"sim-{i:02d}", f"L{i % args.lines + 1}",
+                                                          args, stats, lock), daemon=True)
+               for i in range(args.stations)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    dt = time.perf_counter() - t0
+
+    after = sum(s["rows"] for s in client.get("/api/stations")["stations"])
+    posts = len(stats["latency"])
+    print(f"[sim] {args.stations} stations x {args.batches} batches x {args.batch} rows "
+          f"({stats['duplicates']} batches resent) in {dt:.2f}s")
+    print(f"[sim] ingest: {stats['rows'] / dt:,.0f} rows/s, {posts / dt:,.1f} requests/s, "
+          f"latency p50 {percentile(stats['latency'], 0.5) * 1000:.1f} ms / "
+          f"p99 {percentile(stats['latency'], 0.99) * 1000:.1f} ms")
+    ok = after - before == stats["rows"]
+    print(f"[sim] aggregator rows +{after - before} vs generated {stats['rows']}: "
+          f"{'OK (no double count)' if ok else 'MISMATCH'}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,76 @@
+# streaming.py — ONE PRODUCER, MANY VIEWERS for /video_feed
+# The producer (capture loop in thread mode, shm relay in process mode) encodes
+# each frame once and publishes it here; every viewer just waits for the next
+# sequence number. Per-viewer cost = one wakeup + one socket write.
+#
+# Disconnects: when the client goes away the WSGI server closes the generator
+# (GeneratorExit at the next yield) and response.call_on_close frees the slot.
+# Under waitress (serve.py) we also poll environ["waitress.client_disconnected"]
+# while waiting, so an idle stream (camera down / no new frame) is noticed too.
+
+import threading
+
+import metrics
+
+STREAM_VIEWERS = metrics.Gauge("stream_viewers", "Open /video_feed connections")
+STREAM_REJECTED = metrics.Counter("stream_rejected_total", "/video_feed requests refused (viewer limit)")
+STREAM_CLOSED = metrics.Counter("stream_closed_total", "/video_feed connections ended")
+
+
+def mjpeg_part(jpeg):
+    return b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
+
+
+class FrameBroadcaster:
+    def __init__(self, max_viewers=32):
+        self.max_viewers = max_viewers
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._part = None
+        self._slots = threading.BoundedSemaphore(max_viewers)
+        self.viewers = 0
+        STREAM_VIEWERS.fn = lambda: {(): self.viewers}
+
+    # ----------------- PRODUCER -----------------
+    def publish(self, jpeg):
+        part = mjpeg_part(jpeg)  # build outside the lock
+        with self._cond:
+            self._seq += 1
+            self._part = part
+            self._cond.notify_all()
+
+    # ----------------- VIEWERS -----------------
+    def open(self):
+        """Reserve a viewer slot. False = limit reached (caller answers 503)."""
+        if not self._slots.acquire(blocking=False):
+            STREAM_REJECTED.inc()
+            return False
+        with self._cond:
+            self.viewers += 1
+        return True
+
+    def close(self):
+        """Free the slot (response.call_on_close -> runs even if streaming never started)."""
+        with self._cond:
+            self.viewers -= 1
+        self._slots.release()
+
+    def stream(self, disconnected=None, poll=1.0):
+        """Generator for one viewer; returns as soon as the client is gone."""
+        last = 0
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq != last, timeout=poll)
+                    seq, part = self._seq, self._part
+                if disconnected is not None and disconnected():
+                    STREAM_CLOSED.inc(reason="disconnected")
+                    return
+                if seq == last or part is None:
+                    continue
+                last = seq
+                yield part
+        except GeneratorExit:
+            # server closed us: socket write failed or worker shutting down
+            STREAM_CLOSED.inc(reason="closed")
+            raise
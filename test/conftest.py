@@ -0,0 +1,61 @@
+# test/conftest.py — pytest setup for the unit tests in this folder
+# The other scripts here are manual checks, not tests: conf_test.py needs the
+# real YOLO weights, insert_test_data.py writes into the live database.
+import os, sys
+
+import pytest
+from sqlalchemy import MetaData, create_engine
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+collect_ignore = ["conf_test.py", "insert_test_data.py"]
+
+
+class FakeJob:
+    """Stand-in for jobs.Job in functions that report progress."""
+    cancelled = False
+
+    def report(self, progress=None, message=None):
+        pass
+
+
+@pytest.fixture
+def job():
+    return FakeJob()
+
+
+def memory_engine():
+    """In-memory SQLite shared by every connection (the code under test opens several)."""
+    return create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+
+
+@pytest.fixture
+def station_db():
+    """
+    (engine, bottle, replication_state) of a line station. bottle WITHOUT
+    AUTOINCREMENT like the shipped instance/database.db: ids restart after a reset.
+    """
+    from models import Bottle, ReplicationState
+    from replicator import ensure_epoch
+    md = MetaData()
+    bottle = Bottle.__table__.to_metadata(md)
+    bottle.dialect_kwargs["sqlite_autoincrement"] = False
+    state = ReplicationState.__table__.to_metadata(md)
+    engine = memory_engine()
+    md.create_all(engine)
+    ensure_epoch(engine, state)
+    return engine, bottle, state
+
+
+def add_rows(engine, table, n, ts="2025-01-15 14:30:00"):
+    from inspection import GOOD_KEY
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [dict(timestamp=ts, category=GOOD_KEY, confidence=0.9) for _ in range(n)])
+
+
+def reset(engine, table, state, job, tmp_path):
+    """retention.reset_all on a station_db, files under tmp_path."""
+    from retention import reset_all
+    return reset_all(job, engine, table, capture_dir=str(tmp_path / "captured"),
+                     clip_dir=str(tmp_path / "clips"), state_table=state)
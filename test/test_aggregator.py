@@ -0,0 +1,68 @@
+# Aggregator.ingest idempotency: retried / overlapping batches and reset epochs
+import pytest
+
+from conftest import memory_engine
+from inspection import GOOD_KEY
+
+
+@pytest.fixture
+def agg():
+    from models import Station, Rollup
+    from aggregator import Aggregator
+    engine = memory_engine()
+    Station.__table__.create(engine)
+    Rollup.__table__.create(engine)
+    return Aggregator(engine, Station.__table__, Rollup.__table__)
+
+
+def batch(ids, epoch="e1", station="st1"):
+    rows = [[i, "2025-01-15 14:30:00", GOOD_KEY, 0.9, 0] for i in ids]
+    return {"station": station, "line": "L1", "epoch": epoch, "from": ids[0] - 1, "seq": ids[-1], "rows": rows}
+
+
+def total(agg):
+    return sum(agg.category_counts().values())
+
+
+def test_duplicate_batch_is_acknowledged_not_counted(agg):
+    assert agg.ingest(batch([1, 2, 3]))["applied"] == 3
+    ack = agg.ingest(batch([1, 2, 3]))
+    assert ack["duplicate"] and ack["applied"] == 0 and ack["last_seq"] == 3
+    assert total(agg) == 3
+
+
+def test_overlapping_batch_counts_only_new_rows(agg):
+    agg.ingest(batch([1, 2, 3]))
+    ack = agg.ingest(batch([2, 3, 4, 5]))
+    assert not ack["duplicate"] and ack["applied"] == 2 and ack["last_seq"] == 5
+    assert total(agg) == 5
+
+
+def test_stations_are_independent(agg):
+    agg.ingest(batch([1, 2], station="st1"))
+    assert agg.ingest(batch([1, 2], station="st2"))["applied"] == 2
+    assert total(agg) == 4
+
+
+def test_new_epoch_restarts_seq(agg):
+    agg.ingest(batch([1, 2, 3, 4, 5], epoch="2025-01-15 10:00:00.000000#0"))
+    # station was reset: ids start again at 1
+    ack = agg.ingest(batch([1, 2], epoch="2025-01-15 12:00:00.000000#0"))
+    assert ack["applied"] == 2 and ack["last_seq"] == 2
+    assert total(agg) == 7
+
+
+def test_older_epoch_is_refused_as_stale(agg):
+    agg.ingest(batch([1], epoch="2025-01-15 12:00:00.000000#0"))
+    ack = agg.ingest(batch([1, 2, 3], epoch="2025-01-15 10:00:00.000000#0"))
+    assert ack["stale"] and ack["applied"] == 0
+    assert total(agg) == 1
+
+
+def test_bad_timestamp_rolls_back_the_batch(agg):
+    b = batch([1, 2])
+    b["rows"][1][1] = "yesterday"
+    with pytest.raises(ValueError):
+        agg.ingest(b)
+    assert total(agg) == 0
+    assert agg.ingest(batch([1, 2]))["applied"] == 2
@@ -0,0 +1,52 @@
+# camera: CameraSupervisor reconnects with backoff, never blocks its consumers
+import time
+
+import numpy as np
+
+from camera import CameraSupervisor
+
+
+class FakeCap:
+    def __init__(self, frames):
+        self.frames = frames   # reads before the device "dies"
+
+    def read(self):
+        if self.frames <= 0:
+            return False, None
+        self.frames -= 1
+        time.sleep(0.005)
+        return True, np.zeros((4, 4, 3), np.uint8)
+
+    def grab(self):
+        return self.read()[0]
+
+    def release(self):
+        pass
+
+
+def wait_for(cond, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cond()
+
+
+def test_reconnects_after_open_failure_and_dead_device():
+    opens = []
+
+    def opener(index):
+        opens.append(index)
+        return None if len(opens) == 1 else FakeCap(frames=5)   # first open fails
+
+    states = []
+    cam = CameraSupervisor(0, opener=opener, max_fails=3, backoff_min=0.01, backoff_max=0.05,
+                           on_state=lambda i, state, reason: states.append(state))
+    cam.active = True
+    cam.start()
+    try:
+        assert wait_for(lambda: cam.reconnects >= 2)
+        assert cam.latest(timeout=1.0) is not None
+    finally:
+        cam.stop()
+    assert states[:3] == ["offline", "connecting", "online"]
+    assert "offline" in states[3:]    # 3 failed reads -> closed and reopened
@@ -0,0 +1,34 @@
+# config: strict coercion of admin API values, override file survives a reload
+import pytest
+
+from config import RuntimeConfig
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    base = tmp_path / "config.yaml"
+    base.write_text("conf_thresh: 0.25\nlamp_ms: 500\n", encoding="utf-8")
+    return RuntimeConfig(str(base), {"conf_thresh": 0.25, "lamp_ms": 500, "save_only_defect": True},
+                         override_path=str(tmp_path / "config.override.yaml"))
+
+
+@pytest.mark.parametrize("changes", [
+    {"save_only_defect": "maybe"},   # not a known bool word -> not False
+    {"lamp_ms": 0.7},                # int(0.7) would be 0
+    {"lamp_ms": True},
+])
+def test_rejects_ambiguous_values(cfg, changes):
+    ok, errors = cfg.update(changes)
+    assert not ok and errors
+    assert cfg["lamp_ms"] == 500 and cfg["save_only_defect"] is True
+
+
+def test_accepts_bool_words_and_integral_floats(cfg):
+    assert cfg.update({"save_only_defect": "Off", "lamp_ms": 800.0})[0]
+    assert cfg["save_only_defect"] is False and cfg["lamp_ms"] == 800
+
+
+def test_override_survives_reload(cfg):
+    assert cfg.update({"conf_thresh": 0.6})[0]
+    assert cfg.reload()
+    assert cfg["conf_thresh"] == 0.6
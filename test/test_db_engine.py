@@ -0,0 +1,39 @@
+# db_engine: SQLite edge mode (WAL pragmas, forward-only column migration), pool metrics
+import pytest
+from sqlalchemy import MetaData, Table, Column, Integer, String, create_engine, inspect, text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+from db_engine import write_engine, add_missing_columns, POOL_WAIT, POOL_ERRORS
+
+
+def test_sqlite_file_runs_in_wal_mode(tmp_path):
+    eng = write_engine(f"sqlite:///{tmp_path / 'edge.db'}", mode="sqlite")
+    with eng.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1   # NORMAL
+    eng.dispose()
+
+
+def test_old_database_gets_new_columns(tmp_path):
+    from models import Bottle
+    eng = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    old = Table("bottle", MetaData(), Column("id", Integer, primary_key=True),
+                Column("timestamp", String(32)), Column("category", String(64)))
+    old.create(eng)
+    added = add_missing_columns(eng, Bottle.__table__)
+    assert "object_id" in added and "cam" in added
+    assert {c["name"] for c in inspect(eng).get_columns("bottle")} >= {"object_id", "cam"}
+    assert add_missing_columns(eng, Bottle.__table__) == []   # idempotent
+    eng.dispose()
+
+
+def test_pinned_write_pool_times_out_and_is_counted(tmp_path):
+    eng = write_engine(f"sqlite:///{tmp_path / 'edge.db'}", mode="sqlite")
+    eng.pool._timeout = 0.05
+    errors = POOL_ERRORS._values.get((("pool", "write"),), 0)
+    with eng.connect():
+        with pytest.raises(PoolTimeout):   # one pinned connection, already in use
+            eng.connect()
+    assert POOL_ERRORS._values[(("pool", "write"),)] == errors + 1
+    assert POOL_WAIT._values[(("pool", "write"),)][2] >= 2   # both checkouts timed
+    eng.dispose()
@@ -0,0 +1,22 @@
+# db_writer: update() is applied after the rows queued before it
+import time
+
+from db_writer import BatchWriter
+from inspection import GOOD_KEY
+
+
+def test_update_follows_its_row(station_db):
+    engine, bottle, _ = station_db
+    committed = []
+    w = BatchWriter(engine, bottle, max_delay=0.05, on_commit=committed.extend).start()
+    w.add(timestamp="2025-01-15 14:30:00", category="Cap_Missing", confidence=0.8, clip_path="clips/a.mp4")
+    w.update("clip_path", "clips/a.mp4", clip_path="")      # clip failed -> unlink it
+    w.add(timestamp="2025-01-15 14:30:01", category=GOOD_KEY, confidence=0.9, clip_path="clips/b.mp4")
+    deadline = time.monotonic() + 5
+    while w.written < 3 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    w.stop()
+    with engine.connect() as conn:
+        rows = conn.execute(bottle.select().order_by(bottle.c.id)).all()
+    assert [r.clip_path for r in rows] == ["", "clips/b.mp4"]
+    assert len(committed) == 2   # rows only, not the update
@@ -0,0 +1,23 @@
+# engine: crossings queued by a crashed engine are handed on at respawn
+import time
+import multiprocessing as mp
+
+from engine import EngineSupervisor
+
+
+def test_respawn_drains_the_old_event_queue():
+    got, clips = [], []
+    sup = EngineSupervisor.__new__(EngineSupervisor)   # no shm / children needed here
+    sup.on_event = got.append
+    sup.on_clip = lambda path, ok: clips.append((path, ok))
+    sup._profiles = {}
+    old = mp.get_context("spawn").Queue()
+    old.put({"type": "crossing", "object_id": 1})
+    old.put({"type": "clip", "path": "clips/a.mp4", "ok": False})
+    old.put({"type": "crossing", "object_id": 2})
+    time.sleep(0.2)   # feeder thread
+
+    sup._drain_events(old)
+    assert [ev["object_id"] for ev in got] == [1, 2]
+    assert clips == [("clips/a.mp4", False)]
+    sup._drain_events(None)   # first spawn: nothing to drain
@@ -0,0 +1,25 @@
+# export: filtered, chunked CSV stream (gzip on the fly)
+import csv, gzip, io
+
+from export import parse_filters, build_query, iter_csv, gzip_stream, COLUMNS
+from inspection import GOOD_KEY, DEFECT_KEYS
+
+
+def test_filtered_csv_stream(station_db):
+    engine, bottle, _ = station_db
+    defect = sorted(DEFECT_KEYS)[0]
+    with engine.begin() as conn:
+        conn.execute(bottle.insert(), [
+            dict(timestamp=ts, category=cat, confidence=0.9, cam=cam, image_path=f"captured/x/cam{path_cam}/a.jpg")
+            for ts, cat, cam, path_cam in [
+                ("2025-01-15 08:00:00", GOOD_KEY, 0, 0),
+                ("2025-01-15 09:00:00", defect, 1, 1),
+                ("2025-01-15 10:00:00", defect, None, 1),   # before the cam column: camera in the path
+                ("2025-01-15 11:00:00", defect, None, 0),
+                ("2025-01-16 08:00:00", defect, 1, 1),
+            ]])
+    filters = parse_filters({"since": "2025-01-15", "until": "2025-01-16", "category": "defect", "cam": "1"})
+    body = b"".join(gzip_stream(iter_csv(engine, build_query(bottle, **filters), chunk_rows=1)))
+    rows = list(csv.reader(io.StringIO(gzip.decompress(body).decode("utf-8"))))
+    assert tuple(rows[0]) == COLUMNS
+    assert [r[1] for r in rows[1:]] == ["2025-01-15 09:00:00", "2025-01-15 10:00:00"]
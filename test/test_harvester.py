@@ -0,0 +1,29 @@
+# harvester: near-duplicate dHash window, reasons a crossing is worth labeling
+import numpy as np
+
+from harvester import dhash, HashIndex, SampleHarvester
+from inspection import GOOD_KEY
+
+CFG = {"harvest_margin": 0.15, "conf_thresh": 0.25, "harvest_min_flips": 2, "harvest_agreement": 0.7}
+
+
+def gradient(shift=0):
+    row = np.arange(64, dtype=np.uint8) * 3 + shift
+    return np.tile(row, (48, 1))
+
+
+def test_near_duplicates_are_found():
+    idx = HashIndex(window=4)
+    idx.add(dhash(gradient()))
+    assert idx.near(dhash(gradient(shift=5)), max_dist=4)          # brighter, same picture
+    assert not idx.near(dhash(gradient()[:, ::-1]), max_dist=4)    # mirrored -> different
+
+
+def test_reasons_for_an_unsure_track(tmp_path):
+    h = SampleHarvester(root=str(tmp_path))
+    for label, conf in [(GOOD_KEY, 0.55), ("Missing_Text", 0.5), (GOOD_KEY, 0.6), ("Missing_Text", 0.45)]:
+        h.observe([(1, label, conf, (0, 0, 10, 10))], now=100.0)
+    why, info = h.reasons(1, GOOD_KEY, CFG)
+    assert why == ["low_margin", "flip", "disagree"] and info["flips"] == 3
+    h.observe([(2, GOOD_KEY, 0.95, (0, 0, 10, 10))], now=100.0)
+    assert h.reasons(2, GOOD_KEY, CFG)[0] == []
@@ -0,0 +1,30 @@
+# http_cache: one view call per data version, ETag -> 304 while nothing changed
+from flask import Flask, jsonify
+
+from http_cache import ResponseCache
+
+
+def test_etag_and_304_follow_the_data_version():
+    app = Flask(__name__)
+    version = [1]
+    calls = []
+    cache = ResponseCache(lambda: version[0])
+
+    @app.route("/stats")
+    @cache
+    def stats():
+        calls.append(1)
+        return jsonify({"version": version[0]})
+
+    c = app.test_client()
+    first = c.get("/stats?t=1")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+    assert c.get("/stats?t=2").get_json() == {"version": 1}     # old cache buster ignored
+    assert c.get("/stats", headers={"If-None-Match": etag}).status_code == 304
+    assert len(calls) == 1
+
+    version[0] = 2
+    changed = c.get("/stats", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.get_json() == {"version": 2}
+    assert changed.headers["ETag"] != etag and len(calls) == 2
@@ -0,0 +1,28 @@
+import os
+from datetime import datetime
+
+import numpy as np
+
+import retention
+from image_store import ImageStore
+
+
+NOW = datetime(2025, 1, 15, 14, 30, 0, 123000)
+
+
+def frame():
+    return np.zeros((8, 8, 3), dtype=np.uint8)
+
+
+def test_save_after_empty_shard_was_removed(tmp_path):
+    store = ImageStore(root=str(tmp_path / "captured"))
+    first = store.save(frame(), "Good", cam=1, now=NOW)
+    assert first and os.path.exists(first)
+
+    os.remove(first)
+    retention.remove_empty_dirs(store.root)
+    assert not os.path.isdir(store.shard_dir(NOW, 1))
+
+    second = store.save(frame(), "Good", cam=1, now=NOW)
+    assert second and os.path.exists(second)
+    assert second != first
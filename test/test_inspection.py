@@ -0,0 +1,71 @@
+# inspection: LineCounter crossings, ghost adoption after a restart, snapshot vs uncommitted rows, crossing categories
+from datetime import datetime, timedelta
+
+from inspection import LineCounter, crossing_event, GOOD_KEY, PENDING, UNCLASSIFIED_KEY
+from snapshot import Uncommitted
+
+T0 = datetime(2025, 1, 15, 14, 0, 0)
+W = 1000   # frame width, line at 500
+
+
+def box(cx):
+    return (cx - 40, 100, cx + 40, 300)
+
+
+def test_counts_once_after_seen_left():
+    lc = LineCounter()
+    assert lc.update([(1, GOOD_KEY, 0.9, box(300))], W, 0.5, T0) == []
+    crossed = lc.update([(1, GOOD_KEY, 0.9, box(600))], W, 0.5, T0)
+    assert [c["tid"] for c in crossed] == [1]
+    assert lc.update([(1, GOOD_KEY, 0.9, box(700))], W, 0.5, T0) == []
+    # never seen left -> not counted
+    assert lc.update([(2, GOOD_KEY, 0.9, box(800))], W, 0.5, T0) == []
+
+
+def test_ghost_adoption_after_restart():
+    before = LineCounter()
+    before.update([(7, "Missing_Text", 0.8, box(480))], W, 0.5, T0)     # seen left, not counted
+    before.update([(8, GOOD_KEY, 0.9, box(200)), (8, GOOD_KEY, 0.9, box(600))], W, 0.5, T0)  # counted
+    snap = before.export_state(T0)
+
+    after = LineCounter()
+    assert after.restore(snap, T0) == 2
+    now = T0 + timedelta(seconds=1)
+    # new tracker ids; boxes overlap the restored ones
+    crossed = after.update([(1, "Missing_Text", 0.7, box(510)), (2, GOOD_KEY, 0.9, box(610))], W, 0.5, now)
+    assert [(c["tid"], c["label"]) for c in crossed] == [(1, "Missing_Text")]
+
+
+def test_ghosts_expire():
+    lc = LineCounter()
+    lc.restore([[7, True, False, GOOD_KEY, 0.9, list(box(300)), 0.5]], T0)
+    late = T0 + timedelta(seconds=10)
+    assert lc.update([(1, GOOD_KEY, 0.9, box(600))], W, 0.5, late) == []   # no ghost -> not seen left
+
+
+def test_counted_only_after_row_commit():
+    lc = LineCounter()
+    lc.update([(5, GOOD_KEY, 0.9, box(300))], W, 0.5, T0)
+    crossed = lc.update([(5, GOOD_KEY, 0.9, box(600))], W, 0.5, T0)
+    pending = Uncommitted()
+    for c in crossed:
+        pending.add(0, c["tid"])
+    tracks, changed = pending.hide(0, lc.export_state(T0))
+    assert tracks[0][2] is False and not changed    # row still in the BatchWriter buffer
+    pending.commit([(0, 5)])
+    tracks, changed = pending.hide(0, lc.export_state(T0))
+    assert tracks[0][2] is True and changed         # -> snapshot written right away
+
+
+class Store:
+    def save(self, frame, category, cam=None, now=None):
+        return f"captured/{category}.jpg"
+
+
+def test_pending_track_is_unclassified_not_good():
+    cfg = {"save_only_defect": True}
+    ev = crossing_event(None, {"label": PENDING, "conf": 0.0, "tid": 3, "box": box(600)}, cfg, T0, 0, Store())
+    assert ev["category"] == UNCLASSIFIED_KEY and not ev["defect"]
+    assert ev["image_path"]          # kept for a manual check
+    ev = crossing_event(None, {"label": GOOD_KEY, "conf": 0.9, "tid": 4, "box": box(600)}, cfg, T0, 0, Store())
+    assert ev["category"] == GOOD_KEY and ev["image_path"] == ""
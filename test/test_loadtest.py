@@ -0,0 +1,15 @@
+# loadtest: MJPEG frames counted once however the stream is chunked
+import pytest
+
+from loadtest import count_markers
+
+STREAM = b"".join(b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + bytes(50) + b"\r\n" for _ in range(7))
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 8, 64, len(STREAM)])
+def test_each_marker_counted_once(size):
+    frames, tail = 0, b""
+    for i in range(0, len(STREAM), size):
+        n, tail = count_markers(tail, STREAM[i:i + size])
+        frames += n
+    assert frames == 7
@@ -0,0 +1,29 @@
+# profiler: samples a busy thread into flamegraph-ready collapsed stacks
+import threading
+
+import profiler
+
+
+def spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_busy_thread(tmp_path):
+    stop = threading.Event()
+    t = threading.Thread(target=spin, args=(stop,), daemon=True, name="worker-test")
+    t.start()
+    try:
+        res = profiler.profile(0.5, threads=["worker-test"], interval=0.002, memory=False, prefix="engine/")
+    finally:
+        stop.set()
+        t.join()
+    assert res["threads"] == ["engine/worker-test"] and res["samples"] > 10
+    assert all(s.startswith("engine/worker-test;") and "spin (test_profiler.py:" in s for s in res["stacks"])
+
+    name = profiler.save(res["stacks"], out_dir=str(tmp_path))
+    lines = (tmp_path / name).read_text(encoding="utf-8").splitlines()
+    counts = [int(line.rsplit(" ", 1)[1]) for line in lines]
+    assert counts == sorted(counts, reverse=True) and sum(counts) == sum(res["stacks"].values())
+    hot = profiler.hot_functions(res["stacks"])
+    assert round(sum(h["pct"] for h in hot)) == 100
@@ -0,0 +1,44 @@
+# reinspect: confusion matrix + diff CSV of a run, images read back from retention tars
+import csv, tarfile
+
+import cv2
+import numpy as np
+from sqlalchemy import MetaData
+
+from conftest import memory_engine
+from inspection import GOOD_KEY
+from reinspect import report, load_image, run_name, NONE_LABEL
+
+
+def test_report_confusion_and_diff(tmp_path):
+    from models import Bottle, Reinspection
+    md = MetaData()
+    bottle, result = Bottle.__table__.to_metadata(md), Reinspection.__table__.to_metadata(md)
+    engine = memory_engine()
+    md.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(bottle.insert(), [dict(timestamp="2025-01-15 08:00:00", category=c, confidence=0.9,
+                                            image_path=f"captured/{i}.jpg")
+                                       for i, c in enumerate([GOOD_KEY, GOOD_KEY, "Missing_Text", GOOD_KEY], 1)])
+        conn.execute(result.insert(), [dict(run="v3", bottle_id=i, status=st, category=c, confidence=0.8)
+                                       for i, st, c in [(1, "ok", GOOD_KEY), (2, "ok", "Missing_Text"),
+                                                        (3, "nobox", ""), (4, "missing", "")]])
+    s = report(engine, bottle, result, "v3", out_dir=str(tmp_path))
+    assert (s["compared"], s["agree"], s["status"]) == (3, 1, {"ok": 2, "nobox": 1, "missing": 1})
+    assert s["changes"] == {"good->defect": 1, "defect->none": 1}
+    with open(s["diff_csv"], newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["bottle_id"], r["new"]) for r in rows] == [("2", "Missing_Text"), ("3", NONE_LABEL)]
+    assert (tmp_path / "reinspect_v3.json").exists()
+
+
+def test_load_image_from_archive(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cv2.imwrite("a.jpg", np.full((8, 8, 3), 200, np.uint8))
+    (tmp_path / "archive").mkdir()
+    with tarfile.open("archive/images_2025-01-15.tar", "w") as tar:
+        tar.add("a.jpg", arcname="2025/01/15/08/cam0/a.jpg")
+    img = load_image("archive/images_2025-01-15.tar#2025/01/15/08/cam0/a.jpg")
+    assert img is not None and img.shape == (8, 8, 3)
+    assert load_image("archive/images_2025-01-15.tar#missing.jpg") is None
+    assert run_name("model/runs_v3/detect/train/weights/best.pt") == "runs_v3"
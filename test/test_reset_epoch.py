@@ -0,0 +1,108 @@
+# Reset epoch: uplink / replicator high-water marks after /reset (ids restart at 1)
+from sqlalchemy import MetaData, select, func, update
+
+from conftest import memory_engine, add_rows, reset
+
+
+# ----------------- UPLINK -> AGGREGATOR -----------------
+def uplink_to(agg, engine, bottle, state):
+    from uplink import Uplink, decode_batch
+    up = Uplink(engine, "http://aggregator", bottle, state, station="st1", line="L1")
+    up.post = lambda body: agg.ingest(decode_batch(body, "gzip"))
+    return up
+
+
+def test_uplink_ships_rows_after_reset(station_db, job, tmp_path):
+    from models import Station, Rollup
+    from aggregator import Aggregator
+    engine, bottle, state = station_db
+    central = memory_engine()
+    Station.__table__.create(central)
+    Rollup.__table__.create(central)
+    agg = Aggregator(central, Station.__table__, Rollup.__table__)
+    up = uplink_to(agg, engine, bottle, state)
+
+    add_rows(engine, bottle, 10)
+    assert up.ship_once() == 10
+    reset(engine, bottle, state, job, tmp_path)
+    add_rows(engine, bottle, 3)
+    with engine.connect() as conn:
+        assert conn.execute(select(func.max(bottle.c.id))).scalar() == 3   # ids restarted
+    assert up.ship_once() == 3
+    assert up.ship_once() == 0
+    assert sum(agg.category_counts().values()) == 13
+
+
+def test_mark_of_an_old_epoch_is_not_saved(station_db, job, tmp_path):
+    from replicator import load_mark, save_mark
+    engine, bottle, state = station_db
+    add_rows(engine, bottle, 5)
+    with engine.connect() as conn:
+        _, token = load_mark(conn, state, bottle, "uplink")
+    reset(engine, bottle, state, job, tmp_path)   # happens while a ship is in flight
+    with engine.begin() as conn:
+        assert not save_mark(conn, state, "uplink", 5, token)
+        assert load_mark(conn, state, bottle, "uplink")[0] == 0
+
+
+def test_new_epoch_always_sorts_later(station_db):
+    from replicator import new_epoch, read_epoch
+    engine, bottle, state = station_db
+    with engine.begin() as conn:
+        conn.execute(update(state).values(updated_at="2999-01-01 00:00:00.000000"))   # clock stepped back
+        before = read_epoch(conn, state)[0]
+        assert new_epoch(conn, state, bottle) > before
+
+
+# ----------------- REPLICATOR -> CENTRAL -----------------
+def central_db():
+    from models import Bottle
+    md = MetaData()
+    table = Bottle.__table__.to_metadata(md)
+    engine = memory_engine()
+    md.create_all(engine)
+    return engine, table
+
+
+def replicator(engine, bottle, state, central, station):
+    from replicator import Replicator
+    rep = Replicator(engine, "sqlite://", bottle, state, station=station)
+    rep._central = central
+    return rep
+
+
+def central_count(central, table):
+    with central.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table)).scalar()
+
+
+def test_replicator_stations_reset_and_replay(station_db, job, tmp_path):
+    from models import Bottle, ReplicationState
+    from replicator import ensure_epoch
+    engine, bottle, state = station_db
+    central, ctable = central_db()
+
+    # a second station with the same local ids 1..5
+    md = MetaData()
+    b2, s2 = Bottle.__table__.to_metadata(md), ReplicationState.__table__.to_metadata(md)
+    engine2 = memory_engine()
+    md.create_all(engine2)
+    ensure_epoch(engine2, s2)
+
+    rep1 = replicator(engine, bottle, state, central, "st1")
+    rep2 = replicator(engine2, b2, s2, central, "st2")
+    add_rows(engine, bottle, 5)
+    add_rows(engine2, b2, 5)
+    assert rep1.ship_once() == 5 and rep2.ship_once() == 5
+    assert central_count(central, ctable) == 10        # same local ids, no collision
+
+    reset(engine, bottle, state, job, tmp_path)
+    add_rows(engine, bottle, 3)
+    assert rep1.ship_once() == 3
+    assert central_count(central, ctable) == 13
+
+    # mark lost (crash before save): the replay is ignored on central
+    with engine.begin() as conn:
+        conn.execute(update(state).where(state.c.name == "bottle").values(last_id=0))
+    assert rep1.ship_once() == 3
+    assert central_count(central, ctable) == 13
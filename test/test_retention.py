@@ -0,0 +1,59 @@
+# retention: old images archived into tars, files only unlinked after the commit
+import os
+
+import pytest
+
+import retention
+from inspection import GOOD_KEY
+
+
+class Config:
+    def __init__(self, values):
+        self.values = values
+
+    def snapshot(self):
+        return self.values
+
+
+@pytest.fixture
+def line(station_db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)                # CAPTURE_DIR / ARCHIVE_DIR are relative
+    monkeypatch.setattr(retention, "CHUNK_PAUSE", 0)
+    engine, bottle, _ = station_db
+    rows = []
+    for ts in ("2020-01-01 08:00:00", "2999-01-01 08:00:00"):
+        path = f"captured/2020/01/01/08/cam0/{ts[:4]}.jpg"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"jpeg")
+        rows.append(dict(timestamp=ts, category=GOOD_KEY, confidence=0.9, image_path=path))
+    with engine.begin() as conn:
+        conn.execute(bottle.insert(), rows)
+    cfg = Config({"retention_images": {GOOD_KEY: "1d"}, "retention_rows": {}, "retention_archive": True})
+    return engine, bottle, retention.RetentionManager(engine, bottle, cfg, None, GOOD_KEY, [])
+
+
+def test_old_images_move_into_the_archive(line, job):
+    engine, bottle, mgr = line
+    stats = mgr.run(job)
+    assert stats["images_archived"] == 1
+    with engine.connect() as conn:
+        paths = [p for (p,) in conn.execute(bottle.select().with_only_columns(bottle.c.image_path)
+                                            .order_by(bottle.c.id))]
+    assert paths == ["archive/images_2020-01-01.tar#2020/01/01/08/cam0/2020.jpg",
+                     "captured/2020/01/01/08/cam0/2999.jpg"]
+    assert not os.path.exists("captured/2020/01/01/08/cam0/2020.jpg")
+    assert os.path.exists("captured/2020/01/01/08/cam0/2999.jpg")
+
+
+def test_failed_chunk_keeps_the_files(line, job, monkeypatch):
+    engine, bottle, mgr = line
+
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(retention, "archive_images", broken)
+    with pytest.raises(OSError):
+        mgr.run(job)
+    with engine.connect() as conn:
+        paths = [p for (p,) in conn.execute(bottle.select().with_only_columns(bottle.c.image_path))]
+    assert all(p.startswith("captured/") and os.path.exists(p) for p in paths)
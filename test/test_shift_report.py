@@ -0,0 +1,73 @@
+# shift_report: period keys / bounds, reset epoch and report_shifts changes
+from datetime import datetime
+
+import pytest
+
+from config import parse_shifts
+from conftest import add_rows, reset
+from inspection import GOOD_KEY, DEFECT_KEYS
+from shift_report import period_of, bounds, period_key, ShiftReports
+
+STARTS = parse_shifts("06:00,14:00,22:00")
+
+
+@pytest.mark.parametrize("ts, expected", [
+    ("2025-01-15 06:00:00", ("2025-01-15", 0)),
+    ("2025-01-15 13:59:59", ("2025-01-15", 0)),
+    ("2025-01-15 22:10:00", ("2025-01-15", 2)),
+    ("2025-01-16 03:10:00", ("2025-01-15", 2)),   # night shift belongs to the day it started
+])
+def test_period_of(ts, expected):
+    assert period_of(ts, STARTS) == expected
+
+
+def test_bounds_and_keys():
+    start, end = bounds("2025-01-15", STARTS, 2)
+    assert (start, end) == (datetime(2025, 1, 15, 22), datetime(2025, 1, 16, 6))
+    assert period_key("2025-01-15", start, end, 2) == "2025-01-15_S3_2200-0600"
+    start, end = bounds("2025-01-15", STARTS)
+    assert (start, end) == (datetime(2025, 1, 15, 6), datetime(2025, 1, 16, 6))
+    assert period_key("2025-01-15", start, end) == "2025-01-15_0600"
+
+
+class Cfg:
+    def __init__(self, shifts):
+        self.values = {"report_shifts": shifts, "report_top_images": 3, "report_interval_min": 5}
+
+    def snapshot(self):
+        return self.values
+
+
+def totals(reports):
+    return {k: sum(acc["categories"].values()) for k, acc in reports.state["open"].items()}
+
+
+@pytest.fixture
+def reports(station_db, tmp_path, monkeypatch):
+    import shift_report
+    monkeypatch.setattr(shift_report, "CHUNK_PAUSE", 0)
+    engine, bottle, state = station_db
+    return ShiftReports(engine, bottle, Cfg("06:00,14:00,22:00"), GOOD_KEY, DEFECT_KEYS,
+                        out_dir=str(tmp_path / "reports"), state_path=str(tmp_path / "state.dat"),
+                        state_table=state)
+
+
+def test_cursor_follows_the_reset_epoch(reports, station_db, job, tmp_path):
+    engine, bottle, state = station_db
+    add_rows(engine, bottle, 5, ts="2099-01-15 15:00:00")
+    assert reports.run()["cursor"] == 5
+    reset(engine, bottle, state, job, tmp_path)
+    add_rows(engine, bottle, 3, ts="2099-01-15 15:10:00")   # ids 1..3 again
+    assert reports.run()["rows"] == 3
+    assert totals(reports)["2099-01-15_S2_1400-2200"] == 8
+
+
+def test_shift_change_closes_old_periods(reports, station_db):
+    engine, bottle, _ = station_db
+    add_rows(engine, bottle, 4, ts="2099-01-15 15:00:00")
+    reports.run()
+    reports.config = Cfg("06:00,18:00")
+    add_rows(engine, bottle, 2, ts="2099-01-15 15:30:00")
+    reports.run()
+    assert totals(reports) == {"2099-01-15_S1_0600-1800": 2, "2099-01-15_0600": 6}
+    assert reports.index["2099-01-15_S2_1400-2200"]["final"]
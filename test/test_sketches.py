@@ -0,0 +1,30 @@
+# sketches: histogram quantiles, PSI and the sliding window
+import numpy as np
+
+from sketches import SlidingHistogram, quantile, psi, BINS
+
+
+def test_quantile_of_uniform_histogram():
+    hist = np.ones(BINS, dtype=np.int64)
+    assert quantile(hist, 0.5) == 0.5
+    assert quantile(hist, 0.1) == 0.1
+    assert quantile(np.zeros(BINS, dtype=np.int64), 0.5) is None
+
+
+def test_psi_stable_vs_shifted():
+    rng = np.random.default_rng(0)
+    base = np.histogram(rng.beta(8, 2, 5000), bins=BINS, range=(0, 1))[0]
+    same = np.histogram(rng.beta(8, 2, 5000), bins=BINS, range=(0, 1))[0]
+    shifted = np.histogram(rng.beta(4, 4, 5000), bins=BINS, range=(0, 1))[0]
+    assert psi(base, same) < 0.1
+    assert psi(base, shifted) > 0.25
+
+
+def test_sliding_histogram_forgets_old_buckets():
+    h = SlidingHistogram(window_s=60, bucket_s=10)
+    h.add(0.95, now=0)
+    h.add(0.15, now=55)
+    assert h.histogram(now=55).sum() == 2
+    assert h.histogram(now=65).sum() == 1        # the bucket of t=0 left the window
+    h.add(0.5, now=125)                          # recycles a slot used a window ago
+    assert h.histogram(now=125).sum() == 1
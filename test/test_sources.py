@@ -0,0 +1,34 @@
+# sources: QC_CAMERAS spec parsing, folder replay loops over the images
+import cv2
+import numpy as np
+import pytest
+
+from sources import parse_spec, load_specs, make_source, FolderSource
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("0", ("device", "0", {})),
+    ("v4l2:/dev/video2|fourcc=MJPG, fps=30", ("v4l2", "/dev/video2", {"fourcc": "MJPG", "fps": "30"})),
+    ("rtsp://10.0.0.21/s1|transport=udp", ("stream", "rtsp://10.0.0.21/s1", {"transport": "udp"})),
+    ("gst:videotestsrc ! appsink", ("gst", "videotestsrc ! appsink", {})),
+    ("folder:samples/|fps=5,loop=0", ("folder", "samples/", {"fps": "5", "loop": "0"})),
+])
+def test_parse_spec(spec, expected):
+    assert parse_spec(spec) == expected
+
+
+def test_bad_spec_and_list():
+    with pytest.raises(ValueError):
+        parse_spec("ftp://cam")
+    assert load_specs(" 0 ; file:a.mp4 ;; ") == ["0", "file:a.mp4"]
+
+
+def test_folder_replay_loops(tmp_path):
+    for i in range(2):
+        cv2.imwrite(str(tmp_path / f"{i}.png"), np.full((12, 16, 3), i * 100, np.uint8))
+    src = make_source(f"folder:{tmp_path}|fps=1000")
+    assert isinstance(src, FolderSource) and src.open()     # open() already read image 0
+    assert (src.width, src.height) == (16, 12)
+    values = [int(src.read()[1][0, 0, 0]) for _ in range(3)]
+    assert values == [100, 0, 100]
+    src.release()
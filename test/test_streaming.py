@@ -0,0 +1,25 @@
+# streaming: one encoded part per frame for every viewer, bounded viewer slots
+import threading
+
+from streaming import FrameBroadcaster, mjpeg_part
+
+
+def test_viewer_limit_and_slot_release():
+    b = FrameBroadcaster(max_viewers=2)
+    assert b.open() and b.open()
+    assert not b.open()          # -> 503
+    b.close()
+    assert b.open() and b.viewers == 2
+
+
+def test_viewers_get_the_latest_frame_and_leave_on_disconnect():
+    b = FrameBroadcaster()
+    gone = threading.Event()
+    gen = b.stream(disconnected=gone.is_set, poll=0.05)
+    b.publish(b"jpeg-1")
+    assert next(gen) == mjpeg_part(b"jpeg-1")
+    b.publish(b"jpeg-2")
+    b.publish(b"jpeg-3")         # slow viewer skips to the newest frame
+    assert next(gen) == mjpeg_part(b"jpeg-3")
+    gone.set()
+    assert next(gen, None) is None
@@ -0,0 +1,139 @@
+# uplink.py — SHIP INSPECTION EVENTS FROM A LINE STATION TO THE AGGREGATOR (HTTP)
+# Runs in the background on a station with UPLINK_TO=http://<aggregator>:5000.
+# Like replicator.py, but over HTTP to an app running ENGINE_MODE=aggregator
+# (aggregator.py) instead of straight into a central MySQL:
+#
+#   rows id > high-water mark ──gzip JSON batch──▶ POST /ingest ──▶ hourly rollups
+#
+# Idempotency: a batch carries (station, epoch, seq) with seq = the last local
+# Bottle.id in it. The aggregator applies only rows with id > the last seq it stored
+# for the station in that epoch, so a batch resent after a timeout / crash is
+# acknowledged as a duplicate and never counted twice. The local mark
+# (ReplicationState name="uplink") only advances after the aggregator acknowledged.
+# epoch = replicator.read_epoch token: after a reset ids start again at 1, the new
+# epoch tells the aggregator to start counting seq from 0 for this station.
+
+import io, gzip, json, time, threading
+import urllib.request
+
+from sqlalchemy import select, func
+
+import metrics
+from replicator import default_station_id, load_mark, save_mark
+
+COLUMNS = ("id", "timestamp", "category", "confidence", "cam")
+MAX_BATCH_BYTES = 8 * 1024 * 1024   # decompressed; the aggregator refuses bigger bodies
+
+UPLINK_ROWS = metrics.Counter("uplink_rows_total", "Rows shipped to the aggregator")
+
+
+def encode_batch(station, line, rows, from_id, epoch=""):
+    """Rows (tuples in COLUMNS order) -> gzip'd JSON body. seq = last id in the batch."""
+    body = {"station": station, "line": line, "epoch": str(epoch), "from": int(from_id),
+            "seq": int(rows[-1][0]), "columns": COLUMNS, "rows": [list(r) for r in rows]}
+    return gzip.compress(json.dumps(body, separators=(",", ":")).encode("utf-8"), compresslevel=6)
+
+
+def decode_batch(data, encoding=None):
+    """Request body -> batch dict (ValueError on anything malformed / too big)."""
+    if (encoding or "").lower() == "gzip":
+        with gzip.GzipFile(fileobj=io.BytesIO(data)) as f:
+            data = f.read(MAX_BATCH_BYTES + 1)
+    if len(data) > MAX_BATCH_BYTES:
+        raise ValueError("batch too large")
+    try:
+        batch = json.loads(data)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"invalid JSON: {e}")
+    if not isinstance(batch, dict) or not str(batch.get("station", "")).strip():
+        raise ValueError("station missing")
+    if list(batch.get("columns", COLUMNS)) != list(COLUMNS):
+        raise ValueError(f"columns must be {list(COLUMNS)}")
+    try:
+        batch["seq"] = int(batch["seq"])
+        batch["from"] = int(batch.get("from", 0))
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("seq / from must be integers")
+    if not isinstance(batch.get("rows"), list):
+        raise ValueError("rows must be a list")
+    batch["epoch"] = str(batch.get("epoch") or "")[:40]   # stations before epochs: ""
+    return batch
+
+
+class Uplink:
+    def __init__(self, local_engine, url, table, state_table, station=None, line="", key="",
+                 name="uplink", batch_size=2000, interval=5.0, timeout=15.0):
+        self.local = local_engine
+        self.url = url.rstrip("/") + "/ingest"
+        self.table = table
+        self.state_table = state_table
+        self.station = station or default_station_id()
+        self.line = line
+        self.key = key
+        self.name = name
+        self.batch_size = batch_size
+        self.interval = interval
+        self.timeout = timeout
+        self._stop = threading.Event()
+        self.status = {"online": False, "station": self.station, "line": line, "high_water": 0,
+                       "lag_rows": 0, "shipped": 0, "last_ok": None, "last_error": None}
+
+    # ----------------- HTTP -----------------
+    def post(self, body):
+        req = urllib.request.Request(self.url, data=body, method="POST", headers={
+            "Content-Type": "application/json", "Content-Encoding": "gzip", "X-Ingest-Key": self.key})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def ship_once(self):
+        """Send batches until caught up. Returns the number of rows acknowledged."""
+        t = self.table
+        cols = [t.c[c] for c in COLUMNS]
+        shipped = 0
+        with self.local.connect() as lconn:
+            # same mark table as the replicator; pulled down after a reset (replicator.load_mark)
+            hwm, epoch = load_mark(lconn, self.state_table, t, self.name)
+            while not self._stop.is_set():
+                rows = lconn.execute(select(*cols).where(t.c.id > hwm).order_by(t.c.id)
+                                     .limit(self.batch_size)).all()
+                if not rows:
+                    break
+                ack = self.post(encode_batch(self.station, self.line, rows, hwm, epoch))
+                if ack.get("stale"):
+                    raise RuntimeError(f"aggregator has a newer epoch {ack.get('epoch')!r} than ours {epoch!r}")
+                # the aggregator may already be further (duplicate after a lost ack)
+                hwm = max(int(rows[-1][0]), int(ack.get("last_seq", 0)))
+                with self.local.begin() as wconn:
+                    if not save_mark(wconn, self.state_table, self.name, hwm, epoch):
+                        print("[uplink] reset during shipping, reloading high-water mark")
+                        break
+                shipped += len(rows)
+                UPLINK_ROWS.inc(len(rows), result="duplicate" if ack.get("duplicate") else "applied")
+            lag = lconn.execute(select(func.count()).select_from(t).where(t.c.id > hwm)).scalar() or 0
+        self.status.update(online=True, high_water=hwm, lag_rows=int(lag), last_ok=time.time(), last_error=None)
+        self.status["shipped"] += shipped
+        return shipped
+
+    # ----------------- LOOP -----------------
+    def start(self):
+        threading.Thread(target=self._run, daemon=True, name="uplink").start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        backoff = self.interval
+        print(f"[uplink] station {self.station!r} -> {self.url} every {self.interval:.0f}s")
+        while not self._stop.is_set():
+            try:
+                n = self.ship_once()
+                if n:
+                    print(f"[uplink] shipped {n} rows (hwm={self.status['high_water']})")
+                backoff = self.interval
+            except Exception as e:
+                if self.status["online"] or self.status["last_error"] is None:
+                    print("[uplink] aggregator unreachable, buffering locally:", e)
+                self.status.update(online=False, last_error=str(e))
+                backoff = min(backoff * 2, 300.0)
+            self._stop.wait(backoff)